@@ -1,24 +1,35 @@
-import io
 import os
-import queue
 import sys
 import threading
+import time
 import asyncio
 from dataclasses import dataclass
 from typing import Optional
 
+import soundfile as sf
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from src.audio.recorder import AudioRecorder
 from src.audio.archive import AudioArchiveManager
+from src.audio.spool import RecordedAudio
+from src.audio.encoding import UploadEncoder, choose_upload_format
+from src.audio.vad import VadConfig, trim_silence_file
 from src.keyboard.listener import KeyboardManager, check_accessibility_permissions
 from src.keyboard.inputState import InputState
 from src.transcription.whisper import WhisperProcessor
 from src.utils.logger import logger
 from src.transcription.senseVoiceSmall import SenseVoiceSmallProcessor
 from src.transcription.local_whisper import LocalWhisperProcessor
+from src.transcription.scheduler import JobScheduler
+from src.transcription.delivery import OrderedDelivery
+from src.transcription.job_store import JobStore
+from src.transcription.result_cache import ResultCache, audio_fingerprint, cache_key
+from src.transcription.retry import BackoffPolicy, ConfigurationError, ErrorKind, RetryScheduler, classify_error
+from src.transcription.health import CircuitOpenError, FailoverRouter, HealthRegistry, parse_chain
+from src.transcription.hedging import PRIMARY, HedgePolicy, HedgeStats, run_hedged
+from src.utils.execution import CancelToken, OperationCancelled
 from src.transcription.doubao_streaming import DoubaoStreamingProcessor
 from src.ui.status_bar import StatusBarController
 from src.ui.floating_preview import FloatingPreviewWindow
@@ -31,12 +42,15 @@ __description__ = "Enhanced Voice Transcription Tool with OpenAI GPT-4o Transcri
 
 @dataclass
 class TranscriptionJob:
-    audio_bytes: bytes
+    audio_path: str  # 存档中的音频文件，任务之间只传递路径
     processor: str
     mode: str = "transcriptions"
-    archive_path: Optional[str] = None
     retries_left: int = 0
     attempt: int = 1
+    sequence: int = 0  # 录音顺序，结果按此顺序输出；重试沿用同一序号
+    job_id: Optional[int] = None  # jobs.sqlite3 中的记录
+    backend: Optional[str] = None  # 实际处理的后端（主后端熔断时由故障转移链改派）
+    prompt: str = ""  # 转录提示词（同时作为结果缓存键的一部分）
 
 
 def check_microphone_permissions():
@@ -53,18 +67,47 @@ def check_microphone_permissions():
     logger.warning("===============================\n")
 
 class VoiceAssistant:
-    def __init__(self, openai_processor, local_processor, doubao_processor):
+    def __init__(self, openai_processor, local_processor, doubao_processor, siliconflow_processor=None):
         self.audio_recorder = AudioRecorder()
         self.audio_archive = AudioArchiveManager()
+        # 录音直接写入存档目录，停止录音后不再在内存中复制音频
+        self.audio_recorder.set_spool_path_factory(self.audio_archive.new_audio_path)
         self.openai_processor = openai_processor  # OpenAI GPT-4o transcribe
         self.local_processor = local_processor    # 本地 whisper
         self.doubao_processor = doubao_processor  # 豆包流式 ASR
-        self.job_queue: queue.Queue[TranscriptionJob] = queue.Queue()
+        self.siliconflow_processor = siliconflow_processor  # 硅基流动 SenseVoice（故障转移备用）
+        # 批量转录后端，按名称索引
+        self.processors = {
+            name: processor
+            for name, processor in (
+                ("openai", openai_processor),
+                ("local", local_processor),
+                ("siliconflow", siliconflow_processor),
+            )
+            if processor is not None
+        }
+        # 各后端的滚动成功率/延迟与熔断器；主后端熔断时按 FAILOVER_CHAIN 改派
+        self.health = HealthRegistry.from_env()
+        self.failover = FailoverRouter(
+            self.health,
+            parse_chain(os.getenv("FAILOVER_CHAIN", "openai,siliconflow,local")),
+            is_configured=lambda name: name in self.processors,
+            local_to_remote=os.getenv("FAILOVER_LOCAL_TO_REMOTE", "false").lower() == "true",
+        )
+        self._ctrl_f_batch_fallback = False  # 豆包不可用时 Ctrl+F 临时改用批量转录
+        # 对冲请求（默认关闭）：主后端超过 p90 延迟未返回时同时发给备用后端
+        self.hedge_policy = HedgePolicy.from_env()
+        self.hedge_stats = HedgeStats()
         self._current_state = InputState.IDLE
 
         self.status_controller = StatusBarController()
         self.floating_preview = FloatingPreviewWindow()
         self.max_auto_retries = int(os.getenv("AUTO_RETRY_LIMIT", "5"))
+        self.retry_policy = BackoffPolicy.from_env()  # 重试前指数退避 + 抖动
+        self.vad_config = VadConfig.from_env()  # 上传前裁剪首尾静音
+        # 上传格式：auto 按服务商支持的格式优先选择无损压缩（flac），也可指定 wav/flac/ogg/opus
+        self.upload_format = os.getenv("UPLOAD_FORMAT", "auto")
+        self.upload_encoder = UploadEncoder(self.vad_config)
 
         # 转录服务配置: "doubao" (默认，流式) 或 "openai" (批量)
         self.transcription_service = os.getenv("TRANSCRIPTION_SERVICE", "doubao")
@@ -105,13 +148,29 @@ class VoiceAssistant:
         # 设置设备断开时的回调
         self.audio_recorder.set_device_disconnect_callback(self._handle_device_disconnect)
 
-        # 后台转录线程
-        self._worker_thread = threading.Thread(
-            target=self._job_worker,
-            name="transcription-worker",
-            daemon=True,
+        # 并发任务的结果按录音顺序输出；队首任务卡住超过该时间后先输出后面的结果
+        self.delivery = OrderedDelivery(
+            self._type_transcription,
+            hol_timeout=float(os.getenv("DELIVERY_HOL_TIMEOUT", "60")),
+            late_marker=os.getenv("DELIVERY_LATE_MARKER", "[补发] "),
         )
-        self._worker_thread.start()
+
+        # 任务状态写入 audio_archive/jobs.sqlite3，崩溃或重启后恢复未完成的任务
+        self.job_store = JobStore(os.path.join(self.audio_archive.archive_dir, "jobs.sqlite3"))
+        # 按音频内容 + 服务/模型/模式缓存结果，重试和重复提交同一段音频时不再调用 API
+        self.result_cache = None
+        if os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true":
+            self.result_cache = ResultCache.from_env(os.path.join(self.audio_archive.archive_dir, "results.sqlite3"))
+
+        # 后台转录：按通道并发执行（本地 whisper 1 个，远程 API 多个）
+        self.job_scheduler = JobScheduler(
+            self._run_job,
+            lane_of=self._job_lane,
+            on_change=self._notify_status,
+        )
+        # 等待中的重试放在定时器堆里，到期后再提交，不占用工作线程
+        self.retry_scheduler = RetryScheduler(self._submit_job)
+        self._resume_pending_jobs()
 
         # 初始化状态栏显示
         self._notify_status()
@@ -160,7 +219,11 @@ class VoiceAssistant:
         self._notify_status()
 
     def _notify_status(self):
-        queue_length = self.job_queue.qsize()
+        scheduler = getattr(self, "job_scheduler", None)
+        retries = getattr(self, "retry_scheduler", None)
+        queue_length = (scheduler.outstanding if scheduler is not None else 0) + (
+            retries.pending if retries is not None else 0
+        )
         try:
             self.status_controller.update_state(
                 self._current_state,
@@ -169,148 +232,416 @@ class VoiceAssistant:
         except Exception as exc:  # noqa: BLE001
             logger.debug(f"更新状态栏失败: {exc}")
 
-    def _buffer_to_bytes(self, audio_buffer: Optional[io.BytesIO]) -> Optional[bytes]:
-        if audio_buffer is None:
+    def _archive_recording(self, audio) -> Optional[str]:
+        """返回录音在存档中的路径。
+
+        录音器已经边录边写入存档时直接返回文件路径；
+        回退到内存录音（io.BytesIO）时在这里写入存档。
+        """
+        if audio is None:
             return None
+        if isinstance(audio, RecordedAudio):
+            return audio.path
         try:
-            audio_buffer.seek(0)
-            return audio_buffer.read()
+            audio.seek(0)
+            return self.audio_archive.save_audio_bytes(audio.read())
         finally:
             try:
-                audio_buffer.close()
+                audio.close()
             except Exception:
                 pass
 
     def _queue_job(
         self,
-        audio_bytes: bytes,
+        audio_path: str,
         processor: str,
         *,
         mode: str = "transcriptions",
-        archive_path: Optional[str] = None,
         max_retries: int = 0,
         attempt: int = 1,
+        sequence: Optional[int] = None,
+        job_id: Optional[int] = None,
+        delay: float = 0.0,
+        prompt: str = "",
     ) -> None:
+        retries_left = max(0, max_retries)
+        if job_id is None:
+            job_id = self.job_store.add(
+                audio_path, processor, mode=mode, retries_left=retries_left, attempt=attempt, prompt=prompt
+            )
+        else:
+            self.job_store.requeue(job_id, retries_left=retries_left, attempt=attempt)
         job = TranscriptionJob(
-            audio_bytes=audio_bytes,
+            audio_path=audio_path,
             processor=processor,
             mode=mode,
-            archive_path=archive_path,
-            retries_left=max(0, max_retries),
+            retries_left=retries_left,
             attempt=attempt,
+            sequence=self.delivery.next_sequence() if sequence is None else sequence,
+            job_id=job_id,
+            prompt=prompt,
         )
-        self.job_queue.put(job)
         retry_tag = f" [重试 第{attempt}次]" if attempt > 1 else ""
-        logger.info(f"📤 已加入 {processor} 队列 (mode: {mode}){retry_tag}")
-        self._notify_status()
+        if delay > 0:
+            self.retry_scheduler.schedule(job, delay)
+            logger.info(f"⏳ 任务 #{job.sequence} 将在 {delay:.1f} 秒后重试 (processor: {processor}, mode: {mode}){retry_tag}")
+            self._notify_status()
+            return
+        lane = self._submit_job(job)
+        logger.info(f"📤 已加入 {lane} 队列 #{job.sequence} (processor: {processor}, mode: {mode}){retry_tag}")
+
+    def _resume_pending_jobs(self):
+        """重新加入上次退出时仍在排队或执行中的任务"""
+        for stored in self.job_store.outstanding():
+            # 分日期目录之前入队的任务记录的是平铺路径
+            stored.audio_path = self.audio_archive.locate(stored.audio_path)
+            if not os.path.exists(stored.audio_path):
+                logger.warning(f"恢复任务 #{stored.id} 失败，音频文件不存在: {stored.audio_path}")
+                self.job_store.mark_failed(stored.id, "音频文件不存在")
+                continue
+            logger.info(f"♻️ 恢复未完成的任务 #{stored.id}: {stored.audio_path} ({stored.processor}, {stored.state})")
+            self._queue_job(
+                stored.audio_path,
+                stored.processor,
+                mode=stored.mode,
+                max_retries=stored.retries_left,
+                attempt=stored.attempt,
+                job_id=stored.id,
+                prompt=stored.prompt,
+            )
+        self.job_store.prune()
 
-    def _job_worker(self):
-        while True:
-            job = self.job_queue.get()
-            try:
-                self._run_job(job)
-            except Exception as exc:  # noqa: BLE001
-                logger.error(f"转录任务处理失败: {exc}", exc_info=True)
-            finally:
-                self.job_queue.task_done()
-                self._notify_status()
+    def _submit_job(self, job: TranscriptionJob) -> str:
+        """选择后端（主后端熔断时改派）并提交给调度器，返回通道名"""
+        job.backend = self.failover.route(job.processor)
+        return self.job_scheduler.submit(job)
+
+    @staticmethod
+    def _lane_for(backend: str, mode: str) -> str:
+        """按实际后端分通道；远程翻译任务单独一个通道，不和转录抢并发名额"""
+        if backend != "local" and mode == "translations":
+            return "translations"
+        return backend
+
+    @classmethod
+    def _job_lane(cls, job: TranscriptionJob) -> str:
+        return cls._lane_for(job.backend or job.processor, job.mode)
 
     def _run_job(self, job: TranscriptionJob):
+        """执行一个任务；任何意外异常都把任务记为失败，并释放它在输出队列中的位置
+
+        否则调度器只会记录异常，后续所有转录结果都要等到队头超时才会输出。
+        """
+        try:
+            self._process_job(job)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"❌ 任务 #{job.sequence} 处理时发生异常: {exc}", exc_info=True)
+            self.upload_encoder.discard(job.audio_path)
+            self.delivery.fail(job.sequence)
+            try:
+                self.job_store.mark_failed(job.job_id, str(exc))
+            except Exception as store_exc:  # noqa: BLE001
+                logger.error(f"记录任务 #{job.sequence} 失败状态时出错: {store_exc}")
+            self.keyboard_manager.show_error("❌ 自动转录失败")
+            self._notify_status()
+
+    def _process_job(self, job: TranscriptionJob):
+        backend = job.backend or job.processor
         logger.info(
-            "🎧 开始处理音频 (processor=%s, mode=%s, 尝试 %d)",
+            "🎧 开始处理音频 (processor=%s, backend=%s, mode=%s, 尝试 %d)",
             job.processor,
+            backend,
             job.mode,
             job.attempt,
         )
-
-        buffer = io.BytesIO(job.audio_bytes)
-        try:
-            if job.processor == "openai":
-                processor_result = self.openai_processor.process_audio(
-                    buffer,
-                    mode=job.mode,
-                    prompt="",
-                    archive_path=job.archive_path,
-                )
-            elif job.processor == "local":
-                processor_result = self.local_processor.process_audio(
-                    buffer,
-                    mode=job.mode,
-                    prompt="",
-                    archive_path=job.archive_path,
-                )
+        self.job_store.mark_running(job.job_id)
+        # 内存录音由存档后台线程写盘（先写 .part 再改名），读取前确认已写完
+        written = self.audio_archive.wait_until_written(job.audio_path, timeout=30)
+        if not os.path.exists(job.audio_path):
+            if written:
+                error = FileNotFoundError(f"存档录音不存在（写盘失败）: {job.audio_path}")
             else:
-                raise ValueError(f"未知的处理器: {job.processor}")
-        except Exception as exc:  # noqa: BLE001
-            logger.error(f"{job.processor} 转录发生异常: {exc}", exc_info=True)
-            self._handle_transcription_failure(job, str(exc))
+                error = TimeoutError(f"存档录音 30 秒内未写完: {job.audio_path}")
+            self._handle_transcription_failure(job, error)
             return
-        finally:
-            try:
-                buffer.close()
-            except Exception:
-                pass
 
-        text, error = (
-            processor_result
-            if isinstance(processor_result, tuple)
-            else (processor_result, None)
-        )
+        audio_hash = self._audio_fingerprint(job)
+        text = self._cached_result(job, audio_hash)
+        if text is None:
+            secondary = self._hedge_backend(job, backend)
+            if secondary is None:
+                text, error = self._call_and_record(backend, job)
+            else:
+                text, error = self._call_hedged(job, backend, secondary)
 
-        if error:
-            logger.error(f"{job.processor} 转录失败: {error}")
-            self._handle_transcription_failure(job, str(error))
-            return
+            if error:
+                if not self._defer_while_circuit_open(job, error):
+                    self._handle_transcription_failure(job, error)
+                return
+            self._store_cached_result(job, audio_hash, text)
 
         service, model = self._get_job_cache_metadata(job)
         self._save_transcription_cache(
-            job.archive_path,
+            job.audio_path,
             text,
             service=service,
             model=model,
             mode=job.mode,
+            audio_hash=audio_hash,
+        )
+        self.upload_encoder.discard(job.audio_path)
+        self.job_store.mark_done(job.job_id)
+        self.delivery.complete(job.sequence, text)
+        served = f", 由 {backend} 代为处理" if backend != job.processor else ""
+        logger.info(f"✅ 转录成功 #{job.sequence} (尝试 {job.attempt}{served})")
+        self._notify_status()
+
+    def _audio_fingerprint(self, job: TranscriptionJob) -> Optional[str]:
+        if self.result_cache is None:
+            return None
+        try:
+            return audio_fingerprint(job.audio_path)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"计算音频哈希失败，跳过结果缓存: {exc}")
+            return None
+
+    def _result_cache_key(self, job: TranscriptionJob, audio_hash: str) -> str:
+        service, model = self._get_job_cache_metadata(job)
+        return cache_key(audio_hash, service, model, job.mode, job.prompt)
+
+    def _cached_result(self, job: TranscriptionJob, audio_hash: Optional[str]) -> Optional[str]:
+        if audio_hash is None:
+            return None
+        text = self.result_cache.get(self._result_cache_key(job, audio_hash))
+        if text is not None:
+            stats = self.result_cache.stats()
+            logger.info(f"♻️ 命中结果缓存 #{job.sequence} (命中率 {stats['hit_rate']:.0%}, 共 {stats['entries']} 条)")
+        return text
+
+    def _store_cached_result(self, job: TranscriptionJob, audio_hash: Optional[str], text: str) -> None:
+        if audio_hash is None or not text:
+            return
+        service, model = self._get_job_cache_metadata(job)
+        try:
+            self.result_cache.put(
+                self._result_cache_key(job, audio_hash),
+                text,
+                audio_hash=audio_hash,
+                service=service,
+                model=model,
+                mode=job.mode,
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"写入结果缓存失败: {exc}")
+
+    def _call_and_record(self, backend: str, job: TranscriptionJob, token: Optional[CancelToken] = None):
+        """调用后端并把结果计入其健康统计，返回 (文本, 错误)"""
+        health = self.health.get(backend)
+        if not health.allow_request():
+            # 派发后才熔断：不发请求，直接按可重试错误处理，重试时重新选择后端
+            return None, CircuitOpenError(f"{backend} 熔断中")
+
+        started = time.monotonic()
+        try:
+            text, error = self._call_backend(backend, job, token)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"{backend} 转录发生异常: {exc}", exc_info=True)
+            text, error = None, exc
+        latency = time.monotonic() - started
+
+        if token is not None and token.cancelled:
+            # 对冲落败被取消：不代表后端健康状况
+            logger.info(f"🛑 {backend} 请求已取消 (对冲落败)")
+            health.release()
+            return None, OperationCancelled(f"{backend} 请求已取消")
+        if error:
+            logger.error(f"{backend} 转录失败: {error}")
+            self._record_backend_failure(health, error, latency)
+        else:
+            health.record_success(latency)
+        return text, error
+
+    def _hedge_backend(self, job: TranscriptionJob, backend: str) -> Optional[str]:
+        """选择对冲用的备用后端；不满足条件时返回 None
+
+        只对远程任务的短语音对冲（Ctrl+I 明确选择了本地处理，不发往远程），
+        备用后端取故障转移链中第一个健康且通道有空闲名额的后端；
+        真正发出备用请求时再占用该通道的名额（见 _call_hedged）。
+        """
+        if not self.hedge_policy.enabled or job.processor == "local":
+            return None
+        try:
+            duration = sf.info(job.audio_path).duration
+        except Exception:  # noqa: BLE001
+            return None
+        if duration > self.hedge_policy.max_audio_seconds:
+            return None
+        for name in self.failover.chain:
+            if name == backend or name not in self.processors:
+                continue
+            lane = self._lane_for(name, job.mode)
+            if self.health.get(name).is_available() and self.job_scheduler.has_capacity(lane):
+                return name
+        return None
+
+    def _call_hedged(self, job: TranscriptionJob, backend: str, secondary: str):
+        delay = self.hedge_policy.delay_for(self.health.get(backend).latency)
+
+        def on_primary_late(saved: float):
+            self.hedge_stats.record_saved(saved)
+            logger.info(f"⏱️ 对冲节省 {saved:.1f} 秒 ({backend} 落后于 {secondary})")
+
+        def reserve_secondary():
+            # 备用请求在对冲线程中执行，占用备用后端通道的名额，不超过通道并发上限（如 local 为 1）
+            lane = self._lane_for(secondary, job.mode)
+            if not self.job_scheduler.try_reserve(lane):
+                return None
+            return lambda: self.job_scheduler.release(lane)
+
+        outcome = run_hedged(
+            lambda token: self._call_and_record(backend, job, token),
+            lambda token: self._call_and_record(secondary, job, token),
+            delay,
+            reserve_secondary=reserve_secondary,
+            cancel_loser=self.hedge_policy.cancel_loser,
+            on_primary_late=on_primary_late,
+        )
+        if outcome.hedged:
+            self.hedge_stats.record_hedge()
+            if not outcome.error:
+                winner = backend if outcome.winner == PRIMARY else secondary
+                job.backend = winner
+                self.hedge_stats.record_win(winner)
+                logger.info(f"🏁 对冲: {winner} 先返回 ({outcome.latency:.1f}秒，等待阈值 {delay:.1f}秒)")
+        return outcome.text, outcome.error
+
+    def _call_backend(self, backend: str, job: TranscriptionJob, token: Optional[CancelToken] = None):
+        """用指定后端处理任务，返回 (文本, 错误)"""
+        processor = self.processors.get(backend)
+        if processor is None:
+            raise ConfigurationError(f"未知的处理器: {backend}")
+
+        buffer = None
+        try:
+            if hasattr(processor, "UPLOAD_FORMATS"):
+                # 远程 API：裁剪 + 编码结果按音频路径缓存，重试时直接复用
+                upload_format = choose_upload_format(processor.UPLOAD_FORMATS, self.upload_format)
+                audio = self.upload_encoder.prepare(job.audio_path, upload_format)
+            else:
+                audio = buffer = self._open_job_audio(job.audio_path)
+            processor_result = processor.process_audio(
+                audio,
+                mode=job.mode,
+                prompt=job.prompt,
+                archive_path=job.audio_path,
+                cancel_token=token,
+            )
+        finally:
+            if buffer is not None:
+                buffer.close()
+
+        if isinstance(processor_result, tuple):
+            return processor_result
+        return processor_result, None
+
+    @staticmethod
+    def _record_backend_failure(health, error, latency: float):
+        """本地原因（文件不存在、参数错误）导致的失败不计入后端健康统计"""
+        info = classify_error(error)
+        if info.kind is ErrorKind.CLIENT and info.status is None:
+            health.release()
+            return
+        health.record_failure(latency)
+
+    def _type_transcription(self, text: str):
+        self.keyboard_manager.type_text(text, None)
+
+    def _open_job_audio(self, audio_path: str):
+        """打开要交给本地 whisper 的音频：启用 VAD 时使用裁掉首尾静音的版本，存档保留原始录音。
+
+        不需要裁剪时直接打开存档文件：whisper-cli 和 whisper-server 都能直接读取 FLAC，
+        路径原样交给它们，不在内存中解码出一份 WAV。
+        """
+        try:
+            trimmed = trim_silence_file(audio_path, self.vad_config)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"VAD 裁剪失败，使用原始音频: {exc}")
+            trimmed = None
+        return trimmed if trimmed is not None else open(audio_path, "rb")
+
+    def _defer_while_circuit_open(self, job: TranscriptionJob, error) -> bool:
+        """熔断时请求没有发出，且没有其他后端可以接手：推迟任务，等冷却结束后的半开探测
+
+        不消耗重试次数（Ctrl+I 本地任务没有重试次数，否则整个冷却期间的任务都会直接失败）。
+        """
+        if not isinstance(error, CircuitOpenError):
+            return False
+        health = self.health.get(job.processor)
+        if health.is_available() or self.failover.alternative(job.processor) is not None:
+            return False
+        delay = health.retry_after()
+        logger.warning(f"⏸️ {job.processor} 熔断中，任务 #{job.sequence} 推迟 {delay:.1f} 秒后再派发")
+        self._queue_job(
+            job.audio_path,
+            job.processor,
+            mode=job.mode,
+            max_retries=job.retries_left,
+            attempt=job.attempt,
+            sequence=job.sequence,
+            job_id=job.job_id,
+            delay=delay,
+            prompt=job.prompt,
         )
-        self.keyboard_manager.type_text(text, error)
-        logger.info(f"✅ 转录成功 (尝试 {job.attempt})")
         self._notify_status()
+        return True
 
-    def _handle_transcription_failure(self, job: TranscriptionJob, error_message: str):
-        if job.retries_left > 0:
+    def _handle_transcription_failure(self, job: TranscriptionJob, error):
+        error_info = classify_error(error)
+        if job.retries_left > 0 and error_info.retryable:
+            delay = self.retry_policy.delay(job.attempt, error_info)
             logger.warning(
-                "⚠️ %s 转录失败 (尝试 %d)，将在 %d 次内自动重试",
+                "⚠️ %s 转录失败 (尝试 %d, %s)，%.1f 秒后自动重试，剩余 %d 次",
                 job.processor,
                 job.attempt,
+                error_info.kind.value,
+                delay,
                 job.retries_left,
             )
-            self._schedule_retry(job)
+            self._schedule_retry(job, delay)
             self._notify_status()
             return
 
+        self.upload_encoder.discard(job.audio_path)
+        self.job_store.mark_failed(job.job_id, str(error))
+        self.delivery.fail(job.sequence)
+        if error_info.retryable:
+            reason = "自动重试已用尽"
+        else:
+            reason = f"不可重试的错误 ({error_info.kind.value}{f' {error_info.status}' if error_info.status else ''})"
         logger.error(
-            "❌ %s 转录失败 (尝试 %d)，自动重试已用尽: %s",
+            "❌ %s 转录失败 (尝试 %d)，%s: %s",
             job.processor,
             job.attempt,
-            error_message,
+            reason,
+            error,
         )
         self.keyboard_manager.show_error("❌ 自动转录失败")
         self._notify_status()
 
-    def _schedule_retry(self, job: TranscriptionJob):
+    def _schedule_retry(self, job: TranscriptionJob, delay: float = 0.0):
         next_retries = max(0, job.retries_left - 1)
         self._queue_job(
-            job.audio_bytes,
+            job.audio_path,
             job.processor,
             mode=job.mode,
-            archive_path=job.archive_path,
             max_retries=next_retries,
             attempt=job.attempt + 1,
+            sequence=job.sequence,
+            job_id=job.job_id,
+            delay=delay,
+            prompt=job.prompt,
         )
 
-    def _archive_audio_bytes(self, audio_bytes: Optional[bytes]) -> Optional[str]:
-        if not audio_bytes:
-            return None
-        return self.audio_archive.save_audio_bytes(audio_bytes)
-
     def _save_transcription_cache(
         self,
         archive_path: Optional[str],
@@ -319,6 +650,7 @@ class VoiceAssistant:
         service: str,
         model: str,
         mode: str = "transcriptions",
+        audio_hash: Optional[str] = None,
     ) -> None:
         if not archive_path or not transcription_result:
             return
@@ -328,20 +660,24 @@ class VoiceAssistant:
             service=service,
             model=model,
             mode=mode,
+            audio_hash=audio_hash,
         )
 
     def _get_job_cache_metadata(self, job: TranscriptionJob) -> tuple[str, str]:
-        if job.processor == "openai":
-            service = getattr(self.openai_processor, "service_platform", "openai")
-            model = getattr(self.openai_processor, "DEFAULT_MODEL", "unknown") or "unknown"
-            return service, model
-
-        if job.processor == "local":
-            model_path = getattr(self.local_processor, "model_path", "")
+        """记录实际处理任务的后端（可能是故障转移后的备用后端）"""
+        backend = job.backend or job.processor
+        processor = self.processors.get(backend)
+        if backend == "local":
+            model_path = getattr(processor, "model_path", "")
             model = os.path.basename(model_path) if model_path else "whisper.cpp"
             return "local", model
 
-        return job.processor, "unknown"
+        if processor is not None:
+            service = getattr(processor, "service_platform", backend)
+            model = getattr(processor, "DEFAULT_MODEL", "unknown") or "unknown"
+            return service, model
+
+        return backend, "unknown"
 
     def start_openai_recording(self):
         """开始录音（OpenAI GPT-4o transcribe模式 - Ctrl+F）"""
@@ -355,17 +691,15 @@ class VoiceAssistant:
             self.keyboard_manager.reset_state()
             return
 
-        audio_bytes = self._buffer_to_bytes(audio)
-        if not audio_bytes:
+        audio_path = self._archive_recording(audio)
+        if not audio_path:
             logger.error("没有录音数据，状态将重置")
             self.keyboard_manager.reset_state()
             return
 
-        archive_path = self._archive_audio_bytes(audio_bytes)
         self._queue_job(
-            audio_bytes,
+            audio_path,
             "openai",
-            archive_path=archive_path,
             max_retries=self.max_auto_retries,
         )
 
@@ -387,14 +721,13 @@ class VoiceAssistant:
             self.keyboard_manager.reset_state()
             return
 
-        audio_bytes = self._buffer_to_bytes(audio)
-        if not audio_bytes:
+        audio_path = self._archive_recording(audio)
+        if not audio_path:
             logger.error("没有录音数据，状态将重置")
             self.keyboard_manager.reset_state()
             return
 
-        archive_path = self._archive_audio_bytes(audio_bytes)
-        self._queue_job(audio_bytes, "local", archive_path=archive_path)
+        self._queue_job(audio_path, "local")
 
     def start_translation_recording(self):
         """开始录音（翻译模式）"""
@@ -408,18 +741,16 @@ class VoiceAssistant:
             self.keyboard_manager.reset_state()
             return
 
-        audio_bytes = self._buffer_to_bytes(audio)
-        if not audio_bytes:
+        audio_path = self._archive_recording(audio)
+        if not audio_path:
             logger.error("没有录音数据，状态将重置")
             self.keyboard_manager.reset_state()
             return
 
-        archive_path = self._archive_audio_bytes(audio_bytes)
         self._queue_job(
-            audio_bytes,
+            audio_path,
             "openai",
             mode="translations",
-            archive_path=archive_path,
             max_retries=self.max_auto_retries,
         )
 
@@ -427,12 +758,20 @@ class VoiceAssistant:
         """开始豆包流式识别"""
         if self.doubao_processor is None or not self.doubao_processor.is_available():
             logger.warning("豆包流式识别不可用，回退到 OpenAI 模式")
+            self._ctrl_f_batch_fallback = True
+            self.start_openai_recording()
+            return
+        if not self.health.get("doubao").allow_request():
+            logger.warning("豆包流式识别熔断中，本次改用批量转录")
+            self._ctrl_f_batch_fallback = True
             self.start_openai_recording()
             return
+        self._ctrl_f_batch_fallback = False
 
         # 启动流式录音（recorder 内部会处理残留状态）
         error = self.audio_recorder.start_streaming_recording()
         if error:
+            self.health.get("doubao").release()
             logger.error(f"启动流式录音失败: {error}")
             self.keyboard_manager.reset_state()
             return
@@ -467,6 +806,14 @@ class VoiceAssistant:
     async def _run_doubao_streaming(self):
         """运行豆包流式转录"""
         logger.info("🎤 开始豆包流式转录...")
+        doubao_health = self.health.get("doubao")
+        started = time.monotonic()
+        session = {"failed": False}  # on_error 可能被调用多次，每次会话只计一次结果
+
+        def record_failure():
+            if not session["failed"]:
+                session["failed"] = True
+                doubao_health.record_failure()
 
         # 显示浮动预览窗口
         self.floating_preview.show()
@@ -491,6 +838,8 @@ class VoiceAssistant:
         def on_complete():
             """转录完成"""
             logger.info("✅ 豆包流式转录完成")
+            if not session["failed"]:
+                doubao_health.record_success(time.monotonic() - started)
             self.floating_preview.hide()
             # 不在这里 stop_streaming_recording——按键 / auto_stop / disconnect 路径
             # 已经负责把 recording 翻 False 并把 stream 关掉，重复调会和按键线程争锁
@@ -499,6 +848,7 @@ class VoiceAssistant:
         def on_error(error: str):
             """发生错误"""
             logger.error(f"❌ 豆包流式转录错误: {error}")
+            record_failure()
             self.floating_preview.hide()
             self.audio_recorder.reset_streaming_state(reason=f"豆包流式错误: {error}")
             self.keyboard_manager.reset_state()
@@ -514,18 +864,21 @@ class VoiceAssistant:
                 sample_rate=16000,
             )
         except Exception as exc:
+            record_failure()
             self.audio_recorder.reset_streaming_state(reason=f"豆包流式运行异常: {exc}")
             self.keyboard_manager.reset_state()
             raise
 
     def stop_doubao_streaming(self):
         """停止豆包流式识别"""
+        if self._ctrl_f_batch_fallback:
+            self._ctrl_f_batch_fallback = False
+            self.stop_openai_recording()
+            return
         logger.info("🛑 停止豆包流式转录...")
         self.floating_preview.hide()
         audio = self.audio_recorder.stop_streaming_recording()
-        audio_bytes = self._buffer_to_bytes(audio)
-        if audio_bytes:
-            self._current_streaming_archive_path = self._archive_audio_bytes(audio_bytes)
+        self._current_streaming_archive_path = self._archive_recording(audio)
 
     def reset_state(self):
         """重置状态"""
@@ -583,13 +936,21 @@ def main():
             logger.warning("豆包流式 ASR 不可用（未配置 API Key），将使用 OpenAI 作为默认转录服务")
             doubao_processor = None
 
+        # 创建硅基流动处理器（可选，作为故障转移的备用后端）
+        siliconflow_processor = None
+        if os.getenv("SILICONFLOW_API_KEY"):
+            try:
+                siliconflow_processor = SenseVoiceSmallProcessor()
+            except (AssertionError, ValueError) as e:
+                logger.warning(f"硅基流动 SenseVoice 不可用，故障转移链将跳过它: {e}")
+
         # 恢复原始环境变量
         if original_platform:
             os.environ["SERVICE_PLATFORM"] = original_platform
         else:
             os.environ.pop("SERVICE_PLATFORM", None)
 
-        assistant = VoiceAssistant(openai_processor, local_processor, doubao_processor)
+        assistant = VoiceAssistant(openai_processor, local_processor, doubao_processor, siliconflow_processor)
         assistant.run()
     except Exception as e:
         error_msg = str(e)
@@ -1,26 +1,135 @@
+import atexit
+import io
 import os
-import json
+import queue
+import re
 import shutil
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 from ..utils.logger import logger
+from .encoding import transcode_to_flac
+from .retention import ArchiveJanitor, RetentionPolicy
+from .transcription_store import SearchHit, TranscriptionStore
+
+# 旧版存档目录迁移完成后写入的标记文件，之后启动不再扫描存档根目录
+# v2：audio/ 下的录音按 YYYY/MM/DD 分目录
+MIGRATION_MARKER = ".layout_v2"
+
+_NAME_DATE = re.compile(r"_(\d{8})_\d{6}")
+
+# ARCHIVE_AUDIO_FORMAT 可选的存档格式
+ARCHIVE_FORMATS = ("flac", "wav")
+
+
+def _shard_path(audio_dir: str, day: str) -> str:
+    """YYYYMMDD -> audio/YYYY/MM/DD"""
+    return os.path.join(audio_dir, day[:4], day[4:6], day[6:8])
+
+
+def _name_day(filename: str) -> Optional[str]:
+    """文件名中的录音日期 YYYYMMDD；没有或不合法时返回 None"""
+    match = _NAME_DATE.search(os.path.basename(filename))
+    if not match:
+        return None
+    try:
+        datetime.strptime(match.group(1), "%Y%m%d")
+    except ValueError:
+        return None
+    return match.group(1)
+
+
+def locate_audio(audio_dir: str, archive_path: str) -> str:
+    """旧路径对应的当前路径（分目录之前的平铺路径、已压缩为 FLAC 的 WAV）；找不到时原样返回"""
+    if os.path.exists(archive_path):
+        return archive_path
+    name = os.path.basename(archive_path)
+    day = _name_day(name)
+    directories = [os.path.dirname(archive_path)] + ([_shard_path(audio_dir, day)] if day else [])
+    names = [name, os.path.splitext(name)[0] + ".flac"]
+    for directory in directories:
+        for candidate_name in names:
+            candidate = os.path.join(directory, candidate_name)
+            if os.path.exists(candidate):
+                return candidate
+    return archive_path
+
+
+def resolve_hits(audio_dir: str, hits: List[SearchHit]) -> List[SearchHit]:
+    """把检索结果的 audio_path 换成当前路径；没有记录路径的旧条目按文件名查找，录音已不存在时为 None"""
+    for hit in hits:
+        path = locate_audio(audio_dir, hit.audio_path or os.path.join(audio_dir, hit.filename))
+        hit.audio_path = path if os.path.exists(path) else None
+    return hits
 
 
 class AudioArchiveManager:
-    def __init__(self, archive_dir: str = "audio_archive"):
+    def __init__(
+        self,
+        archive_dir: str = "audio_archive",
+        retention: Optional[RetentionPolicy] = None,
+        audio_format: Optional[str] = None,
+    ):
         self.archive_dir = archive_dir
         self.audio_dir = os.path.join(self.archive_dir, "audio")
         self.ensure_directory()
 
+        # 录音默认以 FLAC 存档（无损，约为 WAV 的一半大小），读取时由 soundfile 透明解码
+        self.audio_format = (audio_format or os.getenv("ARCHIVE_AUDIO_FORMAT", "flac")).lower()
+        if self.audio_format not in ARCHIVE_FORMATS:
+            logger.warning(f"不支持的存档格式 {self.audio_format}，改用 flac")
+            self.audio_format = "flac"
+
+        # 文件名 = 时间戳 + 进程内递增序号，分配时不访问磁盘；日期目录每天只创建一次
+        self._name_lock = threading.Lock()
+        self._startup_stamp = self._timestamp()
+        self._last_stamp = ""
+        self._sequence = 0
+        self._day_dir = self._shard_dir(self._startup_stamp[:8])
+        os.makedirs(self._day_dir, exist_ok=True)
+
+        # 内存录音由后台线程写盘，停止录音的调用路径不做同步文件 I/O
+        self._writes: "queue.Queue" = queue.Queue()
+        self._pending: Dict[str, threading.Event] = {}
+        self._pending_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name="archive-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+        # 转录结果存放在 transcriptions.sqlite3，旧的 cache.json 在首次启动时导入
+        self.transcriptions = TranscriptionStore(os.path.join(self.archive_dir, "transcriptions.sqlite3"))
+        self.transcriptions.migrate_from_json(os.path.join(self.archive_dir, "cache.json"))
+
+        # 保留策略（默认不清理），后台线程按日期从旧到新逐批删除录音，
+        # 存档格式为 flac 时顺带把已转录的旧 WAV 录音压缩为 FLAC
+        policy = retention or RetentionPolicy.from_env()
+        policy.compress_wav = policy.compress_wav and self.audio_format == "flac"
+        self.janitor = ArchiveJanitor(
+            self.audio_dir,
+            policy,
+            is_transcribed=self.transcriptions.has,
+            on_evict=self.transcriptions.mark_evicted,
+            on_compact=self._on_compacted,
+        )
+        self.janitor.start()
+
     def ensure_directory(self) -> None:
+        """创建存档目录，并执行一次旧版目录结构迁移（完成后写入标记文件）"""
         if not os.path.exists(self.archive_dir):
             os.makedirs(self.archive_dir)
             logger.info(f"创建音频存档目录: {self.archive_dir}")
         if not os.path.exists(self.audio_dir):
             os.makedirs(self.audio_dir)
             logger.info(f"创建音频文件目录: {self.audio_dir}")
+
+        marker = os.path.join(self.archive_dir, MIGRATION_MARKER)
+        if os.path.exists(marker):
+            return
         self._migrate_legacy_archive_entries()
+        self._shard_flat_audio()
+        with open(marker, "w", encoding="utf-8") as marker_file:
+            marker_file.write(datetime.now().isoformat())
 
     def _build_unique_path(self, directory: str, filename: str) -> str:
         name, ext = os.path.splitext(filename)
@@ -35,7 +144,8 @@ class AudioArchiveManager:
 
     def _migrate_legacy_archive_entries(self) -> None:
         for entry in os.listdir(self.archive_dir):
-            if entry in {"cache.json", "audio", "transcribe"}:
+            # SQLite 数据库及其 -wal/-shm 文件留在存档根目录
+            if entry in {"audio", "transcribe"} or entry.startswith((".layout_", "cache.json")) or ".sqlite3" in entry:
                 continue
 
             source_path = os.path.join(self.archive_dir, entry)
@@ -62,48 +172,131 @@ class AudioArchiveManager:
                     shutil.move(source_path, target_path)
                 logger.info(f"迁移归档目录到子目录: {target_path}")
 
+    def _shard_dir(self, day: str) -> str:
+        return _shard_path(self.audio_dir, day)
+
+    def _shard_for(self, path: str) -> str:
+        """按文件名中的日期（没有时按修改时间）确定日期目录"""
+        day = _name_day(path) or datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y%m%d")
+        return self._shard_dir(day)
+
+    def _shard_flat_audio(self) -> None:
+        """把 audio/ 下平铺的旧录音移到日期目录（子目录保持不动）"""
+        moved = 0
+        for entry in os.scandir(self.audio_dir):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            shard = self._shard_for(entry.path)
+            os.makedirs(shard, exist_ok=True)
+            shutil.move(entry.path, self._build_unique_path(shard, entry.name))
+            moved += 1
+        if moved:
+            logger.info(f"已将 {moved} 个录音移入日期目录: {self.audio_dir}")
+
+    def locate(self, archive_path: str) -> str:
+        return locate_audio(self.audio_dir, archive_path)
+
+    def search(self, query: Optional[str] = None, **filters) -> List[SearchHit]:
+        """全文检索转录记录（参数同 TranscriptionStore.search），audio_path 指向当前的录音文件"""
+        return resolve_hits(self.audio_dir, self.transcriptions.search(query, **filters))
+
+    def _on_compacted(self, wav_path: str, flac_path: str) -> None:
+        """旧 WAV 已压缩为 FLAC：转录记录改用新文件名"""
+        self.transcriptions.rename(
+            os.path.basename(wav_path), os.path.basename(flac_path), audio_path=os.path.abspath(flac_path)
+        )
+
+    @staticmethod
+    def _timestamp() -> str:
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    def new_audio_path(self, prefix: str = "recording", ext: Optional[str] = None) -> str:
+        """返回一个尚未被占用的存档音频路径（录音边录边写时使用），位于当天的 YYYY/MM/DD 目录。
+
+        同一秒内的录音依次加 _1、_2 后缀；时钟回拨时沿用上一个时间戳继续编号，
+        保证文件名单调递增。只有进程启动的那一秒可能与上次运行的文件重名，才检查磁盘。
+        """
+        ext = ext or f".{self.audio_format}"
+        with self._name_lock:
+            stamp = self._timestamp()
+            if stamp > self._last_stamp:
+                if stamp[:8] != self._last_stamp[:8]:
+                    self._day_dir = self._shard_dir(stamp[:8])
+                    if stamp[:8] != self._startup_stamp[:8]:
+                        os.makedirs(self._day_dir, exist_ok=True)
+                self._last_stamp, self._sequence = stamp, 0
+            while True:
+                sequence = self._sequence
+                self._sequence += 1
+                suffix = f"_{sequence}" if sequence else ""
+                archive_path = os.path.join(self._day_dir, f"{prefix}_{self._last_stamp}{suffix}{ext}")
+                if self._last_stamp != self._startup_stamp or not os.path.exists(archive_path):
+                    return archive_path
+
     def save_audio_bytes(self, audio_bytes: bytes, prefix: str = "recording") -> Optional[str]:
+        """分配存档路径并交给后台线程写盘，立即返回路径
+
+        audio_bytes 是 WAV 数据；存档格式为 flac 时由后台线程转码。
+        读取该文件前先调用 wait_until_written(path)。
+        """
         if not audio_bytes:
             return None
 
-        self.ensure_directory()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        base_name = f"{prefix}_{timestamp}"
-        archive_path = os.path.join(self.audio_dir, f"{base_name}.wav")
-        suffix = 1
+        archive_path = self.new_audio_path(prefix)
+        done = threading.Event()
+        with self._pending_lock:
+            self._pending[archive_path] = done
+        self._writes.put((archive_path, audio_bytes, done))
+        return archive_path
 
-        while os.path.exists(archive_path):
-            archive_path = os.path.join(self.audio_dir, f"{base_name}_{suffix}.wav")
-            suffix += 1
+    def _write_loop(self) -> None:
+        while True:
+            archive_path, audio_bytes, done = self._writes.get()
+            try:
+                # 先写临时文件再改名，读取方不会看到写了一半的文件
+                partial_path = archive_path + ".part"
+                if archive_path.endswith(".flac"):
+                    transcode_to_flac(io.BytesIO(audio_bytes), partial_path)
+                else:
+                    with open(partial_path, "wb") as archive_file:
+                        archive_file.write(audio_bytes)
+                os.replace(partial_path, archive_path)
+                logger.info(f"音频文件已保存到存档: {archive_path}")
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"保存音频文件到存档失败: {exc}")
+                try:
+                    os.remove(archive_path + ".part")
+                except OSError:
+                    pass
+            finally:
+                with self._pending_lock:
+                    self._pending.pop(archive_path, None)
+                done.set()
 
-        try:
-            with open(archive_path, "wb") as archive_file:
-                archive_file.write(audio_bytes)
-            logger.info(f"音频文件已保存到存档: {archive_path}")
-            return archive_path
-        except Exception as exc:  # noqa: BLE001
-            logger.error(f"保存音频文件到存档失败: {exc}")
-            return None
+    def wait_until_written(self, archive_path: str, timeout: Optional[float] = None) -> bool:
+        """等待后台写盘完成；路径不在写入队列中时立即返回 True"""
+        with self._pending_lock:
+            done = self._pending.get(archive_path)
+        return True if done is None else done.wait(timeout)
 
-    def load_transcription_cache(self) -> dict:
-        cache_path = os.path.join(self.archive_dir, "cache.json")
-        if not os.path.exists(cache_path):
-            return {}
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """等待所有排队中的写入完成（退出时调用）"""
+        with self._pending_lock:
+            pending = list(self._pending.values())
+        return all(done.wait(timeout) for done in pending)
 
+    def load_transcription_cache(self) -> dict:
+        """全部转录记录，格式与旧的 cache.json 相同（文件名 -> 条目）"""
         try:
-            with open(cache_path, "r", encoding="utf-8") as cache_file:
-                return json.load(cache_file)
+            return self.transcriptions.as_dict()
         except Exception as exc:  # noqa: BLE001
             logger.warning(f"加载转录缓存失败: {exc}")
             return {}
 
     def save_transcription_cache(self, cache_data: dict) -> None:
-        self.ensure_directory()
-        cache_path = os.path.join(self.archive_dir, "cache.json")
+        """批量写入 cache.json 格式的记录"""
         try:
-            with open(cache_path, "w", encoding="utf-8") as cache_file:
-                json.dump(cache_data, cache_file, ensure_ascii=False, indent=2)
-            logger.info(f"转录缓存已保存: {cache_path}")
+            self.transcriptions.put_many(cache_data.items())
         except Exception as exc:  # noqa: BLE001
             logger.error(f"保存转录缓存失败: {exc}")
 
@@ -115,17 +308,21 @@ class AudioArchiveManager:
         service: str,
         model: str,
         mode: str = "transcriptions",
+        audio_hash: Optional[str] = None,
     ) -> None:
         if not archive_path or not transcription_result:
             return
 
-        audio_filename = os.path.basename(archive_path)
-        cache = self.load_transcription_cache()
-        cache[audio_filename] = {
-            "transcription": transcription_result,
-            "service": service,
-            "model": model,
-            "mode": mode,
-            "timestamp": datetime.now().isoformat(),
-        }
-        self.save_transcription_cache(cache)
+        try:
+            self.transcriptions.put(
+                os.path.basename(archive_path),
+                transcription_result,
+                service=service,
+                model=model,
+                mode=mode,
+                audio_hash=audio_hash,
+                audio_path=os.path.abspath(archive_path),
+            )
+            logger.info(f"转录结果已保存: {os.path.basename(archive_path)}")
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"保存转录结果失败: {exc}")
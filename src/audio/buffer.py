@@ -0,0 +1,139 @@
+"""录音采样缓冲区
+
+用一块预分配的连续数组承接 PortAudio 回调写入的音频块，替代
+「每个回调 copy 一次 + 停止时 np.concatenate」的列表方案：
+
+- 回调里只做一次切片赋值，不再为每个音频块分配新的采样内存
+- 停止录音时直接返回已写入部分的视图，不需要拼接
+- np.empty 只申请虚拟内存，物理页在真正写入时才会被占用，
+  因此按最大录音时长预分配也不会让短录音多占 RSS
+- 支持 int16 采集：内存减半，PCM 输出不需要缩放，只有重采样等
+  需要浮点的环节才通过 to_float32() 转换
+"""
+
+import numpy as np
+
+CAPTURE_DTYPES = ("float32", "int16")
+PCM16_SCALE = 32768.0
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """把采样转换为 [-1, 1) 的 float32；本身就是 float32 时原样返回。"""
+    if samples.dtype == np.int16:
+        return samples.astype(np.float32) / PCM16_SCALE
+    return np.asarray(samples, dtype=np.float32)
+
+
+def to_pcm16(samples: np.ndarray) -> np.ndarray:
+    """把采样转换为 int16 PCM；本身就是 int16 时原样返回。"""
+    if samples.dtype == np.int16:
+        return samples
+    scaled = np.clip(samples * 32767, -32768, 32767)
+    return scaled.astype(np.int16)
+
+
+class SampleBuffer:
+    """单声道、可增长的连续采样缓冲区。"""
+
+    GROWTH_FACTOR = 1.5
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        self._data = np.empty(max(1, int(capacity)), dtype=dtype)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def capacity(self) -> int:
+        return len(self._data)
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def _grow(self, required: int) -> None:
+        new_capacity = max(required, int(len(self._data) * self.GROWTH_FACTOR))
+        new_data = np.empty(new_capacity, dtype=self._data.dtype)
+        new_data[:self._length] = self._data[:self._length]
+        # 旧数组上已经交出去的视图仍然有效，只是不会再看到新写入的数据
+        self._data = new_data
+
+    def append(self, block: np.ndarray) -> np.ndarray:
+        """写入一个音频块，返回缓冲区中对应区段的视图。
+
+        Args:
+            block: 形状为 (frames,) 或 (frames, channels) 的数组，多声道时只取第一个声道
+        """
+        if block.ndim > 1:
+            block = block[:, 0]
+        frames = len(block)
+        end = self._length + frames
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._length:end] = block
+        written = self._data[self._length:end]
+        self._length = end
+        return written
+
+    def view(self) -> np.ndarray:
+        """返回已写入采样的只读视图（不拷贝）。"""
+        audio = self._data[:self._length]
+        audio.flags.writeable = False
+        return audio
+
+    def clear(self) -> None:
+        self._length = 0
+
+
+def create_sample_buffer(sample_rate: int, max_duration: float, dtype=np.float32,
+                         headroom: float = 1.0) -> SampleBuffer:
+    """按「采样率 × 最大时长」预分配缓冲区。
+
+    headroom 用于容纳自动停止定时器触发前多写入的几个回调块。
+    """
+    capacity = int(sample_rate * (max_duration + headroom))
+    return SampleBuffer(capacity, dtype=dtype)
+
+
+class PrerollRing:
+    """固定容量的环形缓冲，只保留最近写入的 capacity 个采样（用于预录）。"""
+
+    def __init__(self, capacity: int, dtype=np.float32):
+        self._data = np.zeros(max(1, int(capacity)), dtype=dtype)
+        self._write = 0
+        self._filled = 0
+
+    def __len__(self) -> int:
+        return self._filled
+
+    def write(self, block: np.ndarray) -> None:
+        if block.ndim > 1:
+            block = block[:, 0]
+        capacity = len(self._data)
+        frames = len(block)
+        if frames >= capacity:
+            self._data[:] = block[-capacity:]
+            self._write = 0
+            self._filled = capacity
+            return
+
+        end = self._write + frames
+        if end <= capacity:
+            self._data[self._write:end] = block
+        else:
+            first = capacity - self._write
+            self._data[self._write:] = block[:first]
+            self._data[:frames - first] = block[first:]
+        self._write = end % capacity
+        self._filled = min(capacity, self._filled + frames)
+
+    def snapshot(self) -> np.ndarray:
+        """按时间顺序返回缓冲内容的拷贝。"""
+        if self._filled < len(self._data):
+            return self._data[:self._filled].copy()
+        return np.concatenate((self._data[self._write:], self._data[:self._write]))
+
+    def clear(self) -> None:
+        self._write = 0
+        self._filled = 0
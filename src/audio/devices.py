@@ -0,0 +1,151 @@
+"""输入设备注册表
+
+以前每次开始录音都要 sd._terminate() / sd._initialize() 重新枚举 PortAudio 设备，
+在按下快捷键和第一个采样之间插入了几百毫秒。这里把白名单匹配结果缓存下来：
+- 录音开始时直接使用缓存的设备
+- 空闲时由后台线程定期（或收到设备变化信号后）重新枚举
+- 常驻流打开时（is_standby）跳过定时刷新，只在设备变化信号（invalidate）后刷新：
+  刷新前后通过 before_refresh / after_refresh 关闭并重新打开常驻流，预录缓冲会被清空
+- 只有打开缓存设备失败时，才在录音路径上强制重新枚举
+"""
+
+import threading
+from typing import Callable, Optional, Tuple
+
+import sounddevice as sd
+
+from ..utils.logger import logger
+
+# 允许的设备关键字（按优先级从高到低）
+# 只允许这些设备，其他设备不使用
+# 注意：macOS 在中文环境下设备名是本地化的（如 "MacBook Pro麦克风"），
+# 所以需要同时匹配中英文关键字。
+ALLOWED_DEVICE_KEYWORDS = [
+    "dji mic",                # DJI Mic 系列无线麦克风（最高优先级）
+    "wireless mic",           # DJI Wireless Mic 等无线麦克风
+    "external microphone",    # 外接麦克风/耳机
+    "accentum",               # Sennheiser ACCENTUM 蓝牙耳机
+    "macbook pro microphone", # 内置麦克风（英文系统）
+    "macbook air microphone", # 内置麦克风（MacBook Air 英文系统）
+    "airpods",                # AirPods 蓝牙耳机
+    "麦克风",                  # 内置/通用麦克风（中文系统，最低优先级兜底）
+]
+
+DeviceChoice = Tuple[Optional[int], Optional[dict]]
+
+
+def _reinitialize_portaudio():
+    sd._terminate()
+    sd._initialize()
+
+
+def select_best_device(devices, keywords=ALLOWED_DEVICE_KEYWORDS) -> DeviceChoice:
+    """按白名单优先级从设备列表中选出最佳输入设备。"""
+    input_devices = [(i, d) for i, d in enumerate(devices) if d['max_input_channels'] > 0]
+    for keyword in keywords:
+        for idx, device in input_devices:
+            if keyword.lower() in device['name'].lower():
+                logger.debug(f"找到匹配设备: {device['name']} (优先级关键字: {keyword})")
+                return idx, device
+    return None, None
+
+
+class InputDeviceRegistry:
+    """缓存白名单输入设备的选择结果，并在空闲时后台刷新。"""
+
+    REFRESH_INTERVAL = 30.0  # 后台刷新间隔（秒）
+
+    def __init__(
+        self,
+        is_busy: Optional[Callable[[], bool]] = None,
+        *,
+        is_standby: Optional[Callable[[], bool]] = None,
+        before_refresh: Optional[Callable[[], None]] = None,
+        after_refresh: Optional[Callable[[], None]] = None,
+        query_devices: Callable = None,
+        reinitialize: Callable[[], None] = None,
+        refresh_interval: Optional[float] = None,
+    ):
+        self._is_busy = is_busy or (lambda: False)
+        self._is_standby = is_standby or (lambda: False)
+        self._before_refresh = before_refresh or (lambda: None)
+        self._after_refresh = after_refresh or (lambda: None)
+        self._query_devices = query_devices or sd.query_devices
+        self._reinitialize = reinitialize or _reinitialize_portaudio
+        self.refresh_interval = self.REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+
+        # 重新初始化 PortAudio 会让已打开的流失效，打开流和刷新设备必须互斥
+        self.portaudio_lock = threading.RLock()
+        self._choice: Optional[DeviceChoice] = None
+        self._stale = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get_best_device(self) -> DeviceChoice:
+        """返回缓存的最佳设备；首次调用时同步枚举一次。"""
+        choice = self._choice
+        if choice is None or choice[1] is None:
+            return self.refresh()
+        return choice
+
+    def refresh(self) -> DeviceChoice:
+        """强制重新枚举设备并更新缓存。"""
+        with self.portaudio_lock:
+            try:
+                self._reinitialize()
+                choice = select_best_device(self._query_devices())
+            except Exception as e:
+                logger.error(f"选择最佳设备时出错: {e}")
+                choice = (None, None)
+
+            previous = self._choice
+            self._choice = choice
+            self._stale.clear()
+
+        if choice[1] is None:
+            logger.warning("没有找到白名单中的可用设备")
+        elif previous is None or previous[1] is None or previous[1]['name'] != choice[1]['name']:
+            logger.info(f"输入设备缓存已更新: {choice[1]['name']}")
+        return choice
+
+    def invalidate(self) -> None:
+        """设备变化信号：尽快在空闲时重新枚举。"""
+        self._stale.set()
+
+    def _refresh_if_idle(self, requested: bool = False) -> bool:
+        """空闲时重新枚举；requested 表示收到了设备变化信号（否则是定时刷新）
+
+        返回 False 表示正忙，需要稍后重试。
+        """
+        with self.portaudio_lock:
+            if self._is_busy():
+                return False
+            if self._is_standby() and not requested:
+                # 定时刷新要关闭常驻流、清空预录缓冲，常驻流打开时只响应设备变化信号
+                return True
+            self._before_refresh()
+            try:
+                self.refresh()
+            finally:
+                self._after_refresh()
+            return True
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            requested = self._stale.wait(self.refresh_interval)
+            if self._stop.is_set():
+                break
+            if not self._refresh_if_idle(requested):
+                # 正在录音，稍后再试
+                self._stop.wait(1.0)
+
+    def start_background_refresh(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="audio-device-refresh", daemon=True)
+        self._thread.start()
+
+    def stop_background_refresh(self) -> None:
+        self._stop.set()
+        self._stale.set()
@@ -0,0 +1,257 @@
+"""上传前的音频编码
+
+批量转录以前总是上传 16-bit WAV，长语音在慢速网络上上传时间占了大部分延迟。
+这里在上传前把录音（先经 VAD 裁剪首尾静音）编码为服务商支持的压缩格式：
+- flac：无损，体积约为 WAV 的 50%~70%
+- ogg / opus：Opus 有损编码，可指定码率，体积约为 WAV 的 1/10 以下
+
+每个处理器通过 UPLOAD_FORMATS 声明服务端接受的格式，UPLOAD_FORMAT=auto 时
+优先选择无损压缩。编码结果按音频路径缓存，直到任务结束时 discard()，
+同一任务重试（包括退避等待期间有其他任务在编码）时不再重复裁剪和编码。
+缓存的编码结果写在临时目录（UPLOAD_SCRATCH_DIR）的文件里，每次上传时再读出，
+退避等待期间不占用内存。
+
+存档录音默认也以 FLAC 保存（transcode_to_flac），需要 WAV 的地方用 open_as_wav 解码。
+"""
+
+import atexit
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from ..utils.logger import logger
+from .vad import VadConfig, trim_silence
+
+
+@dataclass(frozen=True)
+class UploadFormat:
+    name: str
+    container: str   # soundfile format
+    subtype: str     # soundfile subtype
+    extension: str
+
+
+UPLOAD_FORMATS = {
+    "wav": UploadFormat("wav", "WAV", "PCM_16", "wav"),
+    "flac": UploadFormat("flac", "FLAC", "PCM_16", "flac"),
+    # 两者都是 Ogg 封装的 Opus，只是不同服务商认的扩展名不同
+    "ogg": UploadFormat("ogg", "OGG", "OPUS", "ogg"),
+    "opus": UploadFormat("opus", "OGG", "OPUS", "opus"),
+}
+LOSSLESS_PREFERENCE = ("flac", "wav")
+
+# libsndfile 的 Opus 码率随 compression_level 线性变化：0.0 -> 256kbps，1.0 -> 6kbps（单声道）
+_OPUS_MAX_KBPS = 256.0
+_OPUS_MIN_KBPS = 6.0
+
+_BLOCK_FRAMES = 1 << 16
+
+
+@dataclass(frozen=True)
+class EncodedAudio:
+    """编码完成、可以直接上传的音频：内容在内存中（data）或在磁盘文件中（path）。"""
+
+    format: str
+    filename: str
+    data: Optional[bytes]
+    duration: float
+    path: Optional[str] = None
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def as_upload_file(self) -> tuple:
+        """OpenAI SDK / httpx 的 file 参数（磁盘上的编码结果在这里读出，只在本次上传期间占用内存）。"""
+        return self.filename, self.read()
+
+
+def as_upload_file(audio, default_name: str = "audio.wav") -> tuple:
+    """把 EncodedAudio 或 WAV 文件对象转换为 (文件名, 内容) 形式的上传参数。"""
+    if isinstance(audio, EncodedAudio):
+        return audio.as_upload_file()
+    return default_name, audio
+
+
+def choose_upload_format(accepted: Sequence[str], preferred: str = "auto") -> str:
+    """根据服务商接受的格式和配置选出上传格式。"""
+    preferred = (preferred or "auto").lower()
+    if preferred != "auto":
+        if preferred in accepted and preferred in UPLOAD_FORMATS:
+            return preferred
+        logger.warning(f"服务商不支持上传格式 {preferred}（支持: {', '.join(accepted)}），自动选择")
+    for name in LOSSLESS_PREFERENCE:
+        if name in accepted:
+            return name
+    return accepted[0]
+
+
+def _opus_compression_level(bitrate_kbps: float) -> float:
+    level = (_OPUS_MAX_KBPS - bitrate_kbps) / (_OPUS_MAX_KBPS - _OPUS_MIN_KBPS)
+    return min(1.0, max(0.0, level))
+
+
+def encode_samples(samples: np.ndarray, sample_rate: int, fmt: str, *, opus_bitrate_kbps: float = 24.0) -> EncodedAudio:
+    """把单声道采样编码为指定格式。"""
+    spec = UPLOAD_FORMATS[fmt]
+    options = {}
+    if spec.subtype == "OPUS":
+        options["compression_level"] = _opus_compression_level(opus_bitrate_kbps)
+
+    output = io.BytesIO()
+    with sf.SoundFile(output, mode="w", samplerate=sample_rate, channels=1,
+                      format=spec.container, subtype=spec.subtype, **options) as encoded:
+        encoded.write(samples)
+    return EncodedAudio(
+        format=fmt,
+        filename=f"audio.{spec.extension}",
+        data=output.getvalue(),
+        duration=len(samples) / sample_rate,
+    )
+
+
+def _flac_subtype(subtype: str) -> str:
+    """FLAC 只支持整数采样：16-bit 及以下保持 16-bit，浮点 / 24-bit / 32-bit 按 24-bit 保存"""
+    return "PCM_16" if subtype in ("PCM_16", "PCM_S8", "PCM_U8") else "PCM_24"
+
+
+def transcode_to_flac(source, target, *, compression_level: Optional[float] = None) -> int:
+    """把音频（路径或文件对象）分块转码为 FLAC 写入 target，返回帧数
+
+    target 可以是任意扩展名（例如写到 .part 临时文件后再改名）。
+    """
+    options = {} if compression_level is None else {"compression_level": compression_level}
+    frames = 0
+    with sf.SoundFile(source) as src:
+        subtype = _flac_subtype(src.subtype)
+        dtype = "int16" if subtype == "PCM_16" else "float32"
+        with sf.SoundFile(target, mode="w", samplerate=src.samplerate, channels=src.channels,
+                          format="FLAC", subtype=subtype, **options) as dst:
+            for block in src.blocks(blocksize=_BLOCK_FRAMES, dtype=dtype):
+                dst.write(block)
+                frames += len(block)
+    return frames
+
+
+def open_as_wav(path: str):
+    """以 WAV 打开存档录音：WAV 文件直接返回文件对象，FLAC 等格式解码到内存（io.BytesIO）"""
+    if path.lower().endswith(".wav"):
+        return open(path, "rb")
+    info = sf.info(path)
+    samples, sample_rate = sf.read(path, dtype="int16" if info.subtype == "PCM_16" else "float32")
+    decoded = io.BytesIO()
+    sf.write(decoded, samples, sample_rate, format="WAV", subtype=_flac_subtype(info.subtype))
+    decoded.seek(0)
+    return decoded
+
+
+def _read_mono(path: str):
+    info = sf.info(path)
+    samples, sample_rate = sf.read(path, dtype="int16" if info.subtype == "PCM_16" else "float32")
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return samples, sample_rate
+
+
+class UploadEncoder:
+    """裁剪 + 编码上传音频，并按 (音频路径, 格式) 缓存结果。
+
+    缓存不按容量淘汰：结果一直保留到任务结束时调用 discard(audio_path)，
+    否则并发任务多时，正在退避等待重试的任务的编码结果会被挤掉。
+    编码结果写入 scratch_dir 下本进程的临时目录，缓存中只保留文件路径。
+    """
+
+    def __init__(
+        self,
+        vad_config: Optional[VadConfig] = None,
+        *,
+        opus_bitrate_kbps: Optional[float] = None,
+        scratch_dir: Optional[str] = None,
+    ):
+        self.vad_config = vad_config or VadConfig.from_env()
+        self.opus_bitrate_kbps = (
+            float(os.getenv("UPLOAD_OPUS_BITRATE_KBPS", "24")) if opus_bitrate_kbps is None else opus_bitrate_kbps
+        )
+        self.scratch_dir = scratch_dir or os.getenv("UPLOAD_SCRATCH_DIR") or tempfile.gettempdir()
+        self._spill_dir: Optional[str] = None
+        self._cache: Dict[Tuple[str, str], EncodedAudio] = {}
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def prepare(self, audio_path: str, fmt: str) -> EncodedAudio:
+        key = (audio_path, fmt)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        samples, sample_rate = _read_mono(audio_path)
+        original_bytes = os.path.getsize(audio_path)
+        samples = trim_silence(samples, sample_rate, self.vad_config)
+        encoded = encode_samples(samples, sample_rate, fmt, opus_bitrate_kbps=self.opus_bitrate_kbps)
+        logger.info(
+            f"📦 上传编码 {fmt}: {original_bytes / 1024:.0f}KB -> {len(encoded.data) / 1024:.0f}KB "
+            f"({encoded.duration:.1f}s, 耗时 {(time.perf_counter() - started) * 1000:.0f}ms)"
+        )
+
+        spilled = self._spill(encoded)
+        with self._lock:
+            cached = self._cache.setdefault(key, spilled)
+        if cached is not spilled:
+            # 另一个线程同时编码了同一段音频，使用先写入缓存的那份
+            _remove_quietly(spilled.path)
+        return cached
+
+    def _spill(self, encoded: EncodedAudio) -> EncodedAudio:
+        """把编码结果写入临时文件，返回只引用路径的 EncodedAudio"""
+        with self._lock:
+            if self._spill_dir is None:
+                os.makedirs(self.scratch_dir, exist_ok=True)
+                self._spill_dir = tempfile.mkdtemp(prefix="whisper-input-upload-", dir=self.scratch_dir)
+            spill_dir = self._spill_dir
+        with tempfile.NamedTemporaryFile(dir=spill_dir, suffix=f".{encoded.format}", delete=False) as f:
+            f.write(encoded.data)
+        return EncodedAudio(
+            format=encoded.format,
+            filename=encoded.filename,
+            data=None,
+            duration=encoded.duration,
+            path=f.name,
+        )
+
+    def discard(self, audio_path: str) -> None:
+        """任务结束（成功、失败或重试用尽）后释放缓存，删除临时文件。"""
+        with self._lock:
+            removed = [self._cache.pop(key) for key in [key for key in self._cache if key[0] == audio_path]]
+        for encoded in removed:
+            _remove_quietly(encoded.path)
+
+    def close(self) -> None:
+        """删除所有缓存的临时文件（进程退出时调用）"""
+        with self._lock:
+            self._cache.clear()
+            spill_dir, self._spill_dir = self._spill_dir, None
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+
+def _remove_quietly(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        logger.warning(f"删除上传临时文件失败: {exc}")
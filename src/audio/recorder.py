@@ -1,4 +1,5 @@
 import io
+import os
 import asyncio
 import sounddevice as sd
 import numpy as np
@@ -6,32 +7,32 @@ import queue
 import soundfile as sf
 import subprocess
 from ..utils.logger import logger
+from .buffer import CAPTURE_DTYPES, PrerollRing, SampleBuffer, create_sample_buffer, to_float32, to_pcm16
+from .resampler import PolyphaseResampler, resample
+from .spool import WavSpooler
+from .vad import StreamingVadGate, VadConfig
+from .devices import InputDeviceRegistry
+from ..utils.metrics import get_latency_tracker
 import time
 import threading
 from typing import AsyncGenerator, Optional
 
-# 允许的设备关键字（按优先级从高到低）
-# 只允许这些设备，其他设备不使用
-# 注意：macOS 在中文环境下设备名是本地化的（如 "MacBook Pro麦克风"），
-# 所以需要同时匹配中英文关键字。
-ALLOWED_DEVICE_KEYWORDS = [
-    "dji mic",                # DJI Mic 系列无线麦克风（最高优先级）
-    "wireless mic",           # DJI Wireless Mic 等无线麦克风
-    "external microphone",    # 外接麦克风/耳机
-    "accentum",               # Sennheiser ACCENTUM 蓝牙耳机
-    "macbook pro microphone", # 内置麦克风（英文系统）
-    "macbook air microphone", # 内置麦克风（MacBook Air 英文系统）
-    "airpods",                # AirPods 蓝牙耳机
-    "麦克风",                  # 内置/通用麦克风（中文系统，最低优先级兜底）
-]
-
-
 class AudioRecorder:
-    def __init__(self):
+    # 流式生成器在没有音频块到达时，隔多久复查一次录音状态（秒）
+    STREAM_IDLE_CHECK_SECONDS = 0.5
+
+    def __init__(self, probe_devices: bool = True, stream_factory=None):
         self.recording = False
-        self.audio_queue = queue.Queue()
-        self._recorded_chunks = []
+        self.audio_queue = queue.Queue()  # 流式消费者接入前到达的音频块
+        self._stream_listener = None  # (event loop, asyncio.Queue)，由 stream_audio_chunks 注册
+        self._stream_listener_lock = threading.Lock()
+        self._capture_buffer: Optional[SampleBuffer] = None
+        # 设置了录音文件路径工厂时边录边写盘（见 set_spool_path_factory），不再在内存中累积整段录音
+        self._spool_path_factory = None
+        self._spooler: Optional[WavSpooler] = None
         self.sample_rate = 16000
+        self.upload_sample_rate = 16000  # 批量转录上传前统一降采样到 16kHz（None 表示保持设备采样率）
+        self.vad_config = VadConfig.from_env()  # VAD_STREAM_GATE=true 时流式转录不发送长时间静音
         # self.temp_dir = tempfile.mkdtemp()
         self.current_device = None
         self.record_start_time = None
@@ -41,10 +42,44 @@ class AudioRecorder:
         self.auto_stop_callback = None  # 自动停止时的回调函数
         self.device_disconnect_callback = None  # 设备断开时的回调函数
         self.stream = None
+        self._stream_factory = stream_factory or sd.InputStream
+        # 采集格式：int16 直接以 16-bit PCM 录音，缓冲区内存减半，上传/流式发送时无需缩放
+        self.capture_dtype = os.getenv("AUDIO_CAPTURE_DTYPE", "float32").lower()
+        if self.capture_dtype not in CAPTURE_DTYPES:
+            logger.warning(f"不支持的 AUDIO_CAPTURE_DTYPE={self.capture_dtype}，使用 float32")
+            self.capture_dtype = "float32"
         self._recording_lock = threading.RLock()
+        # 音频回调与开始录音之间的切换锁（持有时间只有几微秒）
+        self._capture_lock = threading.Lock()
+        self._stream_to_queue = False  # 当前录音是否把音频块推送给流式消费者
+        # 常驻输入流（warm standby）：录音结束后保持流打开并持续写入预录环形缓冲，
+        # 下次开始录音时无需重新打开设备，并把按键前的预录音频拼到开头
+        self.warm_standby = os.getenv("AUDIO_WARM_STANDBY", "false").lower() == "true"
+        self.preroll_ms = int(os.getenv("AUDIO_PREROLL_MS", "500"))
+        self.warm_idle_timeout = float(os.getenv("AUDIO_WARM_IDLE_TIMEOUT", "300"))  # 空闲多久后关闭常驻流（秒）
+        self._preroll: Optional[PrerollRing] = None
+        self._warm_stream_device = None  # 常驻流所在的设备名；None 表示当前没有常驻流
+        self._warm_idle_timer = None
+        self._warm_idle_deadline: Optional[float] = None  # 常驻流空闲关闭的时间点（time.monotonic）
+        self._warm_suspended_for: Optional[float] = None  # 后台刷新设备时暂时关闭的常驻流剩余的空闲时间
         self._device_error_detected = False  # 标记是否检测到设备错误
         self._last_used_device = None  # 上次录音使用的设备（用于判断是否切换）
-        self._check_audio_devices()
+        # 缓存白名单设备选择，避免每次录音都重新初始化 PortAudio；
+        # 常驻流打开时只在设备变化信号后刷新（刷新前关闭、刷新后在新的最佳设备上重新打开）
+        self._device_registry = InputDeviceRegistry(
+            is_busy=self._blocks_device_refresh,
+            is_standby=lambda: self._warm_stream_device is not None,
+            before_refresh=self._suspend_warm_stream,
+            after_refresh=self._resume_warm_stream,
+        )
+        # 快捷键按下（start_* 被调用）到收到第一个采样的延迟
+        self.start_latency = get_latency_tracker("recorder.start_to_first_sample")
+        self._start_requested_at: Optional[float] = None
+        if probe_devices:
+            self._check_audio_devices()
+            self._device_registry.start_background_refresh()
+            if self.warm_standby:
+                self.open_warm_stream()
         # logger.info(f"初始化完成，临时文件目录: {self.temp_dir}")
         logger.info(f"初始化完成，最大录音时长: {self.max_record_duration/60:.1f}分钟")
 
@@ -57,33 +92,174 @@ class AudioRecorder:
                 break
 
     def _reset_recorded_audio(self):
-        self._recorded_chunks = []
+        self._capture_buffer = None
+        spooler, self._spooler = self._spooler, None
+        if spooler is not None:
+            spooler.abort()
 
     def _capture_audio_chunk(self, indata, *, stream_to_queue: bool):
-        chunk = indata.copy()
-        self._recorded_chunks.append(chunk)
+        if self._capture_buffer is None and self._spooler is None:
+            return
+        if self._start_requested_at is not None:
+            self.start_latency.record(time.perf_counter() - self._start_requested_at)
+            self._start_requested_at = None
+        chunk = self._store_samples(indata)
         if stream_to_queue:
-            self.audio_queue.put(chunk)
-
-    def _start_capture_session(self, *, clear_queue: bool):
+            self._publish_stream_chunk(chunk)
+
+    def _store_samples(self, samples):
+        """写入写盘队列或内存缓冲，返回可以交给流式消费者的音频块。"""
+        if self._spooler is not None:
+            # indata 在回调返回后会被 PortAudio 复用，交给写盘线程前复制一份
+            chunk = (samples[:, 0] if samples.ndim > 1 else samples).copy()
+            self._spooler.write(chunk)
+            return chunk
+        # 直接写入预分配缓冲区，返回的是缓冲区内对应区段的视图（无额外拷贝）
+        return self._capture_buffer.append(samples)
+
+    def _publish_stream_chunk(self, chunk):
+        """把音频块交给流式消费者；消费者未接入时先放进 audio_queue。"""
+        with self._stream_listener_lock:
+            listener = self._stream_listener
+            if listener is None:
+                self.audio_queue.put(chunk)
+                return
+            loop, chunk_queue = listener
+            try:
+                loop.call_soon_threadsafe(chunk_queue.put_nowait, chunk)
+            except RuntimeError:
+                # 事件循环已关闭，消费者已经退出
+                self._stream_listener = None
+
+    def _attach_stream_listener(self, loop, chunk_queue):
+        with self._stream_listener_lock:
+            # 先把接入前积压的音频块按顺序转移过去
+            while True:
+                try:
+                    chunk_queue.put_nowait(self.audio_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._stream_listener = (loop, chunk_queue)
+
+    def _detach_stream_listener(self, chunk_queue):
+        with self._stream_listener_lock:
+            if self._stream_listener is not None and self._stream_listener[1] is chunk_queue:
+                self._stream_listener = None
+
+    def _notify_stream_end(self):
+        """录音结束后唤醒流式消费者，让它输出剩余音频并退出。"""
+        with self._stream_listener_lock:
+            listener = self._stream_listener
+        if listener is None:
+            return
+        loop, chunk_queue = listener
+        try:
+            loop.call_soon_threadsafe(chunk_queue.put_nowait, None)
+        except RuntimeError:
+            pass
+
+    def _audio_callback(self, indata, frames, time_info, status):
+        """PortAudio 音频回调：录音中写入录音缓冲，常驻空闲时写入预录环形缓冲。"""
+        if status:
+            status_str = str(status).lower()
+            logger.warning(f"音频录制状态: {status}")
+            # 检测设备断开错误（排除普通的 overflow）
+            if ("input" in status_str or "device" in status_str) and "overflow" not in status_str:
+                if not self._device_error_detected:
+                    self._device_error_detected = True
+                    self._handle_device_disconnect()
+                return
+        with self._capture_lock:
+            if self.recording:
+                self._capture_audio_chunk(indata, stream_to_queue=self._stream_to_queue)
+            elif self._preroll is not None:
+                self._preroll.write(indata)
+
+    def _start_capture_session(self, *, clear_queue: bool, stream_to_queue: bool = False, use_preroll: bool = False):
         with self._recording_lock:
-            self.recording = True
+            self._reset_recorded_audio()
+            buffer, spooler = self._new_capture_sink()
+            with self._capture_lock:
+                if clear_queue:
+                    self._drain_audio_queue()
+                self._capture_buffer, self._spooler = buffer, spooler
+                if use_preroll and self._preroll is not None and len(self._preroll):
+                    preroll = self._store_samples(self._preroll.snapshot())
+                    if stream_to_queue:
+                        self._publish_stream_chunk(preroll)
+                    logger.info(f"⏪ 预录音频: {len(preroll) / self.sample_rate * 1000:.0f}ms")
+                if self._preroll is not None:
+                    self._preroll.clear()
+                self._stream_to_queue = stream_to_queue
+                self.recording = True
             self.record_start_time = time.time()
             self._device_error_detected = False
-            self._reset_recorded_audio()
-            if clear_queue:
-                self._drain_audio_queue()
+
+    def _new_capture_buffer(self) -> SampleBuffer:
+        return create_sample_buffer(self.sample_rate, self.max_record_duration, dtype=self.capture_dtype)
+
+    def _new_capture_sink(self):
+        """创建本次录音的去处：(内存缓冲, None) 或 (None, 写盘器)。"""
+        if self._spool_path_factory is not None:
+            try:
+                path = self._spool_path_factory()
+                return None, WavSpooler(path, self.sample_rate, self.upload_sample_rate or self.sample_rate)
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"创建录音文件失败，改为内存录音: {exc}")
+        return self._new_capture_buffer(), None
+
+    def _replace_capture_sink(self):
+        """采样率变化后重建录音去处（录音还没有收到任何采样时调用）。"""
+        buffer, spooler = self._new_capture_sink()
+        with self._capture_lock:
+            stale = self._spooler
+            self._capture_buffer, self._spooler = buffer, spooler
+        if stale is not None:
+            stale.abort()
+
+    def _collect_recorded_audio(self):
+        """停止录音后取出音频：写盘模式返回 RecordedAudio，内存模式返回 io.BytesIO。"""
+        spooler = self._spooler
+        if spooler is None:
+            return self._build_audio_buffer()
+
+        self._spooler = None
+        try:
+            recorded = spooler.close()
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"保存录音文件失败: {exc}")
+            self._remove_spool_file(spooler.path)
+            return None
+        if recorded.frames == 0:
+            logger.warning("没有收集到音频数据")
+            self._remove_spool_file(recorded.path)
+            return None
+        logger.info(f"录音已写入: {recorded.path} ({recorded.duration:.1f}秒, {recorded.sample_rate}Hz)")
+        return recorded
+
+    @staticmethod
+    def _remove_spool_file(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
     def _build_audio_buffer(self):
-        if not self._recorded_chunks:
+        if self._capture_buffer is None or len(self._capture_buffer) == 0:
             logger.warning("没有收集到音频数据")
             return None
 
-        audio = np.concatenate(self._recorded_chunks)
+        audio = self._capture_buffer.view()
         logger.info(f"音频数据长度: {len(audio)} 采样点")
 
+        output_rate = self.upload_sample_rate or self.sample_rate
+        if output_rate != self.sample_rate:
+            audio = to_pcm16(resample(to_float32(audio), self.sample_rate, output_rate))
+            logger.info(f"重采样 {self.sample_rate}Hz -> {output_rate}Hz: {len(audio)} 采样点")
+
         audio_buffer = io.BytesIO()
-        sf.write(audio_buffer, audio, self.sample_rate, format='WAV')
+        # int16 数据按 PCM_16 原样写入，不经过缩放
+        sf.write(audio_buffer, to_pcm16(audio), output_rate, format='WAV', subtype='PCM_16')
         audio_buffer.seek(0)
         self._reset_recorded_audio()
         return audio_buffer
@@ -104,7 +280,7 @@ class AudioRecorder:
         不会回堵调用者（pynput 按键回调、doubao 线程、Timer 线程都不被阻塞）。
         """
         if stream is None:
-            return
+            return None
 
         def _close_worker():
             inner = threading.Thread(target=stream.stop, name="pa-stop-inner", daemon=True)
@@ -121,21 +297,30 @@ class AudioRecorder:
             except Exception as exc:
                 logger.warning(f"关闭音频流时出错: {exc}")
 
-        threading.Thread(target=_close_worker, name="pa-close", daemon=True).start()
+        closer = threading.Thread(target=_close_worker, name="pa-close", daemon=True)
+        closer.start()
+        return closer
 
     def _finalize_recording(self, abort=False, *, enforce_min_duration=True, clear_queue=True):
         with self._recording_lock:
-            if not self.recording and not self.stream:
+            if not self.recording and (not self.stream or self._warm_stream_device is not None):
                 return None
 
             logger.info("停止录音...")
-            self.recording = False
+            with self._capture_lock:
+                self.recording = False
             self._cancel_auto_stop_timer()
-            # 锁内只 swap 指针，关流移到锁外做——避免 PortAudio C 调用挂死时持锁
-            stream_to_close = self.stream
-            self.stream = None
+            if self._warm_stream_device is not None and not self._device_error_detected:
+                # 常驻模式：保持流打开，等待下一次录音或空闲超时
+                stream_to_close = None
+                self._schedule_warm_idle_close()
+            else:
+                # 锁内只 swap 指针，关流移到锁外做——避免 PortAudio C 调用挂死时持锁
+                stream_to_close = self._detach_stream()
 
         self._close_stream_async(stream_to_close)
+        self._notify_stream_end()
+        self._log_start_latency()
 
         if abort:
             logger.warning("⚠️ 录音已被中止，音频数据已丢弃")
@@ -156,11 +341,11 @@ class AudioRecorder:
                     self._drain_audio_queue()
                 return "TOO_SHORT"
 
-        audio_buffer = self._build_audio_buffer()
+        recorded = self._collect_recorded_audio()
         self.record_start_time = None
         if clear_queue:
             self._drain_audio_queue()
-        return audio_buffer
+        return recorded
 
     def reset_streaming_state(self, reason: str = "", drain_queue: bool = True):
         """强制清理流式录音状态，用于异常恢复。"""
@@ -168,18 +353,108 @@ class AudioRecorder:
             logger.warning(f"♻️ 重置流式录音状态: {reason}")
 
         with self._recording_lock:
-            self.recording = False
+            with self._capture_lock:
+                self.recording = False
             self.record_start_time = None
             self._device_error_detected = False
             self._cancel_auto_stop_timer()
-            stream_to_close = self.stream
-            self.stream = None
+            stream_to_close = self._detach_stream()
+            self._reset_recorded_audio()
 
             if drain_queue:
                 self._drain_audio_queue()
 
         self._close_stream_async(stream_to_close)
+        self._notify_stream_end()
     
+    def _detach_stream(self):
+        """在锁内把当前流（包括常驻流）摘下来，返回给调用者在锁外关闭。"""
+        self._cancel_warm_idle_timer()
+        stream = self.stream
+        self.stream = None
+        self._warm_stream_device = None
+        self._preroll = None
+        return stream
+
+    def _cancel_warm_idle_timer(self):
+        if self._warm_idle_timer is not None:
+            self._warm_idle_timer.cancel()
+            self._warm_idle_timer = None
+        self._warm_idle_deadline = None
+
+    def _schedule_warm_idle_close(self, timeout: Optional[float] = None):
+        self._cancel_warm_idle_timer()
+        if self.warm_idle_timeout <= 0:
+            return
+        timeout = self.warm_idle_timeout if timeout is None else timeout
+        self._warm_idle_deadline = time.monotonic() + timeout
+        timer = threading.Timer(timeout, self._release_warm_stream, kwargs={"reason": "空闲超时"})
+        timer.daemon = True
+        timer.start()
+        self._warm_idle_timer = timer
+
+    def _release_warm_stream(self, reason: str = ""):
+        """关闭空闲的常驻流（录音中不做任何事）。"""
+        with self._recording_lock:
+            if self.recording or self._warm_stream_device is None:
+                return
+            stream = self._detach_stream()
+        logger.info(f"💤 关闭常驻音频流 ({reason})")
+        self._close_stream_async(stream)
+
+    def _claim_warm_stream(self, device_name) -> bool:
+        """开始录音前检查常驻流能否复用；设备已切换时关闭旧的常驻流。"""
+        with self._recording_lock:
+            if self._warm_stream_device is None:
+                return False
+            self._cancel_warm_idle_timer()
+            if self._warm_stream_device == device_name and not self._device_error_detected:
+                return True
+            stream = self._detach_stream()
+        self._close_stream_async(stream)
+        return False
+
+    def _blocks_device_refresh(self) -> bool:
+        """录音中或有非常驻的流时不能重新初始化 PortAudio；只有常驻流时视为空闲"""
+        return self.recording or (self.stream is not None and self._warm_stream_device is None)
+
+    def _suspend_warm_stream(self):
+        """后台刷新设备前关闭常驻流（重新初始化 PortAudio 会让已打开的流失效），记下剩余的空闲时间"""
+        with self._recording_lock:
+            if self.recording or self._warm_stream_device is None:
+                return
+            deadline = self._warm_idle_deadline
+            self._warm_suspended_for = self.warm_idle_timeout if deadline is None else deadline - time.monotonic()
+            stream = self._detach_stream()
+        closer = self._close_stream_async(stream)
+        if closer is not None:
+            closer.join(timeout=2.0)
+
+    def _resume_warm_stream(self):
+        """刷新后在（可能已变化的）最佳设备上重新打开常驻流，空闲计时接着刷新前的剩余时间"""
+        remaining, self._warm_suspended_for = self._warm_suspended_for, None
+        if remaining is None or (self.warm_idle_timeout > 0 and remaining <= 0):
+            return
+        with self._recording_lock:
+            self.open_warm_stream(idle_timeout=remaining)
+
+    def open_warm_stream(self, idle_timeout: Optional[float] = None):
+        """预先打开常驻输入流，开始填充预录缓冲（warm standby 模式）。"""
+        if self.recording or self.stream is not None:
+            return
+        device_idx, best_device = self._device_registry.get_best_device()
+        if best_device is None:
+            return
+        self.current_device = best_device['name']
+        self.sample_rate = int(best_device['default_samplerate'])
+        try:
+            self.stream = self._open_input_stream(device_idx, self._audio_callback)
+        except Exception as exc:
+            logger.warning(f"打开常驻音频流失败: {exc}")
+            return
+        logger.info(f"🔥 常驻音频流已打开 (设备: {self.current_device}, 预录 {self.preroll_ms}ms)")
+        self._schedule_warm_idle_close(idle_timeout)
+
     def _list_audio_devices(self):
         """列出所有可用的音频输入设备"""
         devices = sd.query_devices()
@@ -196,7 +471,7 @@ class AudioRecorder:
         """检查音频设备状态，使用白名单选择最佳设备"""
         try:
             # 使用白名单选择最佳设备
-            device_idx, best_device = self._get_best_input_device()
+            device_idx, best_device = self._device_registry.refresh()
 
             if best_device is not None:
                 self.current_device = best_device['name']
@@ -235,34 +510,59 @@ class AudioRecorder:
             logger.error(f"检查设备变化时出错: {e}")
             return False
 
-    def _get_best_input_device(self):
-        """根据优先级选择最佳输入设备（只从白名单中选择）
+    def _open_input_stream(self, device_idx, callback):
+        """打开并启动输入流；缓存的设备打不开时重新枚举设备后重试一次。"""
+        def _open(index):
+            with self._device_registry.portaudio_lock:
+                stream = self._stream_factory(
+                    channels=1,
+                    samplerate=self.sample_rate,
+                    callback=callback,
+                    dtype=self.capture_dtype,
+                    device=index,  # 使用选定的设备
+                    latency='low'  # 使用低延迟模式
+                )
+                try:
+                    stream.start()
+                except Exception:
+                    # 启动失败时关闭已创建的流，避免泄漏 PortAudio 句柄
+                    try:
+                        stream.close()
+                    except Exception as exc:
+                        logger.warning(f"关闭启动失败的音频流时出错: {exc}")
+                    raise
+                return stream
 
-        Returns:
-            tuple: (device_index, device_info) 或 (None, None) 如果没有可用设备
-        """
         try:
-            # 刷新设备列表（检测新插入的设备）
-            sd._terminate()
-            sd._initialize()
-
-            devices = sd.query_devices()
-            input_devices = [(i, d) for i, d in enumerate(devices) if d['max_input_channels'] > 0]
-
-            # 按优先级从高到低匹配白名单设备
-            for keyword in ALLOWED_DEVICE_KEYWORDS:
-                for idx, device in input_devices:
-                    if keyword.lower() in device['name'].lower():
-                        logger.debug(f"找到匹配设备: {device['name']} (优先级关键字: {keyword})")
-                        return idx, device
-
-            # 没有找到白名单设备
-            logger.warning("没有找到白名单中的可用设备")
-            return None, None
-        except Exception as e:
-            logger.error(f"选择最佳设备时出错: {e}")
-            return None, None
-    
+            stream = _open(device_idx)
+        except Exception as exc:
+            logger.warning(f"打开缓存的输入设备失败 ({exc})，重新枚举设备后重试")
+            device_idx, best_device = self._device_registry.refresh()
+            if best_device is None:
+                raise RuntimeError("没有可用的音频输入设备")
+            self.current_device = best_device['name']
+            self._last_used_device = self.current_device
+            sample_rate = int(best_device['default_samplerate'])
+            if sample_rate != self.sample_rate:
+                self.sample_rate = sample_rate
+                if self.recording:
+                    self._replace_capture_sink()
+            stream = _open(device_idx)
+
+        if self.warm_standby:
+            self._warm_stream_device = self.current_device
+            self._preroll = PrerollRing(int(self.sample_rate * self.preroll_ms / 1000), dtype=self.capture_dtype)
+        return stream
+
+    def _log_start_latency(self):
+        stats = self.start_latency.snapshot()
+        if self._start_requested_at is not None or stats.get("last") is None:
+            return
+        logger.info(
+            f"⏱️ 快捷键到首个采样: {stats['last'] * 1000:.0f}ms "
+            f"(p50 {stats['p50'] * 1000:.0f}ms, p90 {stats['p90'] * 1000:.0f}ms, 共 {stats['count']} 次)"
+        )
+
     def _auto_stop_recording(self):
         """自动停止录音（达到最大时长）"""
         logger.warning(f"⏰ 录音已达到最大时长（{self.max_record_duration/60:.1f}分钟），自动中止录音")
@@ -274,6 +574,14 @@ class AudioRecorder:
             # 否则直接中止录音（abort=True）
             self.stop_recording(abort=True)
     
+    def set_spool_path_factory(self, factory):
+        """设置录音文件路径工厂（无参数，返回新文件路径）。
+
+        设置后录音边录边写入该文件，stop_recording / stop_streaming_recording
+        返回 RecordedAudio；未设置时仍在内存中录音并返回 io.BytesIO。
+        """
+        self._spool_path_factory = factory
+
     def set_auto_stop_callback(self, callback):
         """设置自动停止时的回调函数"""
         self.auto_stop_callback = callback
@@ -285,9 +593,19 @@ class AudioRecorder:
     def _handle_device_disconnect(self):
         """处理录音过程中设备断开"""
         if not self.recording:
+            if self._warm_stream_device is not None:
+                # 常驻流空闲时设备出错：关闭常驻流，下次录音重新打开
+                self._device_registry.invalidate()
+                threading.Thread(
+                    target=self._release_warm_stream,
+                    kwargs={"reason": "设备错误"},
+                    daemon=True,
+                ).start()
             return
 
         logger.warning("录音过程中检测到设备断开，保存已录内容")
+        # 设备列表已变化，空闲后重新枚举
+        self._device_registry.invalidate()
 
         # 发送系统通知
         self._send_notification(
@@ -332,8 +650,9 @@ class AudioRecorder:
         """开始录音"""
         if not self.recording:
             try:
-                # 选择最佳设备
-                device_idx, best_device = self._get_best_input_device()
+                self._start_requested_at = time.perf_counter()
+                # 选择最佳设备（使用缓存的设备选择）
+                device_idx, best_device = self._device_registry.get_best_device()
 
                 if best_device is None:
                     # 没有可用的白名单设备
@@ -357,7 +676,10 @@ class AudioRecorder:
                 self._last_used_device = new_device_name
 
                 logger.info("开始录音...")
-                self._start_capture_session(clear_queue=True)
+                # 认领常驻流与开始采集不可分开，并与后台刷新设备（关闭 → 重新初始化 → 重新打开常驻流）互斥
+                with self._device_registry.portaudio_lock, self._recording_lock:
+                    warm = self._claim_warm_stream(new_device_name)
+                    self._start_capture_session(clear_queue=True, use_preroll=warm)
 
                 # 只有在设备切换或第一次录音时才发送通知
                 if device_switched or first_recording:
@@ -374,28 +696,11 @@ class AudioRecorder:
                             subtitle=""
                         )
 
-                def audio_callback(indata, frames, time, status):
-                    if status:
-                        status_str = str(status).lower()
-                        logger.warning(f"音频录制状态: {status}")
-                        # 检测设备断开错误（排除普通的 overflow）
-                        if ("input" in status_str or "device" in status_str) and "overflow" not in status_str:
-                            if not self._device_error_detected:
-                                self._device_error_detected = True
-                                self._handle_device_disconnect()
-                            return
-                    if self.recording:
-                        self._capture_audio_chunk(indata, stream_to_queue=False)
-
-                self.stream = sd.InputStream(
-                    channels=1,
-                    samplerate=self.sample_rate,
-                    callback=audio_callback,
-                    device=device_idx,  # 使用选定的设备
-                    latency='low'  # 使用低延迟模式
-                )
-                self.stream.start()
-                logger.info(f"音频流已启动 (设备: {self.current_device})")
+                if warm:
+                    logger.info(f"复用常驻音频流 (设备: {self.current_device})")
+                else:
+                    self.stream = self._open_input_stream(device_idx, self._audio_callback)
+                    logger.info(f"音频流已启动 (设备: {self.current_device})")
                 
                 # 设置自动停止定时器
                 self.auto_stop_timer = threading.Timer(self.max_record_duration, self._auto_stop_recording)
@@ -420,6 +725,9 @@ class AudioRecorder:
         
         Args:
             abort: 是否放弃录音（不返回音频数据）
+
+        Returns:
+            RecordedAudio（写盘模式）/ io.BytesIO（内存模式）/ "TOO_SHORT" / None
         """
         return self._finalize_recording(
             abort,
@@ -427,10 +735,28 @@ class AudioRecorder:
             clear_queue=True,
         )
 
+    async def _next_stream_chunk(self, chunk_queue: "asyncio.Queue"):
+        """等待下一个音频块；返回 None 表示录音已结束。"""
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunk_queue.get(), timeout=self.STREAM_IDLE_CHECK_SECONDS)
+            except asyncio.TimeoutError:
+                # 兜底：录音标志被直接置 False 但没有收到结束信号
+                if not self.recording:
+                    return None
+                continue
+            if chunk is not None:
+                return chunk
+            if not self.recording:
+                return None
+
     async def stream_audio_chunks(self, chunk_duration_ms: int = 200, target_sample_rate: int = 16000) -> AsyncGenerator[bytes, None]:
         """
         异步生成器，实时 yield 音频块（用于流式转录）
 
+        音频回调通过 loop.call_soon_threadsafe 直接唤醒本生成器，
+        不再轮询队列，静音时事件循环也不会被周期性唤醒。
+
         Args:
             chunk_duration_ms: 每个音频块的时长（毫秒），默认 200ms
             target_sample_rate: 目标采样率（默认 16000Hz，豆包 API 要求）
@@ -441,76 +767,86 @@ class AudioRecorder:
         # 计算原始采样率下每个 chunk 需要的采样点数
         samples_per_chunk_original = int(self.sample_rate * chunk_duration_ms / 1000)
         accumulated_samples = []
+        accumulated_count = 0  # 累积的采样点数（增量维护，避免每次重新求和）
         chunk_count = 0
 
-        # 计算重采样比例
-        resample_ratio = target_sample_rate / self.sample_rate
-        need_resample = abs(resample_ratio - 1.0) > 0.01
+        # 多相重采样器在整个流中保留滤波器状态，块与块之间没有断点
+        resampler = PolyphaseResampler(self.sample_rate, target_sample_rate)
+        gate = StreamingVadGate(self.sample_rate, self.vad_config) if self.vad_config.stream_gate else None
 
         logger.info(f"🎵 开始生成音频块: {self.sample_rate}Hz -> {target_sample_rate}Hz, 每块 {chunk_duration_ms}ms ({samples_per_chunk_original} samples)")
 
-        while self.recording or not self.audio_queue.empty():
-            try:
-                # 非阻塞获取音频数据
-                chunk = self.audio_queue.get_nowait()
+        chunk_queue: asyncio.Queue = asyncio.Queue()
+        self._attach_stream_listener(asyncio.get_running_loop(), chunk_queue)
+        try:
+            while True:
+                chunk = await self._next_stream_chunk(chunk_queue)
+                if chunk is None:
+                    break
                 accumulated_samples.append(chunk)
+                accumulated_count += len(chunk)
 
-                # 计算累积的采样点数
-                total_samples = sum(len(c) for c in accumulated_samples)
+                # 累积够一个（或多个）完整的 chunk 时，yield 出去
+                while accumulated_count >= samples_per_chunk_original:
+                    audio = np.concatenate(accumulated_samples) if len(accumulated_samples) > 1 else accumulated_samples[0]
 
-                # 当累积够一个完整的 chunk 时，yield 出去
-                if total_samples >= samples_per_chunk_original:
-                    # 合并所有累积的音频
-                    audio = np.concatenate(accumulated_samples)
-
-                    # 取出完整的 chunk
+                    # 取出完整的 chunk，保留剩余部分
                     chunk_data = audio[:samples_per_chunk_original]
-
-                    # 保留剩余部分
                     remaining = audio[samples_per_chunk_original:]
                     accumulated_samples = [remaining] if len(remaining) > 0 else []
-
-                    # 重采样（如果需要）
-                    if need_resample:
-                        # 简单的线性插值重采样
-                        target_length = int(len(chunk_data) * resample_ratio)
-                        indices = np.linspace(0, len(chunk_data) - 1, target_length)
-                        chunk_data = np.interp(indices, np.arange(len(chunk_data)), chunk_data.flatten())
-
-                    # 转换为 bytes (16-bit PCM)
-                    # sounddevice 返回的是 float32 格式 [-1, 1]，需要缩放到 int16 范围
-                    chunk_data = chunk_data.flatten()
-                    # 缩放到 int16 范围 [-32768, 32767]
-                    chunk_data = chunk_data * 32767
-                    chunk_data = np.clip(chunk_data, -32768, 32767)
-                    chunk_bytes = chunk_data.astype(np.int16).tobytes()
-                    chunk_count += 1
-                    logger.debug(f"🎵 yield 音频块 #{chunk_count}: {len(chunk_bytes)} bytes")
-                    yield chunk_bytes
-
-            except queue.Empty:
-                # 队列为空，等待一会
-                await asyncio.sleep(0.02)  # 20ms
+                    accumulated_count = len(remaining)
+
+                    chunk_bytes = self._resampled_pcm16_bytes(resampler, chunk_data)
+                    for payload in (gate.push(chunk_data, chunk_bytes) if gate else (chunk_bytes,)):
+                        chunk_count += 1
+                        logger.debug(f"🎵 yield 音频块 #{chunk_count}: {len(payload)} bytes")
+                        yield payload
+
+            # 结束信号之前已经入队、但还没被取走的音频块
+            while not chunk_queue.empty():
+                chunk = chunk_queue.get_nowait()
+                if chunk is not None:
+                    accumulated_samples.append(chunk)
+                    accumulated_count += len(chunk)
+        finally:
+            self._detach_stream_listener(chunk_queue)
 
         # 录音结束，输出剩余的音频
         logger.info(f"🎵 录音结束，已输出 {chunk_count} 个块，检查剩余音频...")
-        if accumulated_samples:
-            audio = np.concatenate(accumulated_samples)
-            if len(audio) > 0:
-                audio = audio.flatten()
-                if need_resample:
-                    target_length = int(len(audio) * resample_ratio)
-                    indices = np.linspace(0, len(audio) - 1, target_length)
-                    audio = np.interp(indices, np.arange(len(audio)), audio)
-                # 缩放到 int16 范围
-                audio = audio * 32767
-                audio = np.clip(audio, -32768, 32767)
-                chunk_bytes = audio.astype(np.int16).tobytes()
+        if resampler.is_passthrough:
+            tail = accumulated_samples
+        else:
+            tail = [resampler.process(to_float32(c)) for c in accumulated_samples]
+            tail.append(resampler.flush())
+        audio = np.concatenate(tail) if tail else np.empty(0, dtype=np.float32)
+        if len(audio) > 0:
+            chunk_bytes = self._to_pcm16_bytes(audio)
+            if gate is not None:
+                tail_samples = np.concatenate(accumulated_samples) if accumulated_samples else np.empty(0)
+                payloads = gate.push(tail_samples, chunk_bytes)
+            else:
+                payloads = [chunk_bytes]
+            for payload in payloads:
                 chunk_count += 1
-                logger.info(f"🎵 yield 最后音频块 #{chunk_count}: {len(chunk_bytes)} bytes")
-                yield chunk_bytes
+                logger.info(f"🎵 yield 最后音频块 #{chunk_count}: {len(payload)} bytes")
+                yield payload
+        if gate is not None:
+            gate.finish()
+            logger.info(f"🔇 VAD 静音门跳过 {gate.dropped_chunks} 个静音块")
         logger.info(f"🎵 音频生成器结束，共 {chunk_count} 个块")
 
+    @staticmethod
+    def _resampled_pcm16_bytes(resampler: PolyphaseResampler, chunk) -> bytes:
+        """重采样一个音频块并转换为 PCM bytes；无需重采样的 int16 块直接 tobytes()。"""
+        if resampler.is_passthrough:
+            return AudioRecorder._to_pcm16_bytes(chunk)
+        return AudioRecorder._to_pcm16_bytes(resampler.process(to_float32(chunk)))
+
+    @staticmethod
+    def _to_pcm16_bytes(audio) -> bytes:
+        """把音频转换为 16-bit PCM bytes（float32 [-1, 1] 缩放，int16 原样输出）。"""
+        return to_pcm16(audio).tobytes()
+
     def start_streaming_recording(self) -> Optional[str]:
         """
         开始流式录音（用于豆包流式转录）
@@ -532,8 +868,9 @@ class AudioRecorder:
             self.reset_streaming_state(reason="流已失效，自动清理")
 
         try:
-            # 选择最佳设备
-            device_idx, best_device = self._get_best_input_device()
+            self._start_requested_at = time.perf_counter()
+            # 选择最佳设备（使用缓存的设备选择）
+            device_idx, best_device = self._device_registry.get_best_device()
 
             if best_device is None:
                 self._send_notification(
@@ -555,7 +892,10 @@ class AudioRecorder:
             self._last_used_device = new_device_name
 
             logger.info("开始流式录音...")
-            self._start_capture_session(clear_queue=True)
+            # 认领常驻流与开始采集不可分开，并与后台刷新设备（关闭 → 重新初始化 → 重新打开常驻流）互斥
+            with self._device_registry.portaudio_lock, self._recording_lock:
+                warm = self._claim_warm_stream(new_device_name)
+                self._start_capture_session(clear_queue=True, stream_to_queue=True, use_preroll=warm)
 
             # 只有在设备切换或第一次录音时才发送通知
             if device_switched or first_recording:
@@ -572,27 +912,11 @@ class AudioRecorder:
                         subtitle=""
                     )
 
-            def audio_callback(indata, frames, time, status):
-                if status:
-                    status_str = str(status).lower()
-                    logger.warning(f"音频录制状态: {status}")
-                    if ("input" in status_str or "device" in status_str) and "overflow" not in status_str:
-                        if not self._device_error_detected:
-                            self._device_error_detected = True
-                            self._handle_device_disconnect()
-                        return
-                if self.recording:
-                    self._capture_audio_chunk(indata, stream_to_queue=True)
-
-            self.stream = sd.InputStream(
-                channels=1,
-                samplerate=self.sample_rate,
-                callback=audio_callback,
-                device=device_idx,
-                latency='low'
-            )
-            self.stream.start()
-            logger.info(f"流式音频流已启动 (设备: {self.current_device})")
+            if warm:
+                logger.info(f"复用常驻音频流 (设备: {self.current_device})")
+            else:
+                self.stream = self._open_input_stream(device_idx, self._audio_callback)
+                logger.info(f"流式音频流已启动 (设备: {self.current_device})")
 
             # 设置自动停止定时器
             self.auto_stop_timer = threading.Timer(self.max_record_duration, self._auto_stop_recording)
@@ -0,0 +1,330 @@
+"""存档保留策略
+
+audio_archive/audio 按 YYYY/MM/DD 分目录存放录音。ArchiveJanitor 在后台线程里
+按保留策略清理旧录音：
+- ARCHIVE_MAX_GB：存档总大小上限（0 表示不限）
+- ARCHIVE_MAX_AGE_DAYS：录音最长保留天数（0 表示不限）
+- ARCHIVE_KEEP_FAILED：没有转录结果的录音（转录失败 / 仍在排队）不清理
+- ARCHIVE_RETENTION_INTERVAL：两次清理之间的间隔秒数
+
+清理从最旧的日期目录开始，每删除 batch_size 个文件就回调一次 on_evict 并短暂让出，
+不会长时间占用磁盘；每个日期目录的大小按目录 mtime 缓存，没有变化的目录不重新统计。
+边录边写的录音在原地增长，不改变目录 mtime，所以最近两天（录音可能跨过午夜）的目录
+不缓存，每次都重新统计。
+
+ARCHIVE_COMPRESS_WAV=true（存档格式为 flac 时默认开启）时，同一个后台线程还会把
+已转录的旧 WAV 录音逐批转码为 FLAC，并回调 on_compact 更新转录索引中的文件名。
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.logger import logger
+from .encoding import transcode_to_flac
+
+
+@dataclass
+class RetentionPolicy:
+    max_bytes: int = 0  # 0 表示不限
+    max_age_days: float = 0.0  # 0 表示不限
+    keep_failed: bool = True
+    interval: float = 3600.0  # 0 表示不启动后台线程，由调用方手动执行 run_once
+    batch_size: int = 200
+    min_age_seconds: float = 3600.0  # 最近写入的文件可能还在被任务使用，不清理也不压缩
+    compress_wav: bool = False
+
+    @property
+    def enabled(self) -> bool:
+        """是否需要清理录音"""
+        return self.max_bytes > 0 or self.max_age_days > 0
+
+    @property
+    def active(self) -> bool:
+        """是否需要运行后台线程（清理或压缩）"""
+        return self.enabled or self.compress_wav
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        return cls(
+            max_bytes=int(float(os.getenv("ARCHIVE_MAX_GB", "0")) * 1024 ** 3),
+            max_age_days=float(os.getenv("ARCHIVE_MAX_AGE_DAYS", "0")),
+            keep_failed=os.getenv("ARCHIVE_KEEP_FAILED", "true").lower() == "true",
+            interval=float(os.getenv("ARCHIVE_RETENTION_INTERVAL", "3600")),
+            compress_wav=(
+                os.getenv("ARCHIVE_COMPRESS_WAV", "true").lower() == "true"
+                and os.getenv("ARCHIVE_AUDIO_FORMAT", "flac").lower() == "flac"
+            ),
+        )
+
+
+def _is_number(name: str, width: int) -> bool:
+    return len(name) == width and name.isdigit()
+
+
+class ArchiveJanitor:
+    """按 RetentionPolicy 清理 / 压缩 YYYY/MM/DD 分片目录中的旧录音。"""
+
+    def __init__(
+        self,
+        audio_dir: str,
+        policy: RetentionPolicy,
+        *,
+        is_transcribed: Callable[[str], bool],
+        on_evict: Callable[[List[str]], None],
+        on_compact: Optional[Callable[[str, str], None]] = None,
+        clock=time.time,
+        pause: float = 0.05,
+    ):
+        self.audio_dir = audio_dir
+        self.policy = policy
+        self._is_transcribed = is_transcribed
+        self._on_evict = on_evict
+        self._on_compact = on_compact
+        self._clock = clock
+        self._pause = pause
+        self._day_sizes: Dict[str, Tuple[int, int]] = {}  # 日期目录 -> (mtime_ns, 字节数)
+        self._compacted_days: Dict[str, int] = {}  # 已没有 WAV 的日期目录 -> mtime_ns
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.evicted = 0
+        self.evicted_bytes = 0
+        self.compacted = 0
+        self.compacted_saved_bytes = 0
+
+    def day_directories(self) -> List[Tuple[date, str]]:
+        """所有日期目录，按日期从旧到新排序"""
+        days = []
+        for year in self._numbered(self.audio_dir, 4):
+            year_dir = os.path.join(self.audio_dir, year)
+            for month in self._numbered(year_dir, 2):
+                month_dir = os.path.join(year_dir, month)
+                for day in self._numbered(month_dir, 2):
+                    try:
+                        moment = date(int(year), int(month), int(day))
+                    except ValueError:
+                        continue
+                    days.append((moment, os.path.join(month_dir, day)))
+        return days
+
+    @staticmethod
+    def _numbered(directory: str, width: int) -> List[str]:
+        try:
+            return sorted(name for name in os.listdir(directory) if _is_number(name, width))
+        except FileNotFoundError:
+            return []
+
+    def _day_size(self, day_dir: str, cacheable: bool = True) -> int:
+        try:
+            mtime = os.stat(day_dir).st_mtime_ns
+        except FileNotFoundError:
+            self._day_sizes.pop(day_dir, None)
+            return 0
+        cached = self._day_sizes.get(day_dir)
+        if cacheable and cached and cached[0] == mtime:
+            return cached[1]
+        size = 0
+        with os.scandir(day_dir) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    size += entry.stat(follow_symlinks=False).st_size
+        if cacheable:
+            self._day_sizes[day_dir] = (mtime, size)
+        else:
+            self._day_sizes.pop(day_dir, None)
+        return size
+
+    def _days_with_sizes(self, now: float) -> List[Tuple[date, str, int]]:
+        """所有日期目录及其大小；最近两天的目录里可能有正在增长的录音，不使用缓存"""
+        live_since = datetime.fromtimestamp(now).date() - timedelta(days=1)
+        return [
+            (moment, day_dir, self._day_size(day_dir, cacheable=moment < live_since))
+            for moment, day_dir in self.day_directories()
+        ]
+
+    def total_bytes(self) -> int:
+        return sum(size for _, _, size in self._days_with_sizes(self._clock()))
+
+    def run_once(self) -> int:
+        """执行一轮清理（及压缩），返回删除的文件数"""
+        if not self.policy.active:
+            return 0
+        with self._run_lock:
+            removed = self._evict() if self.policy.enabled else 0
+            if self.policy.compress_wav and not self._stop.is_set():
+                self._compact()
+            return removed
+
+    def _evict(self) -> int:
+        now = self._clock()
+        today = datetime.fromtimestamp(now).date()
+        oldest_kept = (
+            today - timedelta(days=self.policy.max_age_days) if self.policy.max_age_days > 0 else None
+        )
+        days = self._days_with_sizes(now)
+        total = sum(size for _, _, size in days)
+        removed = 0
+
+        for moment, day_dir, _ in days:
+            expired = oldest_kept is not None and moment < oldest_kept
+            if not expired and not self._over_budget(total):
+                break
+            count, freed = self._evict_day(day_dir, expired, total, now)
+            removed += count
+            total -= freed
+            if moment < today:
+                self._remove_if_empty(day_dir)
+            if self._stop.is_set():
+                break
+
+        if removed:
+            logger.info(f"🧹 存档清理: 删除 {removed} 个录音，当前约 {total / 1024 ** 2:.1f}MB")
+        return removed
+
+    def _over_budget(self, total: int) -> bool:
+        return self.policy.max_bytes > 0 and total > self.policy.max_bytes
+
+    def _evict_day(self, day_dir: str, expired: bool, total: int, now: float) -> Tuple[int, int]:
+        """按文件名（即录音时间）顺序清理一个日期目录，返回 (删除数, 释放字节数)"""
+        try:
+            with os.scandir(day_dir) as entries:
+                files = sorted((entry for entry in entries if entry.is_file(follow_symlinks=False)), key=lambda e: e.name)
+        except FileNotFoundError:
+            return 0, 0
+
+        batch: List[str] = []
+        count = freed = 0
+        for entry in files:
+            if not expired and not self._over_budget(total - freed):
+                break
+            if entry.name.endswith(".part"):
+                continue
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime < self.policy.min_age_seconds:
+                continue
+            if self.policy.keep_failed and not self._is_transcribed(entry.name):
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError as exc:
+                logger.warning(f"删除存档录音失败 {entry.path}: {exc}")
+                continue
+            batch.append(entry.name)
+            count += 1
+            freed += stat.st_size
+            if len(batch) >= self.policy.batch_size:
+                self._flush(batch)
+                batch = []
+                if self._stop.wait(self._pause):
+                    break
+        self._flush(batch)
+        self.evicted += count
+        self.evicted_bytes += freed
+        return count, freed
+
+    def _flush(self, filenames: Iterable[str]) -> None:
+        filenames = list(filenames)
+        if not filenames:
+            return
+        try:
+            self._on_evict(filenames)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"更新转录索引失败: {exc}")
+
+    def _compact(self) -> int:
+        """把已转录、足够旧的 WAV 录音逐批转码为 FLAC，返回转码的文件数"""
+        now = self._clock()
+        count = saved = 0
+        for _, day_dir in self.day_directories():
+            try:
+                if self._compacted_days.get(day_dir) == os.stat(day_dir).st_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                continue
+            try:
+                with os.scandir(day_dir) as entries:
+                    wavs = sorted(entry.path for entry in entries if entry.name.lower().endswith(".wav"))
+            except FileNotFoundError:
+                continue
+            remaining = 0
+            for path in wavs:
+                if self._stop.is_set():
+                    return count
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime < self.policy.min_age_seconds or not self._is_transcribed(os.path.basename(path)):
+                    remaining += 1
+                    continue
+                try:
+                    saved += stat.st_size - self._compact_file(path, stat)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning(f"压缩存档录音失败 {path}: {exc}")
+                    remaining += 1
+                    continue
+                count += 1
+                if count % self.policy.batch_size == 0 and self._stop.wait(self._pause):
+                    return count
+            if not remaining:
+                self._compacted_days[day_dir] = os.stat(day_dir).st_mtime_ns
+        if count:
+            self.compacted += count
+            self.compacted_saved_bytes += saved
+            logger.info(f"🗜️ 存档压缩: {count} 个 WAV 录音转为 FLAC，节省 {saved / 1024 ** 2:.1f}MB")
+        return count
+
+    def _compact_file(self, path: str, stat: os.stat_result) -> int:
+        """WAV -> 同名 .flac（保留修改时间），更新索引后删除 WAV，返回 FLAC 大小"""
+        target = os.path.splitext(path)[0] + ".flac"
+        if not os.path.exists(target):  # 已存在说明上次转码完成后没来得及删除 WAV
+            partial = target + ".part"
+            try:
+                transcode_to_flac(path, partial)
+                os.replace(partial, target)
+            finally:
+                if os.path.exists(partial):
+                    os.remove(partial)
+            os.utime(target, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        if self._on_compact is not None:
+            self._on_compact(path, target)
+        os.remove(path)
+        return os.path.getsize(target)
+
+    def _remove_if_empty(self, day_dir: str) -> None:
+        """删除空的日/月/年目录（当天的目录保留，录音会继续写入）"""
+        directory = day_dir
+        for _ in range(3):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            self._day_sizes.pop(directory, None)
+            directory = os.path.dirname(directory)
+
+    def start(self) -> None:
+        if self._thread is not None or not self.policy.active or self.policy.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name="archive-janitor", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"存档清理失败: {exc}")
+            if self._stop.wait(self.policy.interval):
+                return
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,81 @@
+"""转录记录全文检索（命令行）
+
+在 audio_archive/transcriptions.sqlite3 中按关键词检索，结果按相关度排序，并给出存档录音的路径。
+中文无需分词，任意子串都能查到；多个关键词用空格分隔，需要同时出现。
+
+Usage:
+    python -m src.audio.search 会议 记录 --since 2025-06-01 --until 2025-06-30
+    python -m src.audio.search whisper --service openai --model whisper-1 --limit 5
+    python -m src.audio.search --since 2025-06-01 --json      # 不给关键词时按时间倒序列出
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .archive import resolve_hits
+from .transcription_store import SearchHit, TranscriptionStore
+
+
+def _parse_day(value: Optional[str]) -> Optional[datetime]:
+    return datetime.strptime(value, "%Y-%m-%d") if value else None
+
+
+def search_archive(archive_dir: str, query: Optional[str] = None, **filters) -> List[SearchHit]:
+    """直接打开存档中的转录库检索（不启动 AudioArchiveManager 的写盘 / 清理线程）"""
+    path = os.path.join(archive_dir, "transcriptions.sqlite3")
+    if not os.path.exists(path):
+        return []
+    store = TranscriptionStore(path)
+    try:
+        return resolve_hits(os.path.join(archive_dir, "audio"), store.search(query, **filters))
+    finally:
+        store.close()
+
+
+def _print_hit(hit: SearchHit) -> None:
+    text = hit.transcription if len(hit.transcription) <= 120 else hit.transcription[:120] + "…"
+    print(f"[{hit.timestamp[:19].replace('T', ' ')}] {hit.service}/{hit.model}  (相关度 {hit.score:.2f})")
+    print(f"  {text}")
+    print(f"  🎵 {hit.audio_path or '录音已清理'}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="检索存档中的转录记录")
+    parser.add_argument("keywords", nargs="*", help="关键词（空格分隔，需全部出现）")
+    parser.add_argument("--since", help="起始日期 YYYY-MM-DD（含）")
+    parser.add_argument("--until", help="结束日期 YYYY-MM-DD（含）")
+    parser.add_argument("--service", help="转录服务，例如 openai / groq / local")
+    parser.add_argument("--model", help="模型名称")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--archive-dir", default="audio_archive")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出")
+    args = parser.parse_args(argv)
+
+    until = _parse_day(args.until)
+    hits = search_archive(
+        args.archive_dir,
+        " ".join(args.keywords) or None,
+        start=_parse_day(args.since),
+        end=until + timedelta(days=1) if until else None,
+        service=args.service,
+        model=args.model,
+        limit=args.limit,
+    )
+    if args.json:
+        print(json.dumps([asdict(hit) for hit in hits], ensure_ascii=False, indent=2))
+        return 0
+    if not hits:
+        print("🔍 没有找到匹配的转录记录")
+        return 1
+    for hit in hits:
+        _print_hit(hit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""录音落盘
+
+以前停止录音时才把整段音频写进 io.BytesIO，之后 main.py 又拷贝成 bytes、
+写入存档、再包一层 BytesIO 交给转录，一段 10 分钟的录音在内存里同时存在 3~4 份。
+这里改为边录边写：
+- 音频回调只把音频块放进队列，由后台线程重采样后追加写入存档目录下的文件
+- 停止录音时只需冲刷剩余的几个块并关闭文件（关闭时回填 WAV 头中的长度字段）
+- 后续转录任务只传递文件路径，内存占用与录音时长无关
+"""
+
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+from ..utils.logger import logger
+from .buffer import to_float32, to_pcm16
+from .resampler import PolyphaseResampler
+
+
+@dataclass
+class RecordedAudio:
+    """已经写入磁盘的一段录音。"""
+
+    path: str
+    sample_rate: int
+    frames: int
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+
+class WavSpooler:
+    """在后台线程把音频块重采样并增量写入音频文件（格式由扩展名决定，默认 16-bit PCM）。"""
+
+    def __init__(self, path: str, input_rate: int, output_rate: Optional[int] = None,
+                 *, subtype: str = "PCM_16"):
+        self.path = path
+        self.output_rate = int(output_rate or input_rate)
+        self.frames = 0
+        self._resampler = PolyphaseResampler(input_rate, self.output_rate)
+        self._file = sf.SoundFile(path, mode="w", samplerate=self.output_rate, channels=1, subtype=subtype)
+        self._queue: "queue.SimpleQueue[Optional[np.ndarray]]" = queue.SimpleQueue()
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audio-spool", daemon=True)
+        self._thread.start()
+
+    @property
+    def backlog(self) -> int:
+        """等待写盘的音频块数量。"""
+        return self._queue.qsize()
+
+    def write(self, block: np.ndarray) -> None:
+        """提交一个音频块（调用者需保证之后不再修改该数组）。"""
+        self._queue.put(block)
+
+    def _run(self):
+        while True:
+            block = self._queue.get()
+            if block is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self._write(self._resample(block))
+            except Exception as exc:  # noqa: BLE001
+                self._error = exc
+                logger.error(f"录音写盘失败: {exc}")
+
+    def _resample(self, block: np.ndarray) -> np.ndarray:
+        if self._resampler.is_passthrough:
+            return block
+        return self._resampler.process(to_float32(block))
+
+    def _write(self, samples: np.ndarray) -> None:
+        if len(samples):
+            self._file.write(to_pcm16(samples))
+            self.frames += len(samples)
+
+    def _stop_thread(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def close(self) -> RecordedAudio:
+        """写完剩余音频并关闭文件；写盘出错时抛出该异常。"""
+        if self._closed:
+            raise RuntimeError("录音文件已关闭")
+        self._closed = True
+        self._stop_thread()
+        try:
+            if self._error is None and not self._resampler.is_passthrough:
+                self._write(self._resampler.flush())
+        finally:
+            self._file.close()
+        if self._error is not None:
+            raise self._error
+        return RecordedAudio(path=self.path, sample_rate=self.output_rate, frames=self.frames)
+
+    def abort(self) -> None:
+        """丢弃录音并删除文件。"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop_thread()
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError as exc:
+            logger.warning(f"删除录音文件失败: {exc}")
@@ -0,0 +1,405 @@
+"""存档转录结果存储
+
+以前每次转录成功都要读入整个 audio_archive/cache.json、改一个键、再用 indent=2
+整体重写，存档越多越慢（O(n)），写到一半崩溃还会损坏文件。这里改为 SQLite（WAL）：
+- 按文件名插入 / 查询为单行操作，与已有条目数无关
+- 支持按音频内容哈希、按时间范围查询
+- 首次启动时把旧的 cache.json 一次性导入，原文件改名为 cache.json.migrated
+
+条目的字段与 cache.json 相同（transcription / service / model / mode / timestamp），
+另外记录 audio_hash（与结果缓存使用同一个哈希）和 audio_path（存档中的录音路径）；
+录音被保留策略清理后 audio_path 置空并记录 evicted_at，转录文本仍然保留。
+
+全文检索使用 FTS5（transcriptions_fts，rowid 与 transcriptions 相同），在写入同一个事务里增量更新。
+中文不做分词：索引时连续的汉字拆成重叠的二元组，查询词按短语匹配（相邻的二元组），
+任意长度的中文子串都能查到；英文按单词索引，查询的最后一个单词按前缀匹配。
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcriptions (
+    filename TEXT PRIMARY KEY,
+    transcription TEXT NOT NULL,
+    service TEXT NOT NULL DEFAULT '',
+    model TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL DEFAULT 'transcriptions',
+    audio_hash TEXT,
+    timestamp TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    audio_path TEXT,
+    evicted_at REAL
+);
+CREATE INDEX IF NOT EXISTS transcriptions_hash ON transcriptions(audio_hash);
+CREATE INDEX IF NOT EXISTS transcriptions_created_at ON transcriptions(created_at);
+"""
+
+# prefix='1'：单字前缀索引，单个汉字的查询（匹配以该字开头的二元组）不必合并大量词条
+_FTS_SCHEMA = (
+    "CREATE VIRTUAL TABLE transcriptions_fts USING fts5(body, prefix='1', tokenize='unicode61 remove_diacritics 2')"
+)
+
+# 不用空格分词的文字：CJK 统一汉字（含扩展 A、兼容汉字）与日文假名
+_UNSPACED = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)")
+
+_COLUMNS = "filename, transcription, service, model, mode, audio_hash, timestamp, audio_path, evicted_at"
+
+# 早期版本的表没有这些列，打开时补上
+_ADDED_COLUMNS = {"audio_path": "TEXT", "evicted_at": "REAL"}
+
+
+def _entry(row) -> Tuple[str, dict]:
+    filename, transcription, service, model, mode, audio_hash, timestamp, audio_path, evicted_at = row
+    entry = {
+        "transcription": transcription,
+        "service": service,
+        "model": model,
+        "mode": mode,
+        "timestamp": timestamp,
+    }
+    if audio_hash:
+        entry["audio_hash"] = audio_hash
+    if audio_path:
+        entry["audio_path"] = audio_path
+    if evicted_at:
+        entry["evicted_at"] = evicted_at
+    return filename, entry
+
+
+def _bigrams(run: str) -> List[str]:
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def search_text(text: str) -> str:
+    """索引用的文本：连续的汉字 / 假名拆成重叠的二元组，末尾再加最后一个字
+
+    “明天开会”-> “明天 天开 开会 会”，每个字都是某个词的开头，单字查询可以用前缀匹配。
+    """
+    return _UNSPACED.sub(lambda match: " " + " ".join(_bigrams(match.group()) + [match.group()[-1]]) + " ", text)
+
+
+def _term_phrase(term: str) -> Optional[str]:
+    """一个查询词 -> FTS5 短语（词之间必须相邻）
+
+    词中间的汉字串与索引一致（二元组 + 末字）；词末尾的汉字串在原文里可能还没结束，
+    只用二元组（单字时用前缀匹配）。英文 / 数字结尾的词也按前缀匹配。
+    """
+    pieces = [piece for piece in _UNSPACED.split(term) if piece]
+    tokens: List[str] = []
+    prefix = False
+    for index, piece in enumerate(pieces):
+        last = index == len(pieces) - 1
+        if _UNSPACED.fullmatch(piece):
+            if not last:
+                tokens += _bigrams(piece) + [piece[-1]]
+            elif len(piece) > 1:
+                tokens += _bigrams(piece)
+            else:
+                tokens.append(piece)
+                prefix = True
+        else:
+            tokens += piece.split()
+            prefix = last and piece[-1].isascii() and piece[-1].isalnum()
+    body = " ".join(tokens)
+    if not re.search(r"\w", body):
+        return None
+    return f'"{body}"' + ("*" if prefix else "")
+
+
+def match_expression(query: str) -> Optional[str]:
+    """把用户输入的关键词转为 FTS5 MATCH 表达式：空格分隔的每个词都要出现（AND）；
+    没有可检索的字符时返回 None。
+    """
+    # 双引号是 FTS5 语法字符，用户输入中的引号当作空格
+    phrases = [phrase for phrase in map(_term_phrase, query.replace('"', " ").split()) if phrase]
+    return " ".join(phrases) or None
+
+
+@dataclass
+class SearchHit:
+    """一条检索结果；audio_path 为 None 表示录音已被清理或没有记录路径"""
+
+    filename: str
+    transcription: str
+    service: str
+    model: str
+    mode: str
+    timestamp: str
+    audio_path: Optional[str]
+    score: float
+
+
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    try:
+        return datetime.fromisoformat(value) if value else datetime.now()
+    except ValueError:
+        return datetime.now()
+
+
+class TranscriptionStore:
+    """SQLite 转录结果表，所有方法线程安全。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(transcriptions)")}
+        for column, kind in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE transcriptions ADD COLUMN {column} {kind}")
+        if not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'transcriptions_fts'").fetchone():
+            self._build_index()
+
+    def _build_index(self) -> None:
+        """创建全文索引并导入已有记录（早期版本的数据库首次打开时执行一次）"""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+            rows = self._conn.execute("SELECT rowid, transcription FROM transcriptions").fetchall()
+            self._conn.executemany(
+                "INSERT INTO transcriptions_fts (rowid, body) VALUES (?, ?)",
+                [(rowid, search_text(text)) for rowid, text in rows],
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        if rows:
+            logger.info(f"已为 {len(rows)} 条转录记录建立全文索引")
+
+    @staticmethod
+    def _row(filename: str, entry: dict) -> tuple:
+        moment = _parse_timestamp(entry.get("timestamp"))
+        return (
+            filename,
+            entry.get("transcription") or "",
+            entry.get("service") or "",
+            entry.get("model") or "",
+            entry.get("mode") or "transcriptions",
+            entry.get("audio_hash"),
+            moment.isoformat(),
+            moment.timestamp(),
+            entry.get("audio_path"),
+            entry.get("evicted_at"),
+        )
+
+    def put(
+        self,
+        filename: str,
+        transcription: str,
+        *,
+        service: str,
+        model: str,
+        mode: str = "transcriptions",
+        audio_hash: Optional[str] = None,
+        timestamp: Optional[str] = None,
+        audio_path: Optional[str] = None,
+    ) -> None:
+        """插入或覆盖一条记录（同一文件名保留最新结果，与 cache.json 行为一致）"""
+        entry = {
+            "transcription": transcription,
+            "service": service,
+            "model": model,
+            "mode": mode,
+            "audio_hash": audio_hash,
+            "audio_path": audio_path,
+            "timestamp": timestamp or datetime.now().isoformat(),
+        }
+        self.put_many([(filename, entry)])
+
+    def put_many(self, entries: Iterable[Tuple[str, dict]]) -> int:
+        rows = [self._row(filename, entry) for filename, entry in entries]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for row in rows:
+                    self._unindex_locked(row[0])
+                    cursor = self._conn.execute(
+                        "INSERT INTO transcriptions (filename, transcription, service, model, mode, audio_hash, timestamp,"
+                        " created_at, audio_path, evicted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+                    self._conn.execute(
+                        "INSERT INTO transcriptions_fts (rowid, body) VALUES (?, ?)",
+                        (cursor.lastrowid, search_text(row[1])),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def _unindex_locked(self, filename: str) -> None:
+        """删除同名的旧记录及其索引（覆盖写入前调用）"""
+        old = self._conn.execute("SELECT rowid FROM transcriptions WHERE filename = ?", (filename,)).fetchone()
+        if old is not None:
+            self._conn.execute("DELETE FROM transcriptions_fts WHERE rowid = ?", old)
+            self._conn.execute("DELETE FROM transcriptions WHERE rowid = ?", old)
+
+    def get(self, filename: str) -> Optional[dict]:
+        rows = self._select("WHERE filename = ?", (filename,))
+        return rows[0][1] if rows else None
+
+    def has(self, filename: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM transcriptions WHERE filename = ?", (filename,)).fetchone()
+        return row is not None
+
+    def mark_evicted(self, filenames: Iterable[str], evicted_at: Optional[float] = None) -> int:
+        """录音文件已被清理：清空 audio_path 并记录清理时间，返回更新的条数"""
+        moment = evicted_at or datetime.now().timestamp()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                updated = self._conn.executemany(
+                    "UPDATE transcriptions SET audio_path = NULL, evicted_at = ? WHERE filename = ?",
+                    [(moment, filename) for filename in filenames],
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return updated
+
+    def rename(self, filename: str, new_filename: str, *, audio_path: Optional[str] = None) -> bool:
+        """录音文件改名（例如压缩为 FLAC）后更新记录，返回是否存在该记录"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if new_filename != filename:
+                    self._unindex_locked(new_filename)
+                updated = self._conn.execute(
+                    "UPDATE transcriptions SET filename = ?, audio_path = COALESCE(?, audio_path) WHERE filename = ?",
+                    (new_filename, audio_path, filename),
+                ).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return updated > 0
+
+    def find_by_hash(self, audio_hash: str) -> List[Tuple[str, dict]]:
+        return self._select("WHERE audio_hash = ? ORDER BY created_at", (audio_hash,))
+
+    def between(self, start: datetime, end: datetime) -> List[Tuple[str, dict]]:
+        """时间范围 [start, end) 内的记录，按时间排序"""
+        return self._select(
+            "WHERE created_at >= ? AND created_at < ? ORDER BY created_at",
+            (start.timestamp(), end.timestamp()),
+        )
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        *,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        service: Optional[str] = None,
+        model: Optional[str] = None,
+        limit: int = 20,
+        rank_window: int = 500,
+    ) -> List[SearchHit]:
+        """全文检索，按相关度（bm25）排序；不给关键词时按时间倒序列出符合条件的记录
+
+        start / end 为时间范围 [start, end)，service / model 精确匹配。
+        命中很多时只对最近写入的 rank_window 条排序（“最近说过的”优先）。
+        """
+        conditions, params = [], []
+        if start is not None:
+            conditions.append("t.created_at >= ?")
+            params.append(start.timestamp())
+        if end is not None:
+            conditions.append("t.created_at < ?")
+            params.append(end.timestamp())
+        if service:
+            conditions.append("t.service = ?")
+            params.append(service)
+        if model:
+            conditions.append("t.model = ?")
+            params.append(model)
+
+        columns = "t.filename, t.transcription, t.service, t.model, t.mode, t.timestamp, t.audio_path"
+        expression = match_expression(query) if query else None
+        if query and expression is None:
+            return []
+        with self._lock:
+            if expression is None:
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                sql = f"SELECT {columns}, 0.0 FROM transcriptions t {where} ORDER BY t.created_at DESC LIMIT ?"
+                rows = self._conn.execute(sql, params + [limit]).fetchall()
+            else:
+                rows = self._match_locked(expression, columns, conditions, params, start, end, limit, rank_window)
+        # bm25 越小越相关，这里取反，分数越高越相关
+        return [SearchHit(*row[:-1], score=-row[-1] or 0.0) for row in rows]
+
+    def _match_locked(self, expression, columns, conditions, params, start, end, limit, rank_window) -> list:
+        """常见词可能命中几万条，全部计算 bm25 再排序太慢：按 rowid（写入顺序）从新到旧
+        取前 rank_window 条符合条件的记录，只在这些记录里按相关度排序。
+        有时间范围时先换算成 rowid 范围，FTS5 只遍历该范围内的命中。
+        """
+        conditions, params = ["transcriptions_fts MATCH ?"] + conditions, [expression] + params
+        if start is not None or end is not None:
+            low, high = self._conn.execute(
+                "SELECT MIN(rowid), MAX(rowid) FROM transcriptions WHERE created_at >= ? AND created_at < ?",
+                (start.timestamp() if start else float("-inf"), end.timestamp() if end else float("inf")),
+            ).fetchone()
+            if low is None:
+                return []
+            conditions.append("transcriptions_fts.rowid BETWEEN ? AND ?")
+            params += [low, high]
+        sql = (
+            f"SELECT * FROM (SELECT {columns}, bm25(transcriptions_fts) AS score FROM transcriptions_fts"
+            f" JOIN transcriptions t ON t.rowid = transcriptions_fts.rowid"
+            f" WHERE {' AND '.join(conditions)} ORDER BY transcriptions_fts.rowid DESC LIMIT ?)"
+            f" ORDER BY score LIMIT ?"
+        )
+        return self._conn.execute(sql, params + [rank_window, limit]).fetchall()
+
+    def as_dict(self) -> Dict[str, dict]:
+        """导出为 cache.json 格式（文件名 -> 条目）"""
+        return dict(self._select("ORDER BY created_at", ()))
+
+    def _select(self, where: str, params: tuple) -> List[Tuple[str, dict]]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {_COLUMNS} FROM transcriptions {where}", params).fetchall()
+        return [_entry(row) for row in rows]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transcriptions").fetchone()[0]
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """一次性导入旧的 cache.json，成功后改名为 .migrated，返回导入条数"""
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r", encoding="utf-8") as cache_file:
+                data = json.load(cache_file)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"读取旧转录缓存失败，跳过迁移: {exc}")
+            return 0
+
+        entries = [(name, entry) for name, entry in data.items() if isinstance(entry, dict)]
+        count = self.put_many(entries)
+        os.replace(json_path, json_path + ".migrated")
+        logger.info(f"已将 {count} 条转录记录从 {json_path} 迁移到 {self.path}")
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
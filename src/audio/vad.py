@@ -0,0 +1,271 @@
+"""语音活动检测（VAD）
+
+基于短时能量 + 过零率的向量化 VAD，用于：
+- 批量转录上传前裁掉首尾静音，减少上传字节数、API 计费时长和服务端延迟
+- （可选）流式转录时暂停发送长时间的静音块
+
+噪声底噪按整段录音的能量分位数自适应估计，阈值 = max(底噪 + 余量, 绝对下限)；
+能量略低于阈值但过零率高的帧（s/sh 等清擦音）同样视为语音。
+检测不到语音时保持原始音频不变，宁可多传也不误删。
+
+离线模式::
+
+    python -m src.audio.vad assets/audio/test_audio.wav [-o trimmed.wav]
+"""
+
+import io
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from ..utils.logger import logger
+from .buffer import to_float32
+
+SILENCE_DB = -100.0
+
+
+@dataclass
+class VadConfig:
+    enabled: bool = True
+    frame_ms: int = 30
+    min_energy_db: float = -50.0      # 绝对下限（dBFS），低于它的帧一定是静音
+    energy_margin_db: float = 12.0    # 高于底噪多少 dB 视为语音
+    zcr_threshold: float = 0.25       # 过零率高于该值的弱能量帧视为清音
+    zcr_margin_db: float = 6.0        # 清音帧允许低于能量阈值的幅度
+    padding_ms: int = 300             # 裁剪时在语音两侧保留的长度
+    min_speech_ms: int = 90           # 短于该长度的孤立“语音”视为噪声（按键声等）
+    stream_gate: bool = False         # 是否在流式转录时暂停发送静音块
+    stream_hangover_ms: int = 800     # 流式：语音结束后继续发送的时长
+
+    @classmethod
+    def from_env(cls) -> "VadConfig":
+        return cls(
+            enabled=os.getenv("VAD_ENABLED", "true").lower() == "true",
+            frame_ms=int(os.getenv("VAD_FRAME_MS", "30")),
+            min_energy_db=float(os.getenv("VAD_MIN_ENERGY_DB", "-50")),
+            energy_margin_db=float(os.getenv("VAD_ENERGY_MARGIN_DB", "12")),
+            zcr_threshold=float(os.getenv("VAD_ZCR_THRESHOLD", "0.25")),
+            padding_ms=int(os.getenv("VAD_PADDING_MS", "300")),
+            min_speech_ms=int(os.getenv("VAD_MIN_SPEECH_MS", "90")),
+            stream_gate=os.getenv("VAD_STREAM_GATE", "false").lower() == "true",
+            stream_hangover_ms=int(os.getenv("VAD_STREAM_HANGOVER_MS", "800")),
+        )
+
+
+def frame_features(samples: np.ndarray, frame_len: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按帧计算能量（dBFS）和过零率，不足一帧的尾部单独成帧。"""
+    samples = to_float32(np.asarray(samples).reshape(-1))
+    count = -(-len(samples) // frame_len)
+    if count == 0:
+        return np.empty(0), np.empty(0)
+    padded = np.zeros(count * frame_len, dtype=np.float32)
+    padded[:len(samples)] = samples
+    frames = padded.reshape(count, frame_len)
+
+    power = np.einsum("ij,ij->i", frames, frames) / frame_len
+    energy_db = np.where(power > 0, 10 * np.log10(np.maximum(power, 1e-12)), SILENCE_DB)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+    return energy_db, zcr
+
+
+def _drop_short_runs(mask: np.ndarray, min_frames: int) -> np.ndarray:
+    """去掉长度小于 min_frames 的连续 True 段。"""
+    if min_frames <= 1 or not mask.any():
+        return mask
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    keep = np.zeros(len(mask) + 1, dtype=np.int32)
+    long_runs = (ends - starts) >= min_frames
+    np.add.at(keep, starts[long_runs], 1)
+    np.add.at(keep, ends[long_runs], -1)
+    return np.cumsum(keep[:-1]) > 0
+
+
+class EnergyVad:
+    """离线（整段）语音检测与首尾静音裁剪。"""
+
+    def __init__(self, sample_rate: int, config: Optional[VadConfig] = None):
+        self.sample_rate = int(sample_rate)
+        self.config = config or VadConfig.from_env()
+        self.frame_len = max(2, self.sample_rate * self.config.frame_ms // 1000)
+
+    def _frames(self, ms: int) -> int:
+        return -(-ms // self.config.frame_ms)
+
+    def threshold(self, energy_db: np.ndarray) -> float:
+        noise_floor = np.percentile(energy_db, 10) if len(energy_db) else SILENCE_DB
+        return max(self.config.min_energy_db, noise_floor + self.config.energy_margin_db)
+
+    def classify(self, energy_db: np.ndarray, zcr: np.ndarray, threshold: float) -> np.ndarray:
+        config = self.config
+        voiced = energy_db >= threshold
+        unvoiced = (
+            (energy_db >= threshold - config.zcr_margin_db)
+            & (energy_db >= config.min_energy_db)
+            & (zcr >= config.zcr_threshold)
+        )
+        return voiced | unvoiced
+
+    def speech_mask(self, samples: np.ndarray) -> np.ndarray:
+        """逐帧判断是否为语音。"""
+        energy_db, zcr = frame_features(samples, self.frame_len)
+        mask = self.classify(energy_db, zcr, self.threshold(energy_db))
+        return _drop_short_runs(mask, self._frames(self.config.min_speech_ms))
+
+    def detect(self, samples: np.ndarray) -> Optional[Tuple[int, int]]:
+        """返回包含全部语音（含两侧保留长度）的采样区间 [start, end)，没有语音时返回 None。"""
+        speech = np.flatnonzero(self.speech_mask(samples))
+        if len(speech) == 0:
+            return None
+        padding = self.config.padding_ms * self.sample_rate // 1000
+        start = max(0, speech[0] * self.frame_len - padding)
+        end = min(len(samples), (speech[-1] + 1) * self.frame_len + padding)
+        return int(start), int(end)
+
+    def trim(self, samples: np.ndarray) -> np.ndarray:
+        """裁掉首尾静音；检测不到语音时原样返回。"""
+        region = self.detect(samples)
+        if region is None:
+            return samples
+        return samples[region[0]:region[1]]
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, config: Optional[VadConfig] = None) -> np.ndarray:
+    """裁掉首尾静音；未启用或检测不到语音时原样返回。"""
+    config = config or VadConfig.from_env()
+    if not config.enabled or len(samples) == 0:
+        return samples
+
+    region = EnergyVad(sample_rate, config).detect(samples)
+    if region is None:
+        logger.info("VAD 未检测到语音，保持原始音频")
+        return samples
+    start, end = region
+    if start == 0 and end == len(samples):
+        return samples
+
+    saved = 1 - (end - start) / len(samples)
+    logger.info(
+        f"✂️ VAD 裁剪首尾静音: {len(samples) / sample_rate:.1f}s -> "
+        f"{(end - start) / sample_rate:.1f}s (减少 {saved:.0%})"
+    )
+    return samples[start:end]
+
+
+def trim_silence_file(path: str, config: Optional[VadConfig] = None) -> Optional[io.BytesIO]:
+    """裁掉音频文件首尾的静音。
+
+    Returns:
+        裁剪后的 WAV（io.BytesIO）；未启用、没有可裁剪的静音或检测不到语音时返回 None，
+        调用方应继续使用原文件。
+    """
+    config = config or VadConfig.from_env()
+    if not config.enabled:
+        return None
+
+    info = sf.info(path)
+    samples, sample_rate = sf.read(path, dtype="int16" if info.subtype == "PCM_16" else "float32")
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    trimmed_samples = trim_silence(samples, sample_rate, config)
+    if trimmed_samples is samples:
+        return None
+
+    trimmed = io.BytesIO()
+    sf.write(trimmed, trimmed_samples, sample_rate, format="WAV", subtype=info.subtype)
+    trimmed.seek(0)
+    return trimmed
+
+
+class StreamingVadGate:
+    """流式发送的静音门。
+
+    语音结束后继续发送 stream_hangover_ms，再之后的静音块暂不发送，
+    只保留最近 padding_ms 的块；重新检测到语音时先补发这些块。
+    底噪按最近约 10 秒的帧能量分位数估计。
+    """
+
+    NOISE_WINDOW_MS = 10000
+
+    def __init__(self, sample_rate: int, config: Optional[VadConfig] = None):
+        self.vad = EnergyVad(sample_rate, config)
+        self.config = self.vad.config
+        self._energy_history = deque(maxlen=self.NOISE_WINDOW_MS // self.config.frame_ms)
+        self._held: deque = deque()
+        self._held_ms = 0.0
+        self._silence_ms = float("inf")  # 开头的静音直接进入暂停状态
+        self.dropped_chunks = 0
+
+    def push(self, samples: np.ndarray, payload) -> List:
+        """输入一个音频块及其待发送内容，返回此刻应发送的内容列表。"""
+        chunk_ms = len(samples) * 1000 / self.vad.sample_rate
+        energy_db, zcr = frame_features(samples, self.vad.frame_len)
+        self._energy_history.extend(energy_db)
+        threshold = self.vad.threshold(np.fromiter(self._energy_history, dtype=float))
+        is_speech = bool(self.vad.classify(energy_db, zcr, threshold).any())
+
+        if is_speech:
+            self._silence_ms = 0.0
+            ready = [held for held, _ in self._held] + [payload]
+            self._held.clear()
+            self._held_ms = 0.0
+            return ready
+
+        self._silence_ms += chunk_ms
+        if self._silence_ms <= self.config.stream_hangover_ms:
+            return [payload]
+
+        self._held.append((payload, chunk_ms))
+        self._held_ms += chunk_ms
+        while self._held and self._held_ms - self._held[0][1] >= self.config.padding_ms:
+            _, dropped_ms = self._held.popleft()
+            self._held_ms -= dropped_ms
+            self.dropped_chunks += 1
+        return []
+
+    def finish(self) -> List:
+        """流结束：保留的静音块不再发送。"""
+        self.dropped_chunks += len(self._held)
+        self._held.clear()
+        self._held_ms = 0.0
+        return []
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="离线 VAD：检测语音区间并裁剪首尾静音")
+    parser.add_argument("audio", help="音频文件路径")
+    parser.add_argument("-o", "--output", help="裁剪结果输出路径（WAV）")
+    args = parser.parse_args(argv)
+
+    config = VadConfig.from_env()
+    samples, sample_rate = sf.read(args.audio, dtype="float32")
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    vad = EnergyVad(sample_rate, config)
+    mask = vad.speech_mask(samples)
+    region = vad.detect(samples)
+
+    duration = len(samples) / sample_rate
+    print(f"音频: {args.audio} ({duration:.2f}s, {sample_rate}Hz)")
+    print(f"语音帧: {int(mask.sum())}/{len(mask)} (帧长 {config.frame_ms}ms)")
+    if region is None:
+        print("未检测到语音")
+        return 1
+    start, end = region
+    print(f"保留区间: {start / sample_rate:.2f}s - {end / sample_rate:.2f}s "
+          f"(裁掉 {duration - (end - start) / sample_rate:.2f}s)")
+    if args.output:
+        sf.write(args.output, samples[start:end], sample_rate, subtype="PCM_16")
+        print(f"已写入: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,6 +1,8 @@
 import os
-import requests
-import json
+
+import httpx
+
+from ..utils.http import get_http_client
 from ..utils.logger import logger
 
 class KimiProcessor:
@@ -10,6 +12,7 @@ class KimiProcessor:
             raise ValueError("未设置 KIMI_API_KEY 环境变量")
         self.base_url = "https://api.moonshot.cn/v1"
         self.model = "kimi-k2-0711-preview"
+        self.http_client = get_http_client(self.base_url)
         
     def polish_text(self, text):
         """使用Kimi API润色文本并添加标点符号"""
@@ -39,7 +42,7 @@ class KimiProcessor:
         
         try:
             logger.info(f"正在使用Kimi API润色文本...")
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response = self.http_client.post(url, headers=headers, json=data, timeout=30)
             response.raise_for_status()
             
             result = response.json()
@@ -47,7 +50,7 @@ class KimiProcessor:
             logger.info(f"Kimi润色完成: {polished_text}")
             return polished_text
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Kimi API请求失败: {e}")
             return text  # 如果API失败，返回原文本
         except KeyError as e:
@@ -1,13 +1,15 @@
 from openai import OpenAI
 import dotenv
 import os
+from ..utils.http import get_http_client
 from ..utils.logger import logger
 
 dotenv.load_dotenv()
 
 class SymbolProcessor:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("GROQ_API_KEY"), base_url=os.getenv("GROQ_BASE_URL"))
+        base_url = os.getenv("GROQ_BASE_URL")
+        self.client = OpenAI(api_key=os.getenv("GROQ_API_KEY"), base_url=base_url, http_client=get_http_client(base_url))
         self.model = os.getenv("GROQ_ADD_SYMBOL_MODEL", "llama3-8b-8192")
 
     def add_symbol(self, text):
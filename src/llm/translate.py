@@ -1,7 +1,8 @@
 import os
-import requests
 from dotenv import load_dotenv
 
+from ..utils.http import get_http_client
+
 load_dotenv()
 
 class TranslateProcessor:
@@ -12,6 +13,7 @@ class TranslateProcessor:
             "Content-Type": "application/json"
         }
         self.model = os.getenv("SILICONFLOW_TRANSLATE_MODEL", "THUDM/glm-4-9b-chat")
+        self.http_client = get_http_client(self.url)
 
     def translate(self, text):
         system_prompt = """
@@ -33,7 +35,7 @@ class TranslateProcessor:
             ]
         }
         try:
-            response = requests.request("POST", self.url, headers=self.headers, json=payload)
+            response = self.http_client.post(self.url, headers=self.headers, json=payload)
             return response.json().get('choices', [{}])[0].get('message', {}).get('content', '')
         except Exception as e:
             return text, e
\ No newline at end of file
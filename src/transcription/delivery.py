@@ -0,0 +1,118 @@
+"""按录音顺序输出转录结果
+
+任务并发执行后完成顺序不再等于录音顺序，直接 type_text 会把口述片段贴乱。
+每个任务在入队时分配递增的序号（重试沿用同一序号），完成的结果先放进重排缓冲区，
+只有前面的序号都已输出（或放弃）后才输出。
+
+队首任务卡住时（后面已有结果在等待超过 hol_timeout 秒），跳过它先输出后面的结果；
+被跳过的任务之后完成时立即输出，并加上 late_marker 前缀提示这是补发的片段。
+"""
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Set
+
+from ..utils.logger import logger
+
+
+class OrderedDelivery:
+    """重排缓冲区：complete/fail 可以乱序调用，emit 严格按序号顺序调用。"""
+
+    def __init__(
+        self,
+        emit: Callable[[str], None],
+        *,
+        hol_timeout: float = 60.0,
+        late_marker: str = "[补发] ",
+    ):
+        self._emit = emit
+        self.hol_timeout = hol_timeout
+        self.late_marker = late_marker
+
+        self._lock = threading.RLock()  # 输出也在锁内进行，保证 emit 不会交错
+        self._issued = 0          # 已分配的最大序号
+        self._next = 1            # 下一个要输出的序号
+        self._ready: Dict[int, Optional[str]] = {}  # 已完成、等待前面序号的结果（None 表示失败）
+        self._skipped: Set[int] = set()
+        self._blocked_since: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+
+    def next_sequence(self) -> int:
+        with self._lock:
+            self._issued += 1
+            return self._issued
+
+    @property
+    def waiting(self) -> int:
+        """已完成但被前面任务挡住的结果数"""
+        with self._lock:
+            return len(self._ready)
+
+    def complete(self, sequence: int, text: Optional[str]) -> None:
+        """任务成功，按顺序输出 text（空文本只占位不输出）"""
+        self._finish(sequence, text or None)
+
+    def fail(self, sequence: int) -> None:
+        """任务放弃（重试用尽），释放它在队列中的位置"""
+        self._finish(sequence, None)
+
+    def _finish(self, sequence: int, text: Optional[str]) -> None:
+        with self._lock:
+            if sequence in self._skipped:
+                self._skipped.discard(sequence)
+                if text:
+                    logger.warning(f"⏱️ 任务 #{sequence} 超时后完成，补发结果")
+                    self._safe_emit(self.late_marker + text)
+                return
+            if sequence < self._next or sequence in self._ready:
+                logger.warning(f"忽略重复完成的任务 #{sequence}")
+                return
+            self._ready[sequence] = text
+            self._drain()
+
+    def _drain(self) -> None:
+        while self._next in self._ready:
+            text = self._ready.pop(self._next)
+            self._next += 1
+            if text:
+                self._safe_emit(text)
+        self._update_blocked()
+
+    def _safe_emit(self, text: str) -> None:
+        try:
+            self._emit(text)
+        except Exception as exc:  # noqa: BLE001
+            logger.error(f"输出转录结果失败: {exc}", exc_info=True)
+
+    def _update_blocked(self) -> None:
+        if not self._ready:
+            self._blocked_since = None
+            self._cancel_timer()
+            return
+        if self._blocked_since is None:
+            self._blocked_since = time.monotonic()
+            logger.info(f"⏳ 任务 #{self._next} 未完成，{len(self._ready)} 个结果等待按顺序输出")
+        if self.hol_timeout > 0 and self._timer is None:
+            remaining = self._blocked_since + self.hol_timeout - time.monotonic()
+            self._timer = threading.Timer(max(0.0, remaining), self._on_timeout)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timeout(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._ready or self._blocked_since is None:
+                return
+            if time.monotonic() - self._blocked_since < self.hol_timeout:
+                self._update_blocked()
+                return
+            logger.warning(f"⏭️ 任务 #{self._next} 超过 {self.hol_timeout:.0f} 秒未完成，先输出后面的结果")
+            self._skipped.add(self._next)
+            self._next += 1
+            self._blocked_since = None
+            self._drain()
@@ -0,0 +1,234 @@
+"""转录后端健康状态与熔断
+
+OpenAI 故障时，每个 Ctrl+F 任务都要等满超时再重试 5 次，用户才看到「❌ 自动转录失败」。
+这里为每个后端（openai / local / siliconflow / doubao）维护最近 N 次调用的成功率和延迟：
+
+    CLOSED（正常）--失败率超过阈值--> OPEN（熔断，拒绝请求）
+    OPEN --冷却 open_seconds 秒--> HALF_OPEN（放行一个探测请求）
+    HALF_OPEN --探测成功--> CLOSED / --探测失败--> OPEN
+
+熔断期间 FailoverRouter 按 FAILOVER_CHAIN 配置的顺序把任务改派给下一个健康的后端。
+Ctrl+I 明确选择了本地处理，local 任务默认不改派给远程后端（FAILOVER_LOCAL_TO_REMOTE=true 时才允许）。
+没有可改派的后端时，任务推迟到 retry_after() 秒后（冷却结束、半开探测有结果）再派发，不算一次失败。
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Callable, Dict, Iterable, Optional
+
+from ..utils.logger import logger
+from ..utils.metrics import get_latency_tracker
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ConnectionError):
+    """后端处于熔断状态，请求未发出。"""
+
+
+# 半开状态下探测请求还没结束时，推迟的任务隔多久再看一次
+PROBE_POLL_SECONDS = 1.0
+
+
+class ProviderHealth:
+    """单个后端的滚动窗口统计 + 熔断器。"""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window: int = 20,
+        min_requests: int = 4,
+        failure_threshold: float = 0.5,
+        open_seconds: float = 30.0,
+        slow_call_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.min_requests = min_requests
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.slow_call_seconds = slow_call_seconds  # 超过该耗时的成功调用也算作失败
+        self._clock = clock
+        self._outcomes = deque(maxlen=window)  # True 表示成功
+        self._latency = get_latency_tracker(f"provider.{name}")
+        self._lock = threading.Lock()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    @property
+    def latency(self):
+        """该后端的延迟统计（LatencyTracker）"""
+        return self._latency
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_in_flight = False
+            logger.info(f"🔌 {self.name} 熔断冷却结束，进入半开状态")
+        return self._state
+
+    def is_available(self) -> bool:
+        """是否可以把任务派给该后端（不占用半开状态的探测名额）"""
+        with self._lock:
+            state = self._current_state()
+            return state is CircuitState.CLOSED or (state is CircuitState.HALF_OPEN and not self._probe_in_flight)
+
+    def allow_request(self) -> bool:
+        """发出请求前调用；半开状态下只放行一个探测请求"""
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.CLOSED:
+                return True
+            if state is CircuitState.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        """还要等多少秒才能再派发任务：OPEN 时等冷却结束，半开探测进行中时稍后再看"""
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.OPEN:
+                return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+            if state is CircuitState.HALF_OPEN and self._probe_in_flight:
+                return PROBE_POLL_SECONDS
+            return 0.0
+
+    def release(self) -> None:
+        """请求因本地原因没有结果（不代表后端健康状况），归还半开状态的探测名额"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self._latency.record(latency)
+        slow = latency is not None and self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        self._record(not slow)
+
+    def record_failure(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self._latency.record(latency)
+        self._record(False)
+
+    def _record(self, ok: bool) -> None:
+        with self._lock:
+            state = self._current_state()
+            if state is CircuitState.HALF_OPEN:
+                self._probe_in_flight = False
+                if ok:
+                    self._state = CircuitState.CLOSED
+                    self._outcomes.clear()
+                    logger.info(f"✅ {self.name} 探测成功，恢复正常")
+                else:
+                    self._open()
+                return
+            self._outcomes.append(ok)
+            if state is CircuitState.CLOSED and len(self._outcomes) >= self.min_requests:
+                failure_rate = self._outcomes.count(False) / len(self._outcomes)
+                if failure_rate >= self.failure_threshold:
+                    self._open()
+
+    def _open(self) -> None:
+        self._state = CircuitState.OPEN
+        self._opened_at = self._clock()
+        self._probe_in_flight = False
+        logger.warning(f"⛔ {self.name} 熔断 {self.open_seconds:.0f} 秒 (最近失败率过高)")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            outcomes = list(self._outcomes)
+        return {
+            "state": state.value,
+            "requests": len(outcomes),
+            "failure_rate": outcomes.count(False) / len(outcomes) if outcomes else 0.0,
+            "latency": self._latency.snapshot(),
+        }
+
+
+class HealthRegistry:
+    """按后端名称管理 ProviderHealth，参数来自环境变量。"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, **options):
+        self._clock = clock
+        self._options = options
+        self._providers: Dict[str, ProviderHealth] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "HealthRegistry":
+        slow = os.getenv("CIRCUIT_SLOW_CALL_SECONDS")
+        return cls(
+            window=int(os.getenv("CIRCUIT_WINDOW", "20")),
+            min_requests=int(os.getenv("CIRCUIT_MIN_REQUESTS", "4")),
+            failure_threshold=float(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "0.5")),
+            open_seconds=float(os.getenv("CIRCUIT_OPEN_SECONDS", "30")),
+            slow_call_seconds=float(slow) if slow else None,
+        )
+
+    def get(self, name: str) -> ProviderHealth:
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                provider = ProviderHealth(name, clock=self._clock, **self._options)
+                self._providers[name] = provider
+            return provider
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            providers = dict(self._providers)
+        return {name: provider.snapshot() for name, provider in providers.items()}
+
+
+def parse_chain(value: str) -> list:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class FailoverRouter:
+    """主后端熔断时，按故障转移链选择下一个健康的后端。"""
+
+    def __init__(
+        self,
+        registry: HealthRegistry,
+        chain: Iterable[str],
+        is_configured: Callable[[str], bool],
+        local_to_remote: bool = False,
+    ):
+        self.registry = registry
+        self.chain = list(chain)
+        self._is_configured = is_configured
+        self.local_to_remote = local_to_remote
+
+    def route(self, primary: str) -> str:
+        """返回应处理任务的后端；没有可改派的后端时仍返回主后端（由调用方推迟任务等待恢复）"""
+        if self.registry.get(primary).is_available():
+            return primary
+        name = self.alternative(primary)
+        if name is None:
+            return primary
+        logger.warning(f"🔀 {primary} 熔断中，任务改派给 {name}")
+        return name
+
+    def alternative(self, primary: str) -> Optional[str]:
+        """故障转移链中可以接手 primary 任务的健康后端，没有时返回 None"""
+        if primary == "local" and not self.local_to_remote:
+            # 本地任务的音频不发往远程，等待本地后端恢复
+            return None
+        for name in self.chain:
+            if name != primary and self._is_configured(name) and self.registry.get(name).is_available():
+                return name
+        return None
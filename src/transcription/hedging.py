@@ -0,0 +1,177 @@
+"""对冲请求（hedged requests）
+
+短语音的体验取决于尾延迟而不是成本。开启 HEDGE_ENABLED 后：主后端在 hedge_delay
+内还没返回，就把同一段音频再发给备用后端，谁先成功用谁的结果，另一个的结果丢弃。
+
+hedge_delay 取主后端最近延迟的 p90（LatencyTracker 滚动窗口），限制在
+[HEDGE_MIN_DELAY, HEDGE_MAX_DELAY] 之间：主后端变慢时自动更早对冲，变快时少对冲。
+HedgeStats 记录哪个后端赢了以及节省的时间，用来观察和调参。
+
+落败的请求默认通过 CancelToken 取消：whisper.cpp 子进程被结束，还没传完的上传被中止；
+已经上传完、正在等服务端响应的 HTTP 请求无法中途打断，只能在后台等到返回或客户端超时，
+结果丢弃。备用请求占用的通道名额在它真正结束后才释放。
+HEDGE_CANCEL_LOSER=false 时让主请求跑完，以便准确测量对冲节省的时间。
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from ..utils.execution import CancelToken
+from ..utils.logger import logger
+from ..utils.metrics import LatencyTracker, get_latency_tracker
+
+PRIMARY = "primary"
+SECONDARY = "secondary"
+
+
+@dataclass
+class HedgePolicy:
+    enabled: bool = False
+    quantile: float = 90.0
+    min_delay: float = 1.0
+    max_delay: float = 15.0
+    default_delay: float = 5.0       # 还没有延迟样本时使用
+    max_audio_seconds: float = 30.0  # 只对短语音对冲
+    min_samples: int = 5
+    cancel_loser: bool = True
+
+    @classmethod
+    def from_env(cls) -> "HedgePolicy":
+        return cls(
+            enabled=os.getenv("HEDGE_ENABLED", "false").lower() == "true",
+            quantile=float(os.getenv("HEDGE_QUANTILE", "90")),
+            min_delay=float(os.getenv("HEDGE_MIN_DELAY", "1")),
+            max_delay=float(os.getenv("HEDGE_MAX_DELAY", "15")),
+            default_delay=float(os.getenv("HEDGE_DEFAULT_DELAY", "5")),
+            max_audio_seconds=float(os.getenv("HEDGE_MAX_AUDIO_SECONDS", "30")),
+            cancel_loser=os.getenv("HEDGE_CANCEL_LOSER", "true").lower() == "true",
+        )
+
+    def delay_for(self, tracker: LatencyTracker) -> float:
+        """根据主后端的延迟分布计算对冲等待时间"""
+        if tracker.count < self.min_samples:
+            return self.default_delay
+        observed = tracker.percentile(self.quantile) or self.default_delay
+        return min(self.max_delay, max(self.min_delay, observed))
+
+
+@dataclass
+class HedgeOutcome:
+    winner: str              # PRIMARY / SECONDARY
+    text: Optional[str]
+    error: object
+    latency: float           # 从开始到拿到结果的时间
+    hedged: bool             # 是否发出了备用请求
+
+
+class HedgeStats:
+    """对冲结果统计：各后端获胜次数、节省的时间"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.wins = Counter()
+        self.saved = get_latency_tracker("hedge.saved")
+
+    def record_hedge(self) -> None:
+        with self._lock:
+            self.hedged += 1
+
+    def record_win(self, backend: str) -> None:
+        with self._lock:
+            self.wins[backend] += 1
+
+    def record_saved(self, seconds: float) -> None:
+        self.saved.record(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"hedged": self.hedged, "wins": dict(self.wins), "saved": self.saved.snapshot()}
+
+
+def run_hedged(
+    primary: Callable[[CancelToken], tuple],
+    secondary: Optional[Callable[[CancelToken], tuple]],
+    delay: float,
+    *,
+    reserve_secondary: Optional[Callable[[], Optional[Callable[[], None]]]] = None,
+    cancel_loser: bool = True,
+    on_primary_late: Optional[Callable[[float], None]] = None,
+    clock: Callable[[], float] = time.monotonic,
+) -> HedgeOutcome:
+    """执行 primary(token)，超过 delay 未返回时并行执行 secondary(token)，返回第一个成功的结果
+
+    primary / secondary 返回 (文本, 错误)，与处理器的 process_audio 一致。
+    一方成功后，cancel_loser 为 True 时取消另一方的 token；否则落败的主请求在后台
+    跑完，结果被丢弃，并以 on_primary_late(节省的秒数) 回调。
+
+    reserve_secondary() 在发出备用请求前占用备用后端的并发名额，返回释放函数
+    （备用请求真正结束后调用，包括取消后仍在后台执行的部分）；返回 None 表示
+    没有空闲名额，放弃对冲，继续等待主请求。
+    """
+    results: "queue.Queue" = queue.Queue()
+    tokens = {PRIMARY: CancelToken(), SECONDARY: CancelToken()}
+    started = clock()
+
+    def launch(name: str, call: Callable[[CancelToken], tuple], on_done: Callable[[], None] = lambda: None) -> None:
+        def target():
+            try:
+                text, error = call(tokens[name])
+            except Exception as exc:  # noqa: BLE001
+                text, error = None, exc
+            finally:
+                # 被取消 / 超时后仍在后台执行的调用结束后才算释放
+                tokens[name].when_settled(on_done)
+            results.put((name, text, error, clock() - started))
+
+        threading.Thread(target=target, name=f"hedge-{name}", daemon=True).start()
+
+    launch(PRIMARY, primary)
+    try:
+        first = results.get(timeout=delay) if secondary is not None else results.get()
+    except queue.Empty:
+        first = None
+    if first is not None:
+        name, text, error, latency = first
+        return HedgeOutcome(name, text, error, latency, hedged=False)
+
+    release = reserve_secondary() if reserve_secondary is not None else (lambda: None)
+    if release is None:
+        logger.info(f"🏁 主后端 {delay:.1f} 秒未返回，但备用后端没有空闲名额，不对冲")
+        name, text, error, latency = results.get()
+        return HedgeOutcome(name, text, error, latency, hedged=False)
+    logger.info(f"🏁 主后端 {delay:.1f} 秒未返回，同时发给备用后端")
+    launch(SECONDARY, secondary, release)
+    failures = {}
+    while len(failures) < 2:
+        name, text, error, latency = results.get()
+        if error or text is None:
+            failures[name] = (error, latency)
+            continue
+        loser = SECONDARY if name == PRIMARY else PRIMARY
+        if loser not in failures:
+            if cancel_loser:
+                tokens[loser].cancel()
+            elif loser == PRIMARY:
+                _watch_loser(results, latency, on_primary_late)
+        return HedgeOutcome(name, text, error, latency, hedged=True)
+
+    error, latency = failures[PRIMARY]
+    return HedgeOutcome(PRIMARY, None, error, latency, hedged=True)
+
+
+def _watch_loser(results: "queue.Queue", winner_latency: float, on_primary_late) -> None:
+    """等落败的主请求结束，记录对冲节省的时间"""
+    if on_primary_late is None:
+        return
+
+    def wait():
+        _, _, _, latency = results.get()
+        on_primary_late(max(0.0, latency - winner_latency))
+
+    threading.Thread(target=wait, name="hedge-loser", daemon=True).start()
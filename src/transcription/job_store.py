@@ -0,0 +1,141 @@
+"""转录任务持久化
+
+任务队列原先只在内存中，进程崩溃或通过 start.sh 重启（tmux kill-session）后，
+排队中和等待重试的任务全部丢失，尽管录音已经写入存档。这里把任务状态记录到
+audio_archive/jobs.sqlite3：
+
+    queued -> running -> done
+                      -> queued（自动重试）
+                      -> failed（重试用尽）
+
+任务只引用存档中的音频路径，不保存音频数据。启动时把仍处于 queued / running 的
+任务连同提示词（prompt 影响识别结果，也是结果缓存键的一部分）重新加入队列。
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+from ..utils.logger import logger
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    audio_path TEXT NOT NULL,
+    processor TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    state TEXT NOT NULL,
+    retries_left INTEGER NOT NULL DEFAULT 0,
+    attempt INTEGER NOT NULL DEFAULT 1,
+    error TEXT,
+    prompt TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state);
+"""
+# 早期版本的数据库缺少的列，打开时补上
+_ADDED_COLUMNS = {"prompt": "TEXT NOT NULL DEFAULT ''"}
+
+
+@dataclass
+class StoredJob:
+    id: int
+    audio_path: str
+    processor: str
+    mode: str
+    state: str
+    retries_left: int
+    attempt: int
+    error: Optional[str] = None
+    prompt: str = ""
+
+
+class JobStore:
+    """SQLite 任务表，所有方法线程安全。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL：进程崩溃不丢已提交的事务，只有断电可能丢最后几条
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def add(
+        self, audio_path: str, processor: str, *, mode: str, retries_left: int, attempt: int = 1, prompt: str = ""
+    ) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (audio_path, processor, mode, state, retries_left, attempt, prompt, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (audio_path, processor, mode, QUEUED, retries_left, attempt, prompt, now, now),
+            )
+            return cursor.lastrowid
+
+    def _set_state(self, job_id: int, state: str, **fields) -> None:
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        sql = f"UPDATE jobs SET state = ?, updated_at = ?{', ' + assignments if assignments else ''} WHERE id = ?"
+        with self._lock:
+            self._conn.execute(sql, (state, time.time(), *fields.values(), job_id))
+
+    def mark_running(self, job_id: int) -> None:
+        self._set_state(job_id, RUNNING)
+
+    def requeue(self, job_id: int, *, retries_left: int, attempt: int, error: Optional[str] = None) -> None:
+        self._set_state(job_id, QUEUED, retries_left=retries_left, attempt=attempt, error=error)
+
+    def mark_done(self, job_id: int) -> None:
+        self._set_state(job_id, DONE, error=None)
+
+    def mark_failed(self, job_id: int, error: str) -> None:
+        self._set_state(job_id, FAILED, error=error)
+
+    def get(self, job_id: int) -> Optional[StoredJob]:
+        rows = self._select("WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def outstanding(self) -> List[StoredJob]:
+        """未完成的任务（queued / running），按入队顺序排列"""
+        return self._select("WHERE state IN (?, ?) ORDER BY id", (QUEUED, RUNNING))
+
+    def _select(self, where: str, params: tuple) -> List[StoredJob]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, audio_path, processor, mode, state, retries_left, attempt, error, prompt FROM jobs " + where,
+                params,
+            ).fetchall()
+        return [StoredJob(*row) for row in rows]
+
+    def prune(self, max_age_days: float = 7.0) -> int:
+        """删除早于 max_age_days 的已结束任务记录"""
+        cutoff = time.time() - max_age_days * 86400
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
+        if cursor.rowcount:
+            logger.info(f"清理 {cursor.rowcount} 条过期任务记录")
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
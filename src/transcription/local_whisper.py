@@ -1,47 +1,25 @@
 import os
-import subprocess
 import json
 import tempfile
 import threading
 import time
-from functools import wraps
 
 import dotenv
 
 from src.llm.translate import TranslateProcessor
 from src.llm.kimi import KimiProcessor
+from ..utils.execution import OperationCancelled, run_process
 from ..utils.logger import logger
+from .retry import ConfigurationError, TranscriptionError
+from .whisper_server import WhisperServer, WhisperServerUnavailable
 
 dotenv.load_dotenv()
 
-def timeout_decorator(seconds):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = [None]
-            error = [None]
-            completed = threading.Event()
-
-            def target():
-                try:
-                    result[0] = func(*args, **kwargs)
-                except Exception as e:
-                    error[0] = e
-                finally:
-                    completed.set()
-
-            thread = threading.Thread(target=target)
-            thread.daemon = True
-            thread.start()
-
-            if completed.wait(seconds):
-                if error[0] is not None:
-                    raise error[0]
-                return result[0]
-            raise TimeoutError(f"操作超时 ({seconds}秒)")
-
-        return wrapper
-    return decorator
+def _default_scratch_dir():
+    """优先使用内存盘 /dev/shm（Linux）；macOS 没有默认内存盘，使用系统临时目录"""
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
 
 class LocalWhisperProcessor:
     # 类级别的配置参数
@@ -68,137 +46,181 @@ class LocalWhisperProcessor:
         
         if not os.path.exists(full_model_path):
             raise FileNotFoundError(f"Whisper 模型未找到: {full_model_path}")
+        self.full_model_path = full_model_path
         
         self.timeout_seconds = self.DEFAULT_TIMEOUT
+        # pipe: stdin/stdout 直接交换数据；file: 经 JSON 文件（旧版 whisper-cli 不支持 -f -）
+        self.io_mode = os.getenv("WHISPER_IO_MODE", "pipe").lower()
+        if self.io_mode not in ("pipe", "file"):
+            raise ConfigurationError(f"无效的 WHISPER_IO_MODE: {self.io_mode}，可选 pipe / file")
+        self.scratch_dir = os.getenv("WHISPER_SCRATCH_DIR") or _default_scratch_dir()
+        self.server = self._create_server()
         self.translate_processor = TranslateProcessor()
         self.kimi_processor = KimiProcessor()
         # 是否启用Kimi润色功能（默认关闭，通过快捷键动态控制）
         self.enable_kimi_polish = os.getenv("ENABLE_KIMI_POLISH", "false").lower() == "true"
         
-    def _save_audio_to_temp_file(self, audio_buffer):
-        """将音频数据保存到临时WAV文件"""
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
+    def _create_server(self):
+        """按 WHISPER_BACKEND 创建常驻 whisper-server（auto|server|cli）
+
+        auto：找到 whisper-server 可执行文件时使用常驻进程，否则每次调用 whisper-cli
+        """
+        backend = os.getenv("WHISPER_BACKEND", "auto").lower()
+        if backend == "cli":
+            return None
+
+        default_server = os.path.join(os.path.dirname(self.whisper_cli_path), "whisper-server")
+        server_path = os.getenv("WHISPER_SERVER_PATH", default_server)
+        if not os.path.exists(server_path):
+            if backend == "server":
+                raise FileNotFoundError(f"Whisper server 未找到: {server_path}")
+            logger.info(f"未找到 whisper-server ({server_path})，使用 whisper-cli 逐次加载模型")
+            return None
+
+        port = os.getenv("WHISPER_SERVER_PORT")
+        server = WhisperServer(
+            server_path,
+            self.full_model_path,
+            port=int(port) if port else None,
+            extra_args=["-l", "auto", "-fa", "--beam-size", "5", "--best-of", "5"],
+            idle_timeout=float(os.getenv("WHISPER_SERVER_IDLE_TIMEOUT", "600")),
+            startup_timeout=float(os.getenv("WHISPER_SERVER_STARTUP_TIMEOUT", "120")),
+        )
+        # 后台预先加载模型，第一次转录不用等待
+        server.start_async()
+        return server
+
+    def _transcribe(self, wav_file, audio_bytes, token=None):
+        """优先使用常驻 whisper-server，服务无法启动或拒绝连接时回退到 whisper-cli
+
+        超时和其他服务端错误直接抛出：服务端可能仍在解码，再起一个 whisper-cli
+        会重复加载模型并突破本地并发上限。取消会中止尚未传完的上传，上传完成后服务端已在解码，
+        请求无法中途打断，只能在返回后丢弃结果。
+        """
+        if self.server is not None:
+            if token is not None:
+                token.raise_if_cancelled()
+            try:
+                result = self.server.transcribe(wav_file or audio_bytes, timeout=self.timeout_seconds, token=token)
+            except WhisperServerUnavailable as e:
+                logger.warning(f"whisper-server 不可用，回退到 whisper-cli: {e}")
+            else:
+                if token is not None and token.cancelled:
+                    raise OperationCancelled("whisper-server 请求已取消")
+                return result
+        return self._call_whisper_cpp(wav_file, audio_bytes, token=token)
+
+    def close(self):
+        """关闭常驻 whisper-server 进程"""
+        if self.server is not None:
+            self.server.stop()
+
+    @staticmethod
+    def _audio_source(audio_buffer):
+        """返回 (文件路径, 字节)，二者只有一个非空
+
+        缓冲区本身就是磁盘上的文件（未经 VAD 裁剪的 WAV / FLAC 存档录音）时直接把路径交给
+        whisper.cpp，不再复制一份临时文件；内存中的缓冲区则读出字节，通过 stdin 传入。
+        """
+        path = getattr(audio_buffer, "name", None)
+        if isinstance(path, str) and os.path.isfile(path):
+            return path, None
+        audio_buffer.seek(0)
+        return None, audio_buffer.read()
+
+    def _whisper_command(self, input_arg):
+        return [
+            self.whisper_cli_path,
+            "-m", self.full_model_path,
+            "-f", input_arg,
+            "-l", "auto",          # 自动检测中/英/粤
+            "-fa",                 # Flash-Attention
+            "--beam-size", "5",
+            "--best-of", "5",
+            "--no-prints",
+        ]
+
+    @staticmethod
+    def _decode_segments(raw_texts):
+        """一次性解码分段文本
+
+        whisper.cpp 按 token 输出原始字节，一个汉字的 UTF-8 字节可能被拆在两个分段里。
+        先按 latin1（字节原样）拼接全部分段，再整体按 UTF-8 解码一次。
+        """
+        joined = "".join(raw_texts)
         try:
-            # 重置缓冲区位置到开始
-            audio_buffer.seek(0)
-            temp_file.write(audio_buffer.read())
-            temp_file.flush()
-            return temp_file.name
-        finally:
-            temp_file.close()
+            return joined.encode("latin1").decode("utf-8", errors="replace").strip()
+        except UnicodeEncodeError:
+            # 已经是正常的 Unicode 文本（例如 JSON 中的 \u 转义）
+            return joined.strip()
 
-    @timeout_decorator(180)  # 修改为180秒（3分钟）
-    def _call_whisper_cpp(self, wav_file):
-        """调用本地whisper.cpp进行转录"""
-        # 创建临时文件作为输出前缀
-        prefix = tempfile.NamedTemporaryFile(delete=False).name
-        
+    @classmethod
+    def _parse_json_output(cls, raw: bytes) -> str:
+        data = json.loads(raw.decode("latin1"))
+        segments = data.get("transcription") or []
+        return cls._decode_segments(seg.get("text", "") for seg in segments)
+
+    def _call_whisper_cpp(self, wav_file=None, audio_bytes=None, token=None):
+        """调用本地whisper.cpp进行转录
+
+        pipe 模式：音频从文件路径或 stdin (-f -) 传入，结果从 stdout 读取（-nt 输出纯文本）
+        file 模式：兼容不支持 stdin 的旧版 whisper-cli，临时文件放在内存盘（WHISPER_SCRATCH_DIR）
+        超过 timeout_seconds 或被取消时直接结束 whisper-cli 子进程。
+        """
+        if self.io_mode == "pipe":
+            cmd = self._whisper_command(wav_file or "-") + ["-nt"]
+            logger.info(f"执行whisper.cpp命令: {' '.join(cmd)}")
+            result = run_process(cmd, input=audio_bytes, timeout=self.timeout_seconds, token=token)
+            return result.stdout.decode("utf-8", errors="replace").strip()
+
+        scratch_files = []
         try:
-            # 处理模型路径
-            if os.path.isabs(self.model_path):
-                model_path = self.model_path
-            else:
-                # 相对于whisper.cpp根目录
-                whisper_root = os.path.dirname(os.path.dirname(os.path.dirname(self.whisper_cli_path)))
-                model_path = os.path.join(whisper_root, self.model_path)
-            
-            # 构建命令
-            cmd = [
-                self.whisper_cli_path,
-                "-m", model_path,
-                "-f", wav_file,
-                "-l", "auto",          # 自动检测中/英/粤
-                "-fa",                 # Flash-Attention
-                "--beam-size", "5", 
-                "--best-of", "5",
-                "-ojf",                # verbose JSON
-                "-of", prefix, 
-                "--no-prints",
-            ]
-            
+            if wav_file is None:
+                with tempfile.NamedTemporaryFile(dir=self.scratch_dir, suffix=".wav", delete=False) as temp_file:
+                    temp_file.write(audio_bytes)
+                wav_file = temp_file.name
+                scratch_files.append(wav_file)
+            prefix = os.path.join(self.scratch_dir, f"whisper-{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}")
+            scratch_files.append(prefix + ".json")
+
+            cmd = self._whisper_command(wav_file) + ["-ojf", "-of", prefix]
             logger.info(f"执行whisper.cpp命令: {' '.join(cmd)}")
-            
-            # 执行命令
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
-            
-            # 读取JSON结果文件
-            json_file = prefix + ".json"
-            if not os.path.exists(json_file):
-                raise FileNotFoundError(f"输出JSON文件未找到: {json_file}")
-            
-            # 使用latin1编码读取JSON文件
-            data = None
-            try:
-                with open(json_file, encoding="latin1") as f:
-                    data = json.load(f)
-                logger.info("成功使用 latin1 编码读取文件")
-            except (UnicodeDecodeError, json.JSONDecodeError) as e:
-                logger.warning(f"使用 latin1 编码失败: {e}")
-                logger.info("尝试以二进制方式读取...")
-                with open(json_file, "rb") as f:
-                    content = f.read()
-                    try:
-                        content_str = content.decode("latin1", errors="replace")
-                        data = json.loads(content_str)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON解析失败: {e}")
-                        logger.error(f"文件内容预览: {content[:500]}")
-                        raise
-            
-            # 从转录结果中提取纯文字
-            full_txt = ""
-            if "transcription" in data:
-                segments = data["transcription"]
-                if isinstance(segments, list):
-                    text_parts = []
-                    for seg in segments:
-                        if "text" in seg:
-                            text = seg["text"]
-                            # 修复编码问题：将latin1编码的字符串重新解码为UTF-8
-                            try:
-                                if isinstance(text, str):
-                                    text = text.encode('latin1').decode('utf-8')
-                            except (UnicodeEncodeError, UnicodeDecodeError):
-                                pass
-                            text_parts.append(text)
-                    full_txt = "".join(text_parts)
-            
-            return full_txt.strip()
-            
+            run_process(cmd, timeout=self.timeout_seconds, token=token)
+
+            with open(prefix + ".json", "rb") as f:
+                return self._parse_json_output(f.read())
         finally:
-            # 清理临时文件
-            try:
-                if os.path.exists(prefix + ".json"):
-                    os.unlink(prefix + ".json")
-                if os.path.exists(prefix + ".txt"):
-                    os.unlink(prefix + ".txt")
-            except Exception as e:
-                logger.warning(f"清理临时文件失败: {e}")
-
-    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None):
+            for path in scratch_files:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                except Exception as e:
+                    logger.warning(f"清理临时文件失败: {e}")
+
+    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None, cancel_token=None):
         """处理音频（转录或翻译）
         
         Args:
             audio_buffer: 音频数据缓冲
             mode: 'transcriptions' 或 'translations'，决定是转录还是翻译
             prompt: 提示词（暂不支持）
+            cancel_token: 取消标记（对冲请求落败时取消）
         
         Returns:
             tuple: (结果文本, 错误信息)
             - 如果成功，错误信息为 None
             - 如果失败，结果文本为 None
         """
-        wav_file = None
         try:
             start_time = time.time()
             
             logger.info(f"正在使用本地 whisper.cpp 处理音频... (模式: {mode})")
 
-            # 保存音频到临时文件用于处理
-            wav_file = self._save_audio_to_temp_file(audio_buffer)
+            wav_file, audio_bytes = self._audio_source(audio_buffer)
             
             # 调用whisper.cpp进行转录
-            result = self._call_whisper_cpp(wav_file)
+            result = self._transcribe(wav_file, audio_bytes, token=cancel_token)
             
             logger.info(f"本地处理成功 ({mode}), 耗时: {time.time() - start_time:.1f}秒")
             logger.info(f"转录结果: {result}")
@@ -215,25 +237,17 @@ class LocalWhisperProcessor:
             
             return result, None
 
-        except TimeoutError:
+        except TimeoutError as e:
             error_msg = f"❌ 本地处理超时 ({self.timeout_seconds}秒)"
             logger.error(error_msg)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         except Exception as e:
             error_msg = f"❌ {str(e)}"
             logger.error(f"本地音频处理错误: {str(e)}", exc_info=True)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         finally:
-            # 清理临时WAV文件（注意：这里只删除用于处理的临时文件，不删除存档文件）
-            if wav_file and os.path.exists(wav_file):
-                try:
-                    os.unlink(wav_file)
-                    logger.debug(f"清理临时处理文件: {wav_file}")
-                except Exception as e:
-                    logger.warning(f"清理临时WAV文件失败: {e}")
-            
-            # 显式关闭字节流
+            # 显式关闭字节流（存档文件本身不删除）
             try:
                 audio_buffer.close()
             except Exception:
-                pass 
+                pass
@@ -0,0 +1,151 @@
+"""按音频内容寻址的转录结果缓存
+
+存档只按文件名记录结果，重试、手动重跑、同一段音频重复提交时都会重新上传。
+这里以 PCM 内容的哈希 + (service, model, mode, prompt) 作为键缓存转录结果，
+_run_job 调用任何处理器之前先查缓存：
+- 哈希的是解码后的采样数据，与 WAV 头、文件名无关
+- 缓存保存在 audio_archive/results.sqlite3，重启后仍然有效
+- 超过 RESULT_CACHE_MAX_ENTRIES 条时淘汰最久未使用的条目，
+  超过 RESULT_CACHE_MAX_AGE_DAYS 天的条目视为过期
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import soundfile as sf
+
+from ..utils.logger import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    audio_hash TEXT NOT NULL,
+    service TEXT NOT NULL,
+    model TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results(last_used);
+CREATE INDEX IF NOT EXISTS results_created_at ON results(created_at);
+"""
+
+_BLOCK_FRAMES = 1 << 16
+
+
+def audio_fingerprint(path: str) -> str:
+    """音频内容的 SHA-256：采样率、声道数 + int16 PCM 数据
+
+    soundfile 无法解码时退回到整个文件字节的哈希。
+    """
+    digest = hashlib.sha256()
+    try:
+        with sf.SoundFile(path) as audio:
+            digest.update(f"{audio.samplerate}:{audio.channels}:".encode("ascii"))
+            for block in audio.blocks(blocksize=_BLOCK_FRAMES, dtype="int16"):
+                digest.update(block.tobytes())
+    except RuntimeError:  # soundfile 的解码错误均继承自 RuntimeError
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(audio_hash: str, service: str, model: str, mode: str, prompt: str = "") -> str:
+    material = "\0".join((audio_hash, service, model, mode, prompt))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """SQLite 结果缓存，所有方法线程安全。"""
+
+    def __init__(self, path: str, *, max_entries: int = 5000, max_age_days: float = 90.0, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls, path: str) -> "ResultCache":
+        return cls(
+            path,
+            max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000")),
+            max_age_days=float(os.getenv("RESULT_CACHE_MAX_AGE_DAYS", "90")),
+        )
+
+    def _cutoff(self) -> float:
+        return self._clock() - self.max_age_days * 86400
+
+    def get(self, key: str) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM results WHERE key = ? AND created_at >= ?",
+                (key, self._cutoff()),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, text: str, *, audio_hash: str, service: str, model: str, mode: str) -> None:
+        if not text:
+            return
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, audio_hash, service, model, mode, text, created_at, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, audio_hash, service, model, mode, text, now, now),
+            )
+            self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        removed = self._conn.execute("DELETE FROM results WHERE created_at < ?", (self._cutoff(),)).rowcount
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            removed += self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (excess,),
+            ).rowcount
+        if removed:
+            self.evictions += removed
+            logger.debug(f"结果缓存淘汰 {removed} 条")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
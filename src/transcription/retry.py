@@ -0,0 +1,221 @@
+"""转录失败后的延迟重试
+
+以前失败的任务立即重新排到队尾，AUTO_RETRY_LIMIT=5 次重试会连续打到正在故障的
+OpenAI 接口上。这里：
+- classify_error 把错误分为 超时 / 限流(429) / 服务端(5xx) / 网络 / 客户端(4xx) / 未知，
+  客户端错误（鉴权失败、参数错误、文件不存在、配置错误）重试也不会成功，直接失败；
+  响应无法解析（网关返回 HTML 等）按服务端错误处理，可以重试
+- BackoffPolicy 按指数退避计算下一次重试的等待时间，并加入随机抖动，避免多个任务同时重试
+- RetryScheduler 用定时器堆保存等待中的重试，到期后再提交给调度器，不占用工作线程，
+  新任务不受影响
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Optional
+
+import httpx
+
+from ..utils.logger import logger
+
+
+class ErrorKind(str, Enum):
+    TIMEOUT = "timeout"
+    RATE_LIMITED = "rate_limited"
+    SERVER = "server"
+    NETWORK = "network"
+    CLIENT = "client"
+    UNKNOWN = "unknown"
+
+
+# 客户端错误之外都值得再试一次；未知错误保持以前的行为（重试）
+RETRYABLE_KINDS = frozenset(kind for kind in ErrorKind if kind is not ErrorKind.CLIENT)
+
+
+class ConfigurationError(ValueError):
+    """本地配置错误（未知的平台、无效的选项等），重试也不会成功。"""
+
+
+class TranscriptionError(str):
+    """处理器返回的错误信息
+
+    仍然是字符串（可以直接显示、写日志），同时保留原始异常供 classify_error 使用。
+    """
+
+    def __new__(cls, message: str, exception: Optional[BaseException] = None):
+        error = super().__new__(cls, message)
+        error.exception = exception
+        return error
+
+
+@dataclass(frozen=True)
+class ErrorInfo:
+    kind: ErrorKind
+    status: Optional[int] = None
+    retry_after: Optional[float] = None  # 服务端 Retry-After（秒）
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in RETRYABLE_KINDS
+
+
+_STATUS_PATTERN = re.compile(r"(?:Error code|status(?: code)?)[:\s]+(\d{3})", re.IGNORECASE)
+
+
+def _status_kind(status: int) -> ErrorKind:
+    if status == 429:
+        return ErrorKind.RATE_LIMITED
+    if status == 408:
+        return ErrorKind.TIMEOUT
+    if status >= 500:
+        return ErrorKind.SERVER
+    return ErrorKind.CLIENT
+
+
+def _retry_after(response) -> Optional[float]:
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _class_names(exception: BaseException) -> set:
+    return {cls.__name__ for cls in type(exception).__mro__}
+
+
+def classify_error(error) -> ErrorInfo:
+    """根据异常或错误信息判断错误类型"""
+    exception = error if isinstance(error, BaseException) else getattr(error, "exception", None)
+
+    if exception is not None:
+        response = getattr(exception, "response", None)
+        status = getattr(exception, "status_code", None) or getattr(response, "status_code", None)
+        names = _class_names(exception)
+        if isinstance(status, int) and status >= 400:
+            return ErrorInfo(_status_kind(status), status, _retry_after(response))
+        # openai.APITimeoutError 是 APIConnectionError 的子类，要先判断
+        if isinstance(exception, (TimeoutError, httpx.TimeoutException)) or "APITimeoutError" in names:
+            return ErrorInfo(ErrorKind.TIMEOUT)
+        if isinstance(exception, (ConnectionError, httpx.TransportError)) or "APIConnectionError" in names:
+            return ErrorInfo(ErrorKind.NETWORK)
+        # json.JSONDecodeError 也是 ValueError：代理 / 网关返回了非 JSON 的响应体，属于服务端问题
+        if isinstance(exception, (json.JSONDecodeError, UnicodeDecodeError)):
+            return ErrorInfo(ErrorKind.SERVER)
+        if isinstance(exception, (FileNotFoundError, ConfigurationError)):
+            return ErrorInfo(ErrorKind.CLIENT)
+
+    message = str(error or "")
+    match = _STATUS_PATTERN.search(message)
+    if match:
+        status = int(match.group(1))
+        return ErrorInfo(_status_kind(status), status)
+    lowered = message.lower()
+    if "超时" in message or "timeout" in lowered or "timed out" in lowered:
+        return ErrorInfo(ErrorKind.TIMEOUT)
+    if "connection" in lowered or "连接" in message:
+        return ErrorInfo(ErrorKind.NETWORK)
+    return ErrorInfo(ErrorKind.UNKNOWN)
+
+
+@dataclass
+class BackoffPolicy:
+    """指数退避 + 抖动：第 n 次失败后等待 [cap/2, cap]，cap = base * factor^(n-1)，不超过 max_delay"""
+
+    base_delay: float = 2.0
+    factor: float = 2.0
+    max_delay: float = 60.0
+    rate_limit_delay: float = 10.0  # 429 至少等待这么久
+
+    @classmethod
+    def from_env(cls) -> "BackoffPolicy":
+        return cls(
+            base_delay=float(os.getenv("RETRY_BASE_DELAY", "2")),
+            max_delay=float(os.getenv("RETRY_MAX_DELAY", "60")),
+        )
+
+    def delay(self, failures: int, info: ErrorInfo, rng: Optional[random.Random] = None) -> float:
+        rng = rng or random
+        cap = min(self.max_delay, self.base_delay * self.factor ** max(0, failures - 1))
+        delay = rng.uniform(cap / 2, cap)
+        if info.kind is ErrorKind.RATE_LIMITED:
+            delay = max(delay, self.rate_limit_delay)
+        if info.retry_after is not None:
+            delay = max(delay, min(info.retry_after, self.max_delay))
+        return delay
+
+
+class RetryScheduler:
+    """定时器堆：schedule(job, delay) 到期后调用 submit(job)
+
+    autostart=False 时不启动后台线程，由调用方（测试）推进 clock 后调用 run_due()。
+    """
+
+    def __init__(
+        self,
+        submit: Callable,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        autostart: bool = True,
+    ):
+        self._submit = submit
+        self._clock = clock
+        self._heap = []
+        self._counter = itertools.count()  # 到期时间相同时按加入顺序
+        self._cond = threading.Condition()
+        if autostart:
+            threading.Thread(target=self._loop, name="retry-scheduler", daemon=True).start()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._heap)
+
+    def next_due(self) -> Optional[float]:
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def schedule(self, job, delay: float) -> float:
+        due = self._clock() + max(0.0, delay)
+        with self._cond:
+            heapq.heappush(self._heap, (due, next(self._counter), job))
+            self._cond.notify()
+        return due
+
+    def _pop_due(self) -> list:
+        now = self._clock()
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[2])
+        return due
+
+    def run_due(self) -> int:
+        """提交所有已到期的任务，返回提交数量"""
+        due = self._pop_due()
+        for job in due:
+            try:
+                self._submit(job)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"提交重试任务失败: {exc}", exc_info=True)
+        return len(due)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                remaining = self._heap[0][0] - self._clock()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            self.run_due()
@@ -0,0 +1,174 @@
+"""转录任务调度器
+
+以前所有转录任务由一个后台线程依次处理，3 分钟的 OpenAI 上传会挡住排在后面的
+5 秒本地 Ctrl+I 任务。这里按通道（lane）并发执行任务，每个通道单独限制并发数：
+- local：whisper.cpp 占用大量 CPU/内存，默认同时只跑 1 个
+- openai / translations / siliconflow：远程 API，可以同时跑多个
+
+通道内仍按提交顺序开始执行。outstanding 统计排队中 + 执行中的任务数，供状态栏显示。
+在通道之外执行的调用（对冲的备用请求）通过 try_reserve / release 占用同一组并发名额。
+"""
+
+import os
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Mapping, Optional
+
+from ..utils.logger import logger
+
+DEFAULT_LANE_LIMITS = {
+    "openai": 3,
+    "translations": 2,
+    "siliconflow": 2,
+    "local": 1,
+}
+
+
+def lane_limits_from_env(defaults: Mapping[str, int] = DEFAULT_LANE_LIMITS) -> Dict[str, int]:
+    """读取 TRANSCRIBE_CONCURRENCY_<LANE> 覆盖默认并发数"""
+    limits = {}
+    for lane, default in defaults.items():
+        value = int(os.getenv(f"TRANSCRIBE_CONCURRENCY_{lane.upper()}", str(default)))
+        limits[lane] = max(1, value)
+    return limits
+
+
+@dataclass
+class _Lane:
+    name: str
+    limit: int
+    jobs: "queue.Queue" = field(default_factory=queue.Queue)
+    queued: int = 0
+    running: int = 0
+    workers: list = field(default_factory=list)
+    slots: Optional[threading.Semaphore] = None  # 并发名额：工作线程和 try_reserve 共用
+
+
+class JobScheduler:
+    """按通道并发执行任务。
+
+    runner(job) 在工作线程中执行；lane_of(job) 决定任务所在通道；
+    on_change() 在任务入队、开始、结束时调用（用于刷新状态栏）。
+    """
+
+    def __init__(
+        self,
+        runner: Callable,
+        *,
+        lane_of: Callable,
+        limits: Optional[Mapping[str, int]] = None,
+        default_limit: int = 1,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self._runner = runner
+        self._lane_of = lane_of
+        self._limits = dict(limits if limits is not None else lane_limits_from_env())
+        self._default_limit = default_limit
+        self._on_change = on_change
+        self._lanes: Dict[str, _Lane] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+
+    @property
+    def outstanding(self) -> int:
+        """排队中 + 执行中的任务数"""
+        with self._lock:
+            return self._outstanding
+
+    def lane_stats(self) -> Dict[str, dict]:
+        with self._lock:
+            return {
+                name: {"queued": lane.queued, "running": lane.running, "limit": lane.limit}
+                for name, lane in self._lanes.items()
+            }
+
+    def has_capacity(self, name: str) -> bool:
+        """通道是否还有空闲的并发名额"""
+        with self._lock:
+            lane = self._lanes.get(name)
+            if lane is None:
+                return True
+            return lane.queued + lane.running < lane.limit
+
+    def try_reserve(self, name: str) -> bool:
+        """不等待地占用通道的一个并发名额（通道内有排队任务时不插队），成功后须调用 release"""
+        with self._lock:
+            lane = self._get_lane(name)
+            if lane.queued or not lane.slots.acquire(blocking=False):
+                return False
+            lane.running += 1
+        self._changed()
+        return True
+
+    def release(self, name: str) -> None:
+        """释放 try_reserve 占用的名额"""
+        with self._lock:
+            lane = self._lanes[name]
+            lane.running -= 1
+        lane.slots.release()
+        self._changed()
+
+    def _get_lane(self, name: str) -> _Lane:
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = _Lane(name, self._limits.get(name, self._default_limit))
+            lane.slots = threading.Semaphore(lane.limit)
+            for index in range(lane.limit):
+                worker = threading.Thread(
+                    target=self._worker,
+                    args=(lane,),
+                    name=f"transcription-{name}-{index}",
+                    daemon=True,
+                )
+                worker.start()
+                lane.workers.append(worker)
+            self._lanes[name] = lane
+        return lane
+
+    def submit(self, job) -> str:
+        """提交任务，返回所在通道名"""
+        name = self._lane_of(job)
+        with self._lock:
+            lane = self._get_lane(name)
+            lane.queued += 1
+            self._outstanding += 1
+        lane.jobs.put(job)
+        self._changed()
+        return name
+
+    def _worker(self, lane: _Lane) -> None:
+        while True:
+            job = lane.jobs.get()
+            # 名额可能被 try_reserve 占用，等它释放后再开始（任务在此之前仍计为排队中）
+            lane.slots.acquire()
+            with self._lock:
+                lane.queued -= 1
+                lane.running += 1
+            self._changed()
+            try:
+                self._runner(job)
+            except Exception as exc:  # noqa: BLE001
+                logger.error(f"转录任务处理失败 ({lane.name}): {exc}", exc_info=True)
+            finally:
+                with self._lock:
+                    lane.running -= 1
+                    self._outstanding -= 1
+                    if self._outstanding == 0:
+                        self._idle.notify_all()
+                lane.slots.release()
+                self._changed()
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有任务完成，超时返回 False"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def _changed(self) -> None:
+        if self._on_change is None:
+            return
+        try:
+            self._on_change()
+        except Exception as exc:  # noqa: BLE001
+            logger.debug(f"调度状态回调失败: {exc}")
@@ -1,50 +1,25 @@
 import os
-import threading
 import time
-from functools import wraps
 
 import dotenv
-import httpx
 
 from src.llm.translate import TranslateProcessor
 from src.llm.kimi import KimiProcessor
+from ..audio.encoding import as_upload_file
+from ..utils.execution import CancelToken, cancellable_upload, run_with_timeout
+from ..utils.http import get_http_client
 from ..utils.logger import logger
+from .retry import TranscriptionError
 
 dotenv.load_dotenv()
 
-def timeout_decorator(seconds):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = [None]
-            error = [None]
-            completed = threading.Event()
-
-            def target():
-                try:
-                    result[0] = func(*args, **kwargs)
-                except Exception as e:
-                    error[0] = e
-                finally:
-                    completed.set()
-
-            thread = threading.Thread(target=target)
-            thread.daemon = True
-            thread.start()
-
-            if completed.wait(seconds):
-                if error[0] is not None:
-                    raise error[0]
-                return result[0]
-            raise TimeoutError(f"操作超时 ({seconds}秒)")
-
-        return wrapper
-    return decorator
-
 class SenseVoiceSmallProcessor:
     # 类级别的配置参数
     DEFAULT_TIMEOUT = 20  # API 超时时间（秒）
+    TRANSCRIPTION_URL = "https://api.siliconflow.cn/v1/audio/transcriptions"
     DEFAULT_MODEL = "FunAudioLLM/SenseVoiceSmall"
+    # 服务端接受的上传格式（不支持 flac，Opus 需显式设置 UPLOAD_FORMAT=opus）
+    UPLOAD_FORMATS = ("wav", "opus")
     
     def __init__(self):
         api_key = os.getenv("SILICONFLOW_API_KEY")
@@ -56,6 +31,7 @@ class SenseVoiceSmallProcessor:
         # self.add_symbol = os.getenv("ADD_SYMBOL", "false").lower() == "true"
         # self.optimize_result = os.getenv("OPTIMIZE_RESULT", "false").lower() == "true"
         self.timeout_seconds = self.DEFAULT_TIMEOUT
+        self.http_client = get_http_client(self.TRANSCRIPTION_URL)
         self.translate_processor = TranslateProcessor()
         self.kimi_processor = KimiProcessor()
         # 是否启用Kimi润色功能（默认关闭，通过快捷键动态控制）
@@ -67,13 +43,13 @@ class SenseVoiceSmallProcessor:
             return text
         return self.cc.convert(text)
 
-    @timeout_decorator(10)
-    def _call_api(self, audio_data):
-        """调用硅流 API"""
-        transcription_url = "https://api.siliconflow.cn/v1/audio/transcriptions"
-        
+    def _call_api(self, audio_data, token: CancelToken):
+        """调用硅流 API（共享连接池）
+
+        取消时中止尚未传完的上传；上传完成后只能等响应或客户端超时，结果被丢弃。
+        """
         files = {
-            'file': ('audio.wav', audio_data),
+            'file': cancellable_upload(as_upload_file(audio_data), token),
             'model': (None, self.DEFAULT_MODEL)
         }
 
@@ -81,18 +57,21 @@ class SenseVoiceSmallProcessor:
             'Authorization': f"Bearer {os.getenv('SILICONFLOW_API_KEY')}"
         }
 
-        with httpx.Client() as client:
-            response = client.post(transcription_url, files=files, headers=headers)
-            response.raise_for_status()
-            return response.json().get('text', '获取失败')
+        response = self.http_client.post(
+            self.TRANSCRIPTION_URL, files=files, headers=headers, timeout=self.timeout_seconds
+        )
+        token.raise_if_cancelled()
+        response.raise_for_status()
+        return response.json().get('text', '获取失败')
 
 
-    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None):
+    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None, cancel_token=None):
         """处理音频（转录或翻译）
         
         Args:
             audio_buffer: 音频数据缓冲
             mode: 'transcriptions' 或 'translations'，决定是转录还是翻译
+            cancel_token: 取消标记（对冲请求落败时取消）
         
         Returns:
             tuple: (结果文本, 错误信息)
@@ -103,7 +82,8 @@ class SenseVoiceSmallProcessor:
             start_time = time.time()
 
             logger.info(f"正在调用 硅基流动 API... (模式: {mode})")
-            result = self._call_api(audio_buffer)
+            token = cancel_token or CancelToken()
+            result = run_with_timeout(self._call_api, audio_buffer, token, timeout=self.timeout_seconds, token=token)
 
             logger.info(f"API 调用成功 ({mode}), 耗时: {time.time() - start_time:.1f}秒")
             # result = self._convert_traditional_to_simplified(result)
@@ -117,13 +97,14 @@ class SenseVoiceSmallProcessor:
 
             return result, None
 
-        except TimeoutError:
+        except TimeoutError as e:
             error_msg = f"❌ API 请求超时 ({self.timeout_seconds}秒)"
             logger.error(error_msg)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         except Exception as e:
             error_msg = f"❌ {str(e)}"
             logger.error(f"音频处理错误: {str(e)}", exc_info=True)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         finally:
-            audio_buffer.close()  # 显式关闭字节流
+            if hasattr(audio_buffer, "close"):
+                audio_buffer.close()  # 显式关闭字节流
@@ -1,51 +1,26 @@
 import os
-import threading
 import time
-from functools import wraps
 
 import dotenv
 from openai import OpenAI
 from opencc import OpenCC
 
+from ..audio.encoding import as_upload_file
 from ..llm.symbol import SymbolProcessor
+from ..utils.execution import CancelToken, cancellable_upload, run_with_timeout
+from ..utils.http import get_http_client
 from ..utils.logger import logger
+from .retry import ConfigurationError, TranscriptionError
 
 dotenv.load_dotenv()
 
-def timeout_decorator(seconds):
-    def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            result = [None]
-            error = [None]
-            completed = threading.Event()
-
-            def target():
-                try:
-                    result[0] = func(*args, **kwargs)
-                except Exception as e:
-                    error[0] = e
-                finally:
-                    completed.set()
-
-            thread = threading.Thread(target=target)
-            thread.daemon = True
-            thread.start()
-
-            if completed.wait(seconds):
-                if error[0] is not None:
-                    raise error[0]
-                return result[0]
-            raise TimeoutError(f"操作超时 ({seconds}秒)")
-
-        return wrapper
-    return decorator
-
 class WhisperProcessor:
     # 类级别的配置参数
     DEFAULT_TIMEOUT = 20  # API 超时时间（秒）- GROQ等其他服务
     OPENAI_TIMEOUT = 180  # OpenAI GPT-4o transcribe 超时时间（秒）
     DEFAULT_MODEL = None
+    # 服务端接受的上传格式（OpenAI / GROQ 均支持 flac、ogg、wav 等）
+    UPLOAD_FORMATS = ("flac", "ogg", "wav")
     
     def __init__(self):
         self.convert_to_simplified = os.getenv("CONVERT_TO_SIMPLIFIED", "false").lower() == "true"
@@ -61,7 +36,14 @@ class WhisperProcessor:
             api_key = os.getenv("OFFICIAL_OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
             assert api_key, "未设置 OFFICIAL_OPENAI_API_KEY 或 OPENAI_API_KEY 环境变量"
             # 使用官方 OpenAI API
-            self.client = OpenAI(api_key=api_key, base_url="https://api.openai.com/v1")
+            base_url = "https://api.openai.com/v1"
+            self.client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=self.timeout_seconds,
+                max_retries=0,  # 重试由任务队列按错误类型退避处理
+                http_client=get_http_client(base_url),
+            )
             self.DEFAULT_MODEL = "gpt-4o-transcribe"
         elif self.service_platform == "groq":
             api_key = os.getenv("GROQ_API_KEY")
@@ -69,7 +51,10 @@ class WhisperProcessor:
             assert api_key, "未设置 GROQ_API_KEY 环境变量"
             self.client = OpenAI(
                 api_key=api_key,
-                base_url=base_url if base_url else None
+                base_url=base_url if base_url else None,
+                timeout=self.timeout_seconds,
+                max_retries=0,
+                http_client=get_http_client(base_url),
             )
             self.DEFAULT_MODEL = "whisper-large-v3-turbo"
         elif self.service_platform == "siliconflow":
@@ -77,7 +62,7 @@ class WhisperProcessor:
             assert api_key, "未设置 SILICONFLOW_API_KEY 环境变量"
             self.DEFAULT_MODEL = "FunAudioLLM/SenseVoiceSmall"
         else:
-            raise ValueError(f"未知的平台: {self.service_platform}")
+            raise ConfigurationError(f"未知的平台: {self.service_platform}")
         
     def _convert_traditional_to_simplified(self, text):
         """将繁体中文转换为简体中文"""
@@ -85,60 +70,57 @@ class WhisperProcessor:
             return text
         return self.cc.convert(text)
     
-    @timeout_decorator(180)  # OpenAI 专用超时时间
-    def _call_openai_api(self, mode, audio_data, prompt):
+    def _call_openai_api(self, mode, audio_data, prompt, token):
         """调用 OpenAI GPT-4o transcribe API"""
         if mode == "translations":
             response = self.client.audio.translations.create(
                 model="gpt-4o-transcribe",
                 response_format="text",
                 prompt=prompt,
-                file=("audio.wav", audio_data)
+                file=cancellable_upload(as_upload_file(audio_data), token)
             )
         else:  # transcriptions
             response = self.client.audio.transcriptions.create(
                 model="gpt-4o-transcribe",
                 response_format="text",
                 prompt=prompt,
-                file=("audio.wav", audio_data)
+                file=cancellable_upload(as_upload_file(audio_data), token)
             )
         return str(response).strip()
     
-    def _call_whisper_api(self, mode, audio_data, prompt):
-        """调用 Whisper API"""
+    def _call_whisper_api(self, mode, audio_data, prompt, token):
+        """调用 Whisper API；取消时中止尚未传完的上传"""
         if self.service_platform == "openai":
-            # 使用专用的 OpenAI API 调用（已有180秒超时）
-            return self._call_openai_api(mode, audio_data, prompt)
+            return self._call_openai_api(mode, audio_data, prompt, token)
         else:
-            # GROQ API 使用10秒超时
-            return self._call_groq_api(mode, audio_data, prompt)
+            return self._call_groq_api(mode, audio_data, prompt, token)
     
-    @timeout_decorator(10)
-    def _call_groq_api(self, mode, audio_data, prompt):
+    def _call_groq_api(self, mode, audio_data, prompt, token):
         """调用 GROQ API"""
         if mode == "translations":
             response = self.client.audio.translations.create(
                 model="whisper-large-v3",
                 response_format="text",
                 prompt=prompt,
-                file=("audio.wav", audio_data)
+                file=cancellable_upload(as_upload_file(audio_data), token)
             )
         else:  # transcriptions
             response = self.client.audio.transcriptions.create(
                 model="whisper-large-v3-turbo",
                 response_format="text",
                 prompt=prompt,
-                file=("audio.wav", audio_data)
+                file=cancellable_upload(as_upload_file(audio_data), token)
             )
         return str(response).strip()
 
-    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None):
+    def process_audio(self, audio_buffer, mode="transcriptions", prompt="", archive_path=None, cancel_token=None):
         """调用 Whisper API 处理音频（转录或翻译）
         
         Args:
             audio_path: 音频文件路径
             mode: 'transcriptions' 或 'translations'，决定是转录还是翻译
             prompt: 提示词
+            cancel_token: 取消标记（对冲请求落败时取消）
         
         Returns:
             tuple: (结果文本, 错误信息)
@@ -149,7 +131,12 @@ class WhisperProcessor:
             start_time = time.time()
 
             logger.info(f"正在调用 Whisper API... (模式: {mode})")
-            result = self._call_whisper_api(mode, audio_buffer, prompt)
+            # 客户端超时会中止 HTTP 请求；执行器超时兜底整个上传过程
+            token = cancel_token or CancelToken()
+            result = run_with_timeout(
+                self._call_whisper_api, mode, audio_buffer, prompt, token,
+                timeout=self.timeout_seconds, token=token,
+            )
 
             logger.info(f"API 调用成功 ({mode}), 耗时: {time.time() - start_time:.1f}秒")
             result = self._convert_traditional_to_simplified(result)
@@ -168,13 +155,14 @@ class WhisperProcessor:
             return result, None
             
 
-        except TimeoutError:
+        except TimeoutError as e:
             error_msg = f"❌ API 请求超时 ({self.timeout_seconds}秒)"
             logger.error(error_msg)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         except Exception as e:
             error_msg = f"❌ {str(e)}"
             logger.error(f"音频处理错误: {str(e)}", exc_info=True)
-            return None, error_msg
+            return None, TranscriptionError(error_msg, e)
         finally:
-            audio_buffer.close()  # 显式关闭字节流
+            if hasattr(audio_buffer, "close"):
+                audio_buffer.close()  # 显式关闭字节流
@@ -0,0 +1,253 @@
+"""常驻 whisper.cpp server 后端
+
+每次 Ctrl+I 都启动一次 whisper-cli，ggml-large-v3 模型要先花几秒到几十秒加载，
+之后才开始解码。这里改为启动一个常驻的 whisper-server 进程（模型只加载一次），
+通过本地 HTTP 提交转录任务：
+- GET /health：模型加载完成后返回 200，加载中返回 503
+- POST /inference：multipart 上传音频（WAV 或 FLAC 存档），response_format=json 返回 {"text": ...}
+
+进程意外退出或健康检查失败时自动重启；空闲超过 idle_timeout 后关闭进程释放内存，
+下次使用时重新启动。
+
+只有进程无法启动或拒绝连接时抛出 WhisperServerUnavailable（调用方可以回退到 whisper-cli）；
+请求超时抛出 TimeoutError，此时服务端仍在解码，不应再另起一个 whisper-cli 重复加载模型。
+"""
+
+import atexit
+import io
+import os
+import socket
+import subprocess
+import threading
+import time
+from typing import Callable, Optional, Sequence, Union
+
+import httpx
+
+from ..utils.execution import CancelToken, cancellable_upload
+from ..utils.logger import logger
+
+
+class WhisperServerError(RuntimeError):
+    """whisper-server 请求失败。"""
+
+
+class WhisperServerUnavailable(WhisperServerError):
+    """whisper-server 无法启动或拒绝连接。"""
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+class WhisperServer:
+    """管理一个常驻的 whisper-server 子进程。"""
+
+    HEALTH_POLL_INTERVAL = 0.2  # 等待模型加载时的健康检查间隔（秒）
+
+    def __init__(
+        self,
+        server_path: str,
+        model_path: str,
+        *,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        extra_args: Sequence[str] = (),
+        idle_timeout: float = 600.0,
+        startup_timeout: float = 120.0,
+        popen: Callable = subprocess.Popen,
+    ):
+        self.server_path = server_path
+        self.model_path = model_path
+        self.host = host
+        self.port = port
+        self.extra_args = list(extra_args)
+        self.idle_timeout = idle_timeout
+        self.startup_timeout = startup_timeout
+        self._popen = popen
+
+        self._process: Optional[subprocess.Popen] = None
+        self._base_url: Optional[str] = None
+        self._lock = threading.RLock()  # 启动/停止进程互斥
+        self._idle_timer: Optional[threading.Timer] = None
+        self._active_requests = 0
+        self.restarts = 0
+        # 应用退出时关闭子进程，避免常驻模型进程变成孤儿
+        atexit.register(self.stop)
+
+    @property
+    def pid(self) -> Optional[int]:
+        process = self._process
+        return process.pid if process is not None and process.poll() is None else None
+
+    def is_running(self) -> bool:
+        return self.pid is not None
+
+    def _command(self, port: int) -> list:
+        return [
+            self.server_path,
+            "-m", self.model_path,
+            "--host", self.host,
+            "--port", str(port),
+            *self.extra_args,
+        ]
+
+    def _healthy(self, timeout: float = 2.0) -> bool:
+        try:
+            response = httpx.get(f"{self._base_url}/health", timeout=timeout)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def _start_locked(self) -> None:
+        port = self.port or _free_port(self.host)
+        command = self._command(port)
+        logger.info(f"🚀 启动 whisper-server: {' '.join(command)}")
+        started = time.time()
+        self._process = self._popen(
+            command,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._base_url = f"http://{self.host}:{port}"
+
+        deadline = started + self.startup_timeout
+        while time.time() < deadline:
+            if self._process.poll() is not None:
+                code = self._process.returncode
+                self._process = None
+                raise WhisperServerUnavailable(f"whisper-server 启动后立即退出 (退出码 {code})")
+            if self._healthy(timeout=1.0):
+                logger.info(f"✅ whisper-server 已就绪 (模型加载耗时 {time.time() - started:.1f}秒)")
+                return
+            time.sleep(self.HEALTH_POLL_INTERVAL)
+
+        self._stop_locked()
+        raise WhisperServerUnavailable(f"whisper-server 启动超时 ({self.startup_timeout}秒)")
+
+    def _stop_locked(self) -> None:
+        process, self._process = self._process, None
+        if process is None or process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            logger.warning("whisper-server 未响应 terminate，强制结束")
+            process.kill()
+            process.wait()
+
+    def ensure_running(self) -> str:
+        """确保进程在运行且健康，返回服务地址。"""
+        with self._lock:
+            self._cancel_idle_timer()
+            if self.is_running():
+                if self._healthy():
+                    return self._base_url
+                logger.warning("whisper-server 健康检查失败，重启")
+                self._stop_locked()
+                self.restarts += 1
+            elif self._process is not None:
+                logger.warning(f"whisper-server 已退出 (退出码 {self._process.returncode})，重启")
+                self._process = None
+                self.restarts += 1
+            self._start_locked()
+            return self._base_url
+
+    def start_async(self) -> None:
+        """后台预先启动（应用启动时调用，让第一次转录不用等模型加载）。"""
+        def _warm_up():
+            try:
+                self.ensure_running()
+                self._schedule_idle_stop()
+            except Exception as exc:  # noqa: BLE001
+                logger.warning(f"预启动 whisper-server 失败: {exc}")
+
+        threading.Thread(target=_warm_up, name="whisper-server-warmup", daemon=True).start()
+
+    def transcribe(
+        self,
+        audio: Union[str, bytes],
+        *,
+        language: str = "auto",
+        timeout: float = 180.0,
+        token: Optional[CancelToken] = None,
+    ) -> str:
+        """提交音频（WAV / FLAC 文件路径或 WAV 字节），返回转录文本。进程挂掉时自动重启并重试一次。
+
+        token 取消时中止尚未传完的上传；上传完成后服务端已开始解码，只能等它返回。
+        """
+        with self._lock:
+            self._active_requests += 1
+        try:
+            for attempt in (1, 2):
+                base_url = self.ensure_running()
+                try:
+                    return self._post_inference(base_url, audio, language, timeout, token)
+                except httpx.TimeoutException as exc:
+                    raise TimeoutError(f"whisper-server 请求超时 ({timeout}秒)") from exc
+                except httpx.TransportError as exc:
+                    if attempt == 2 or self.is_running():
+                        error = WhisperServerUnavailable if isinstance(exc, httpx.ConnectError) else WhisperServerError
+                        raise error(f"whisper-server 请求失败: {exc}") from exc
+                    logger.warning(f"whisper-server 在请求过程中退出，重启后重试: {exc}")
+        finally:
+            with self._lock:
+                self._active_requests -= 1
+                if self._active_requests == 0:
+                    self._schedule_idle_stop()
+
+    def _post_inference(
+        self, base_url: str, audio: Union[str, bytes], language: str, timeout: float, token: Optional[CancelToken]
+    ) -> str:
+        if isinstance(audio, (bytes, bytearray)):
+            audio_file = io.BytesIO(audio)
+            filename = "audio.wav"
+        else:
+            audio_file = open(audio, "rb")
+            filename = os.path.basename(audio)
+        content_type = "audio/flac" if filename.lower().endswith(".flac") else "audio/wav"
+        with audio_file:
+            response = httpx.post(
+                f"{base_url}/inference",
+                files={"file": cancellable_upload((filename, audio_file, content_type), token)},
+                data={"response_format": "json", "language": language, "temperature": "0.0"},
+                timeout=timeout,
+            )
+        if response.status_code != 200:
+            raise WhisperServerError(f"whisper-server 返回 {response.status_code}: {response.text[:200]}")
+        payload = response.json()
+        if "error" in payload:
+            raise WhisperServerError(f"whisper-server 转录失败: {payload['error']}")
+        return payload.get("text", "").strip()
+
+    def _cancel_idle_timer(self) -> None:
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    def _schedule_idle_stop(self) -> None:
+        with self._lock:
+            self._cancel_idle_timer()
+            if self.idle_timeout <= 0 or not self.is_running():
+                return
+            timer = threading.Timer(self.idle_timeout, self._idle_stop)
+            timer.daemon = True
+            timer.start()
+            self._idle_timer = timer
+
+    def _idle_stop(self) -> None:
+        with self._lock:
+            if self._active_requests:
+                return
+            self._idle_timer = None
+            if self.is_running():
+                logger.info(f"💤 whisper-server 空闲 {self.idle_timeout:.0f} 秒，关闭进程释放模型内存")
+                self._stop_locked()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._cancel_idle_timer()
+            self._stop_locked()
@@ -0,0 +1,272 @@
+"""带超时和取消的调用执行
+
+以前 whisper.py / senseVoiceSmall.py / local_whisper.py 各自复制了一份 timeout_decorator：
+每次调用新建一个线程，超时后线程继续运行，超时的上传和 whisper.cpp 子进程在重试中越积越多。
+
+这里改为：
+- BoundedExecutor：共享的有界线程池（EXECUTOR_MAX_WORKERS），超时或取消时立即返回，
+  并通过 CancelToken 通知正在执行的调用停止；超时从调用开始执行时计时，排队时间不计入
+- CancelToken：协作式取消，调用方注册取消回调；被放弃但仍在执行的调用登记在 token 上，
+  when_settled() 在它们真正结束后回调（用于在那之前不释放并发名额）
+- run_process：子进程超时或取消时直接 kill 并回收，不留孤儿进程
+- cancellable_upload：上传内容按块读取，取消后下一块即抛出 OperationCancelled，中止上传
+
+HTTP 请求无法从别的线程打断：取消会中止还没传完的上传，但上传完成后等待响应的阶段
+只能等到服务端返回或客户端超时（结果丢弃），线程池中的线程最迟在客户端超时后结束。
+"""
+
+import io
+import os
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from .logger import logger
+
+
+class OperationCancelled(RuntimeError):
+    """调用被 CancelToken 取消。"""
+
+
+class CancelToken:
+    """协作式取消标记；cancel() 后依次执行已注册的回调。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: List[Callable[[], None]] = []
+        self._pending: List = []  # 被放弃但仍在执行的调用（Future）
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._invoke(callback)
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """注册取消回调（已取消时立即执行），返回用于注销的函数"""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        self._invoke(callback)
+        return lambda: None
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled:
+            raise OperationCancelled("操作已取消")
+
+    def track(self, future) -> None:
+        """登记超时或取消后仍在执行的调用"""
+        with self._lock:
+            self._pending.append(future)
+
+    def when_settled(self, callback: Callable[[], None]) -> None:
+        """登记的调用全部真正结束后执行 callback（没有登记的调用时立即执行）"""
+        with self._lock:
+            pending = [future for future in self._pending if not future.done()]
+        if not pending:
+            self._invoke(callback)
+            return
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def _done(_future):
+            with lock:
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if finished:
+                self._invoke(callback)
+
+        for future in pending:
+            future.add_done_callback(_done)
+
+    def _remove(self, callback) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    @staticmethod
+    def _invoke(callback) -> None:
+        try:
+            callback()
+        except Exception as exc:  # noqa: BLE001
+            logger.debug(f"取消回调执行失败: {exc}")
+
+
+class BoundedExecutor:
+    """有界线程池：run() 等待结果，超时或取消时通知调用停止并立即返回。"""
+
+    def __init__(self, max_workers: int = 8, name: str = "call"):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """排队中 + 执行中的调用数"""
+        with self._lock:
+            return self._in_flight
+
+    def run(self, func: Callable, *args, timeout: Optional[float] = None, token: Optional[CancelToken] = None, **kwargs):
+        """在线程池中执行 func(*args, **kwargs)
+
+        超时抛出 TimeoutError，token 被取消抛出 OperationCancelled；两种情况下都会
+        取消 token（触发其回调），还在排队的调用不再执行。
+
+        timeout 从调用开始执行时计时：线程池满时的排队等待不算超时，
+        否则一次慢调用会让排在后面的调用还没开始就超时。
+        """
+        token = token or CancelToken()
+        token.raise_if_cancelled()
+        running = threading.Event()
+        finished = threading.Event()  # 调用结束或被取消
+        woken = threading.Event()  # 开始执行、结束或被取消
+
+        def call():
+            running.set()
+            woken.set()
+            return func(*args, **kwargs)
+
+        with self._lock:
+            self._in_flight += 1
+        future = self._pool.submit(call)
+        future.add_done_callback(self._finished)
+
+        def wake(_future=None):
+            finished.set()
+            woken.set()
+
+        future.add_done_callback(wake)
+        unregister = token.on_cancel(wake)
+        try:
+            woken.wait()
+            if running.is_set() and not finished.wait(timeout):
+                future.cancel()
+                token.track(future)
+                token.cancel()
+                raise TimeoutError(f"操作超时 ({timeout}秒)")
+            if token.cancelled:
+                future.cancel()
+                token.track(future)
+                raise OperationCancelled("操作已取消")
+            return future.result()
+        finally:
+            unregister()
+
+    def _finished(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_shared_executor: Optional[BoundedExecutor] = None
+_shared_lock = threading.Lock()
+
+
+def default_max_workers() -> int:
+    """按转录通道的并发数计算线程池大小
+
+    同时执行的调用最多是各通道并发数之和（对冲的备用请求占用同一组名额）；
+    超时或取消后仍在后台等待响应的调用也占着线程，再留出同样多的余量，
+    避免线程池成为比通道并发数更紧的瓶颈。
+    """
+    from ..transcription.scheduler import lane_limits_from_env
+
+    return 2 * sum(lane_limits_from_env().values())
+
+
+def get_executor() -> BoundedExecutor:
+    """返回进程内共享的执行器（EXECUTOR_MAX_WORKERS 未设置时见 default_max_workers）"""
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            configured = os.getenv("EXECUTOR_MAX_WORKERS")
+            max_workers = max(1, int(configured) if configured else default_max_workers())
+            _shared_executor = BoundedExecutor(max_workers, name="transcription-call")
+        return _shared_executor
+
+
+def run_with_timeout(func: Callable, *args, timeout: Optional[float] = None, token: Optional[CancelToken] = None, **kwargs):
+    """在共享执行器中执行调用，见 BoundedExecutor.run"""
+    return get_executor().run(func, *args, timeout=timeout, token=token, **kwargs)
+
+
+class _CancellableReader:
+    """按块读取的上传内容；每次读取前检查 CancelToken"""
+
+    def __init__(self, source, token: CancelToken):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        self._source = source
+        self._token = token
+        self.name = getattr(source, "name", None)
+
+    def read(self, size: int = -1) -> bytes:
+        self._token.raise_if_cancelled()
+        return self._source.read(size)
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._source.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._source.tell()
+
+
+def cancellable_upload(upload: tuple, token: Optional[CancelToken]) -> tuple:
+    """把 (文件名, 内容) 形式的上传参数包装成可取消的流
+
+    httpx 按 64KB 分块读取文件对象，取消后下一块读取即抛出 OperationCancelled，
+    请求中止，不再继续占用上行带宽。
+    """
+    if token is None:
+        return upload
+    filename, content, *rest = upload
+    return (filename, _CancellableReader(content, token), *rest)
+
+
+def run_process(
+    cmd: List[str],
+    *,
+    input: Optional[bytes] = None,
+    timeout: Optional[float] = None,
+    token: Optional[CancelToken] = None,
+) -> subprocess.CompletedProcess:
+    """执行子进程并收集输出；超时或取消时 kill 并回收子进程
+
+    行为与 subprocess.run(cmd, input=..., check=True, capture_output=True) 一致，
+    超时抛出 TimeoutError，取消抛出 OperationCancelled。
+    """
+    if token is not None:
+        token.raise_if_cancelled()
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    unregister = token.on_cancel(process.kill) if token is not None else (lambda: None)
+    try:
+        stdout, stderr = process.communicate(input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        raise TimeoutError(f"子进程超时 ({timeout}秒): {cmd[0]}")
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        unregister()
+
+    if token is not None and token.cancelled:
+        raise OperationCancelled(f"子进程已取消: {cmd[0]}")
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
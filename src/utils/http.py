@@ -0,0 +1,161 @@
+"""共享 HTTP 连接池
+
+以前硅基流动每次请求新建 httpx.Client，Kimi / 翻译直接调用 requests.post，
+每个转录任务都要重新做 TCP + TLS 握手。这里所有处理器共用一个 httpx.Client：
+- keep-alive 连接池（HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE / HTTP_KEEPALIVE_EXPIRY）
+- 安装了 h2 时启用 HTTP/2（HTTP2=auto|true|false）
+- 启动时在后台预热已登记的服务地址，空闲时定期 ping，避免第一次请求才建连接
+  （HTTP_WARMUP / HTTP_PING_INTERVAL）
+
+OpenAI SDK 通过 http_client 参数使用同一个连接池；单次请求的超时仍由调用方指定。
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from .logger import logger
+
+
+def _h2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class HttpConfig:
+    max_connections: int = 20
+    max_keepalive: int = 10
+    keepalive_expiry: float = 60.0
+    connect_timeout: float = 10.0
+    timeout: float = 60.0
+    http2: bool = False
+    warmup: bool = True
+    ping_interval: float = 0.0  # 0 表示不定期 ping
+
+    @classmethod
+    def from_env(cls) -> "HttpConfig":
+        http2 = os.getenv("HTTP2", "auto").lower()
+        return cls(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+            connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+            timeout=float(os.getenv("HTTP_TIMEOUT", "60")),
+            http2=_h2_available() if http2 == "auto" else http2 == "true",
+            warmup=os.getenv("HTTP_WARMUP", "true").lower() == "true",
+            ping_interval=float(os.getenv("HTTP_PING_INTERVAL", "0")),
+        )
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class HttpTransport:
+    """共享的 httpx.Client + 服务地址预热 / 空闲 ping。"""
+
+    def __init__(self, config: Optional[HttpConfig] = None, *, verify=True):
+        self.config = config or HttpConfig.from_env()
+        if self.config.http2 and not _h2_available():
+            logger.warning("HTTP2=true 但未安装 h2，改用 HTTP/1.1 (pip install h2)")
+            self.config.http2 = False
+        self._lock = threading.Lock()
+        self._origins: Dict[str, float] = {}  # 服务地址 -> 最近一次请求时间
+        self._pinger: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        self.client = httpx.Client(
+            http2=self.config.http2,
+            verify=verify,
+            limits=httpx.Limits(
+                max_connections=self.config.max_connections,
+                max_keepalive_connections=self.config.max_keepalive,
+                keepalive_expiry=self.config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(self.config.timeout, connect=self.config.connect_timeout),
+            event_hooks={"request": [self._on_request]},
+        )
+
+    def _on_request(self, request: httpx.Request) -> None:
+        origin = f"{request.url.scheme}://{request.url.netloc.decode('ascii')}"
+        with self._lock:
+            if origin in self._origins:
+                self._origins[origin] = time.monotonic()
+
+    def register(self, url: Optional[str]) -> None:
+        """登记需要预热 / ping 的服务地址，并按配置在后台预热"""
+        if not url:
+            return
+        origin = _origin(url)
+        with self._lock:
+            if origin in self._origins:
+                return
+            self._origins[origin] = 0.0
+        if self.config.warmup:
+            threading.Thread(target=self._ping, args=(origin,), name="http-warmup", daemon=True).start()
+        if self.config.ping_interval > 0:
+            self._start_pinger()
+
+    def _ping(self, origin: str) -> bool:
+        """HEAD 请求建立（或保持）到该地址的连接；任何状态码都说明连接可用"""
+        try:
+            self.client.head(origin, timeout=self.config.connect_timeout)
+            return True
+        except Exception as exc:  # noqa: BLE001
+            logger.debug(f"HTTP 预热失败 {origin}: {exc}")
+            return False
+
+    def ping_idle(self, idle_seconds: float) -> int:
+        """ping 空闲超过 idle_seconds 的服务地址，返回 ping 的数量"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [origin for origin, used in self._origins.items() if now - used >= idle_seconds]
+        for origin in idle:
+            self._ping(origin)
+        return len(idle)
+
+    def _start_pinger(self) -> None:
+        with self._lock:
+            if self._pinger is not None:
+                return
+            self._pinger = threading.Thread(target=self._ping_loop, name="http-ping", daemon=True)
+        self._pinger.start()
+
+    def _ping_loop(self) -> None:
+        interval = self.config.ping_interval
+        while not self._closed.wait(interval):
+            self.ping_idle(interval)
+
+    def close(self) -> None:
+        self._closed.set()
+        self.client.close()
+
+
+_shared_transport: Optional[HttpTransport] = None
+_shared_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """返回进程内共享的 HttpTransport（首次调用时按环境变量创建）"""
+    global _shared_transport
+    with _shared_lock:
+        if _shared_transport is None:
+            _shared_transport = HttpTransport()
+            logger.info(
+                f"🌐 HTTP 连接池: 最多 {_shared_transport.config.max_connections} 个连接, "
+                f"HTTP/2 {'开启' if _shared_transport.config.http2 else '关闭'}"
+            )
+        return _shared_transport
+
+
+def get_http_client(base_url: Optional[str] = None) -> httpx.Client:
+    """返回共享的 httpx.Client；传入 base_url 时登记该地址用于预热"""
+    transport = get_transport()
+    transport.register(base_url)
+    return transport.client
@@ -0,0 +1,71 @@
+"""轻量级运行时指标
+
+只做进程内统计，用于日志输出和运行时调参（例如根据延迟分位数调整超时）。
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+
+class LatencyTracker:
+    """滚动窗口延迟统计（单位：秒）。"""
+
+    def __init__(self, name: str, window: int = 200):
+        self.name = name
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.last: Optional[float] = None
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.last = seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """返回窗口内第 q 百分位（0-100），窗口为空时返回 None。"""
+        with self._lock:
+            ordered = sorted(self._samples)
+        return _pick_percentile(ordered, q) if ordered else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            count, last = self.count, self.last
+        if not ordered:
+            return {"count": count}
+        return {
+            "count": count,
+            "last": last,
+            "mean": sum(ordered) / len(ordered),
+            "p50": _pick_percentile(ordered, 50),
+            "p90": _pick_percentile(ordered, 90),
+            "p99": _pick_percentile(ordered, 99),
+        }
+
+
+def _pick_percentile(ordered, q: float) -> float:
+    index = int(round(q / 100 * (len(ordered) - 1)))
+    return ordered[min(len(ordered) - 1, max(0, index))]
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_latency_tracker(name: str, window: int = 200) -> LatencyTracker:
+    """获取（不存在则创建）指定名称的延迟统计。"""
+    with _trackers_lock:
+        tracker = _trackers.get(name)
+        if tracker is None:
+            tracker = LatencyTracker(name, window=window)
+            _trackers[name] = tracker
+        return tracker
+
+
+def latency_snapshot() -> Dict[str, dict]:
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.snapshot() for name, tracker in trackers.items()}
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+存档 FLAC 压缩基准测试
+把 assets/audio/test_audio.wav 循环拼接成一分钟语音，比较存档为 WAV 与 FLAC：
+- 每分钟录音的存档体积与压缩比
+- 转码（WAV -> FLAC）与解码（FLAC -> PCM）吞吐，以实时倍数表示
+同时测试 16kHz int16（默认录音格式）与 48kHz float32（未设置上传采样率时的原始采集）。
+
+Usage: python test/bench_archive_flac.py [--repeat 5] [--minutes 1]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.buffer import to_float32
+from src.audio.encoding import transcode_to_flac
+from src.audio.resampler import resample
+
+ASSET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "audio", "test_audio.wav")
+
+
+def _best(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def _bench_case(label, samples, sample_rate, subtype, repeat, compression_level=None):
+    wav = io.BytesIO()
+    sf.write(wav, samples, sample_rate, format="WAV", subtype=subtype)
+    wav_bytes = wav.getvalue()
+    seconds = len(samples) / sample_rate
+
+    def encode():
+        target = io.BytesIO()
+        transcode_to_flac(io.BytesIO(wav_bytes), target, compression_level=compression_level)
+        return target
+
+    flac_bytes = encode().getvalue()
+    encode_seconds = _best(encode, repeat)
+    decode_seconds = _best(lambda: sf.read(io.BytesIO(flac_bytes), dtype="int16" if subtype == "PCM_16" else "float32"), repeat)
+
+    level = "默认" if compression_level is None else f"{compression_level:.1f}"
+    ratio = len(flac_bytes) / len(wav_bytes)
+    print(
+        f"{label:<20}{level:>6}{len(wav_bytes) / 1024:>10.0f}{len(flac_bytes) / 1024:>10.0f}"
+        f"{1 - ratio:>8.0%}{seconds / encode_seconds:>10.0f}x{seconds / decode_seconds:>10.0f}x"
+    )
+    return ratio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存档 FLAC 压缩基准测试")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--minutes", type=float, default=1.0, help="拼接成多长的录音")
+    args = parser.parse_args()
+
+    speech, sample_rate = sf.read(ASSET, dtype="int16")
+    frames = int(args.minutes * 60 * sample_rate)
+    pcm = np.tile(speech, -(-frames // len(speech)))[:frames]
+    capture = resample(to_float32(pcm), sample_rate, 48000).astype(np.float32)
+
+    print(f"🗜️  {args.minutes:g} 分钟语音（{os.path.basename(ASSET)} 循环拼接），取 {args.repeat} 次中最快的一次")
+    print(f"{'录音格式':<20}{'级别':>6}{'WAV(KB)':>10}{'FLAC(KB)':>10}{'节省':>8}{'转码':>11}{'解码':>11}")
+    ratios = [
+        _bench_case(f"{sample_rate}Hz int16", pcm, sample_rate, "PCM_16", args.repeat),
+        _bench_case(f"{sample_rate}Hz int16", pcm, sample_rate, "PCM_16", args.repeat, compression_level=0.0),
+        _bench_case(f"{sample_rate}Hz int16", pcm, sample_rate, "PCM_16", args.repeat, compression_level=1.0),
+        _bench_case("48000Hz float32", capture, 48000, "FLOAT", args.repeat),
+    ]
+    print(f"📊 默认设置下存档体积减少 {1 - ratios[0]:.0%}（16kHz）/ {1 - ratios[-1]:.0%}（48kHz float，按 24-bit 保存）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
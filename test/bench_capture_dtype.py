@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+采集格式基准测试：float32 vs int16
+按每分钟音频统计：
+- 缓冲区内存
+- 采集（回调写入缓冲区）CPU 时间
+- 流式发送（200ms 块 -> 16kHz PCM bytes）CPU 时间
+- 生成上传用 WAV 的 CPU 时间
+
+Usage: python test/bench_capture_dtype.py [--seconds 60] [--block 480]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.buffer import create_sample_buffer, to_float32, to_pcm16
+from src.audio.recorder import AudioRecorder
+from src.audio.resampler import PolyphaseResampler, resample
+
+TARGET_RATE = 16000
+CHUNK_MS = 200
+
+
+def _cpu(func):
+    start = time.process_time()
+    result = func()
+    return result, time.process_time() - start
+
+
+def run_case(dtype, sample_rate, seconds, block):
+    rng = np.random.default_rng(0)
+    signal = (rng.standard_normal(sample_rate * seconds) * 0.1).astype(np.float32)
+    samples = signal if dtype == "float32" else to_pcm16(signal)
+    blocks = [samples[i:i + block].reshape(-1, 1) for i in range(0, len(samples), block)]
+
+    buffer = create_sample_buffer(sample_rate, seconds, dtype=dtype)
+
+    def capture():
+        for data in blocks:
+            buffer.append(data)
+    _, capture_cpu = _cpu(capture)
+    audio = buffer.view()
+
+    def stream():
+        resampler = PolyphaseResampler(sample_rate, TARGET_RATE)
+        step = sample_rate * CHUNK_MS // 1000
+        total = 0
+        for start in range(0, len(audio), step):
+            total += len(AudioRecorder._resampled_pcm16_bytes(resampler, audio[start:start + step]))
+        return total
+    _, stream_cpu = _cpu(stream)
+
+    def build_wav():
+        data = audio
+        if sample_rate != TARGET_RATE:
+            data = to_pcm16(resample(to_float32(data), sample_rate, TARGET_RATE))
+        output = io.BytesIO()
+        sf.write(output, to_pcm16(data), TARGET_RATE, format="WAV", subtype="PCM_16")
+        return output
+    _, wav_cpu = _cpu(build_wav)
+
+    per_minute = 60.0 / seconds
+    return {
+        "memory_mb": audio.nbytes / (1024 * 1024) * per_minute,
+        "capture_ms": capture_cpu * 1000 * per_minute,
+        "stream_ms": stream_cpu * 1000 * per_minute,
+        "wav_ms": wav_cpu * 1000 * per_minute,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="采集格式基准测试")
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--block", type=int, default=480, help="每次回调的采样点数")
+    args = parser.parse_args()
+
+    print(f"🎛️  每分钟音频的开销（实测 {args.seconds}s，每块 {args.block} 采样点）")
+    print(f"{'格式':<9}{'采样率':>8}{'缓冲(MB)':>10}{'采集(ms)':>10}{'流式(ms)':>10}{'WAV(ms)':>10}")
+    for sample_rate in (16000, 48000):
+        for dtype in ("float32", "int16"):
+            result = run_case(dtype, sample_rate, args.seconds, args.block)
+            print(f"{dtype:<9}{sample_rate:>8}{result['memory_mb']:>10.2f}{result['capture_ms']:>10.1f}"
+                  f"{result['stream_ms']:>10.1f}{result['wav_ms']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
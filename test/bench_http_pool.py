@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+HTTP 连接池基准测试
+本地起一个 HTTPS 桩服务（openssl 生成自签名证书，HTTP/1.1 keep-alive），模拟转录 API：
+- 冷连接：每次请求新建 httpx.Client（与原先硅基流动 / requests.post 的做法相同），
+  每个请求都要重新做 TCP + TLS 握手
+- 连接池：共享的 HttpTransport，握手只在第一次请求时发生
+输出每秒请求数和 p50 / p99 延迟。--rtt-ms 为每个请求加入服务端处理延迟。
+
+Usage: python test/bench_http_pool.py [--requests 200] [--concurrency 4] [--rtt-ms 0]
+"""
+
+import argparse
+import json
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import numpy as np
+
+from src.utils.http import HttpConfig, HttpTransport
+from src.utils.logger import logger
+
+
+def _make_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+            "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 避免响应头和正文分开发送时触发 40ms 延迟确认
+    rtt = 0.0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.rtt:
+            time.sleep(self.rtt)
+        body = json.dumps({"text": "你好"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server(cert, key, rtt):
+    _StandInHandler.rtt = rtt
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"https://localhost:{server.server_address[1]}/v1/audio/transcriptions"
+
+
+def _run(label, post, total, concurrency, payload):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        started = time.perf_counter()
+        response = post(payload)
+        response.raise_for_status()
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{label:<12}{total / wall:>12.1f}{p50:>12.1f}{p99:>12.1f}")
+    return total / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP 连接池基准测试")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--payload-kb", type=int, default=64, help="每次上传的数据量")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="服务端模拟的处理延迟")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = _make_certificate(tmp)
+        server, url = _start_server(cert, key, args.rtt_ms / 1000)
+        payload = os.urandom(args.payload_kb * 1024)
+        verify = ssl.create_default_context(cafile=cert)
+
+        def cold_post(data):
+            with httpx.Client(verify=verify) as client:
+                return client.post(url, content=data)
+
+        transport = HttpTransport(HttpConfig(warmup=False, max_keepalive=args.concurrency), verify=verify)
+
+        def pooled_post(data):
+            return transport.client.post(url, content=data)
+
+        print(f"🌐 {args.requests} 个请求，并发 {args.concurrency}，上传 {args.payload_kb}KB，模拟延迟 {args.rtt_ms:.0f}ms")
+        print(f"{'模式':<12}{'请求/秒':>12}{'p50(ms)':>12}{'p99(ms)':>12}")
+        cold = _run("冷连接", cold_post, args.requests, args.concurrency, payload)
+        pooled = _run("连接池", pooled_post, args.requests, args.concurrency, payload)
+        print(f"🚀 吞吐提升 {pooled / cold:.1f}x")
+
+        transport.close()
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+本地 whisper.cpp 单次任务 I/O 开销基准测试（不含模型时间）
+用不加载模型的桩 whisper-cli 代替真实程序，对比：
+- file 模式 + 系统临时目录（与原先 NamedTemporaryFile + JSON 文件的流程相同）
+- file 模式 + 内存盘 scratch 目录
+- pipe 模式：内存音频经 stdin 传入
+- pipe 模式：存档文件直接传路径（零拷贝）
+每项减去桩进程本身的启动时间，得到 Python 侧的每任务开销。
+
+Usage: python test/bench_local_io.py [--seconds 60] [--repeat 20]
+"""
+
+import argparse
+import io
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.transcription.local_whisper import _default_scratch_dir
+from src.utils.logger import logger
+from test_whisper_server import _make_processor, _make_whisper_root
+
+
+def _median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 whisper.cpp I/O 开销基准测试")
+    parser.add_argument("--seconds", type=float, default=60.0, help="测试音频时长")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        cli = os.path.join(bin_dir, "whisper-cli")
+        wav = os.path.join(tmp, "archive.wav")
+        rng = np.random.default_rng(0)
+        sf.write(wav, (rng.standard_normal(int(args.seconds * 16000)) * 3000).astype(np.int16), 16000, subtype="PCM_16")
+        audio = open(wav, "rb").read()
+
+        baseline = _median_ms(lambda: subprocess.run([cli, "-f", wav], check=True, capture_output=True), args.repeat)
+        cases = [
+            ("file + 系统临时目录", dict(WHISPER_IO_MODE="file", WHISPER_SCRATCH_DIR=tempfile.gettempdir()),
+             lambda: io.BytesIO(audio)),
+            (f"file + {_default_scratch_dir()}", dict(WHISPER_IO_MODE="file", WHISPER_SCRATCH_DIR=_default_scratch_dir()),
+             lambda: io.BytesIO(audio)),
+            ("pipe + stdin", dict(WHISPER_IO_MODE="pipe"), lambda: io.BytesIO(audio)),
+            ("pipe + 存档路径", dict(WHISPER_IO_MODE="pipe"), lambda: open(wav, "rb")),
+        ]
+
+        print(f"🎛️  {args.seconds:.0f}s 音频 ({len(audio) / 1024:.0f}KB)，桩进程启动 {baseline:.1f}ms（已扣除）")
+        print(f"{'模式':<24}{'总耗时(ms)':>12}{'I/O 开销(ms)':>14}")
+        for label, env, make_buffer in cases:
+            processor = _make_processor(bin_dir, WHISPER_BACKEND="cli", **env)
+            total = _median_ms(lambda: processor.process_audio(make_buffer()), args.repeat)
+            print(f"{label:<24}{total:>12.1f}{max(0.0, total - baseline):>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
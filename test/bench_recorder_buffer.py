@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+录音缓冲区基准测试
+对比旧的「list.append(indata.copy()) + np.concatenate」方案与预分配 SampleBuffer：
+- 停止录音延迟（从停止到拿到完整音频数组）
+- 峰值 RSS
+
+每个用例在独立子进程中运行，避免峰值 RSS 相互影响。
+
+Usage: python test/bench_recorder_buffer.py [--sample-rate 48000] [--block 480]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+DURATIONS = [10, 60, 600]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 单位是字节
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_case(mode: str, seconds: int, sample_rate: int, block: int):
+    block_data = np.random.uniform(-0.5, 0.5, (block, 1)).astype(np.float32)
+    total_blocks = int(seconds * sample_rate / block)
+    baseline_rss = _peak_rss_mb()
+
+    if mode == "list":
+        chunks = []
+        capture_start = time.perf_counter()
+        for _ in range(total_blocks):
+            chunks.append(block_data.copy())
+        capture_elapsed = time.perf_counter() - capture_start
+
+        stop_start = time.perf_counter()
+        audio = np.concatenate(chunks)
+        stop_elapsed = time.perf_counter() - stop_start
+    else:
+        from src.audio.buffer import create_sample_buffer
+
+        buffer = create_sample_buffer(sample_rate, 600.0)
+        capture_start = time.perf_counter()
+        for _ in range(total_blocks):
+            buffer.append(block_data)
+        capture_elapsed = time.perf_counter() - capture_start
+
+        stop_start = time.perf_counter()
+        audio = buffer.view()
+        stop_elapsed = time.perf_counter() - stop_start
+
+    assert len(audio) == total_blocks * block
+    print(
+        f"{mode},{seconds},{stop_elapsed * 1000:.3f},"
+        f"{capture_elapsed * 1e6 / total_blocks:.2f},{_peak_rss_mb() - baseline_rss:.1f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录音缓冲区基准测试")
+    parser.add_argument("--sample-rate", type=int, default=48000)
+    parser.add_argument("--block", type=int, default=480, help="每次回调的采样点数")
+    parser.add_argument("--case", nargs=2, metavar=("MODE", "SECONDS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case[0], int(args.case[1]), args.sample_rate, args.block)
+        return 0
+
+    print(f"🎛️  采样率 {args.sample_rate}Hz, 每块 {args.block} 采样点")
+    print(f"{'方案':<8}{'时长(s)':>8}{'停止延迟(ms)':>14}{'每块写入(µs)':>14}{'峰值RSS增量(MB)':>18}")
+    for seconds in DURATIONS:
+        for mode in ("list", "buffer"):
+            output = subprocess.run(
+                [sys.executable, __file__, "--case", mode, str(seconds),
+                 "--sample-rate", str(args.sample_rate), "--block", str(args.block)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout.strip().splitlines()[-1]
+            _, _, stop_ms, per_block_us, rss_mb = output.split(",")
+            print(f"{mode:<8}{seconds:>8}{float(stop_ms):>14.3f}{float(per_block_us):>14.2f}{float(rss_mb):>18.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+转录全文检索基准测试
+生成 N 条中英混合的听写记录（不同服务 / 模型 / 日期），统计各类查询的延迟：
+- 常见 / 少见的中文词、长短语、英文前缀、多个关键词
+- 叠加日期范围、服务、模型过滤
+查询 p50 / p99 应低于 10ms（--target-ms）。
+
+Usage: python test/bench_transcription_search.py [--entries 100000] [--samples 50]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.audio.transcription_store import TranscriptionStore
+from src.utils.logger import logger
+
+START = datetime(2025, 1, 1)
+WORDS = (
+    "我们 明天 下午 开会 讨论 项目 进度 需要 准备 一下 材料 客户 反馈 问题 已经 修复 测试 通过 "
+    "发布 版本 记得 提醒 他 看 邮件 周报 预算 方案 设计 评审 时间 改到 周五 晚上 吃饭 地点 还 没 定 "
+    "服务器 部署 日志 报错 接口 超时 数据库 迁移 备份 文档 更新 代码 合并 分支 上线 回滚 需求 排期"
+).split()
+RARE_WORDS = "量子纠缠 梵高 哥德巴赫猜想 青藏高原 敦煌壁画".split()
+ENGLISH = "whisper kubernetes pull request deadline meeting python benchmark latency dashboard".split()
+SERVICES = [("openai", "gpt-4o-transcribe"), ("groq", "whisper-large-v3"), ("siliconflow", "SenseVoiceSmall"), ("local", "ggml-large-v3")]
+
+
+def _sentence(rng):
+    words = rng.choices(WORDS, k=rng.randint(6, 20))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), rng.choice(ENGLISH))
+    if rng.random() < 0.002:
+        words.insert(rng.randrange(len(words)), rng.choice(RARE_WORDS))
+    return "".join(word if "一" <= word[0] <= "鿿" else f" {word} " for word in words).strip() + "。"
+
+
+def _entries(count, rng):
+    for index in range(count):
+        service, model = SERVICES[index % len(SERVICES)]
+        yield f"recording_{index:07d}.flac", {
+            "transcription": _sentence(rng),
+            "service": service,
+            "model": model,
+            "mode": "transcriptions",
+            "timestamp": (START + timedelta(minutes=5 * index)).isoformat(),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="转录全文检索基准测试")
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--target-ms", type=float, default=10.0)
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+    rng = random.Random(0)
+
+    last_week = START + timedelta(minutes=5 * args.entries) - timedelta(days=7)
+    queries = [
+        ("常见词", "开会", {}),
+        ("常见单字", "会", {}),
+        ("少见词", "量子纠缠", {}),
+        ("长短语", "数据库迁移", {}),
+        ("英文前缀", "kube", {}),
+        ("多个关键词", "客户 反馈 修复", {}),
+        ("常见词 + 最近一周", "开会", {"start": last_week}),
+        ("常见词 + 服务/模型", "部署", {"service": "groq", "model": "whisper-large-v3"}),
+        ("无关键词 + 最近一周", None, {"start": last_week}),
+        ("无结果", "火星探测", {}),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TranscriptionStore(os.path.join(tmp, "transcriptions.sqlite3"))
+        started = time.perf_counter()
+        store.put_many(_entries(args.entries, rng))
+        print(f"🔎 {args.entries} 条记录，建库 + 索引耗时 {time.perf_counter() - started:.1f}s，"
+              f"数据库 {os.path.getsize(store.path) / 1024 ** 2:.1f}MB")
+        print(f"{'查询':<22}{'结果数':>8}{'p50(ms)':>10}{'p99(ms)':>10}")
+
+        worst = 0.0
+        for label, query, filters in queries:
+            hits = store.search(query, **filters)
+            samples = []
+            for _ in range(args.samples):
+                begin = time.perf_counter()
+                store.search(query, **filters)
+                samples.append((time.perf_counter() - begin) * 1000)
+            p50, p99 = np.percentile(samples, [50, 99])
+            worst = max(worst, p99)
+            print(f"{label:<22}{len(hits):>8}{p50:>10.2f}{p99:>10.2f}")
+        store.close()
+
+    verdict = "✅" if worst < args.target_ms else "❌"
+    print(f"{verdict} 最慢查询 p99 {worst:.2f}ms（目标 < {args.target_ms:.0f}ms）")
+    return 0 if worst < args.target_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+转录结果单条写入延迟基准测试
+已有 N 条记录时保存一条新结果的耗时：
+- cache.json：读入整个文件、修改一个键、indent=2 整体重写（原先的做法）
+- TranscriptionStore：SQLite WAL 单行 INSERT
+
+Usage: python test/bench_transcription_store.py [--sizes 1000 10000 100000] [--samples 200]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.audio.transcription_store import TranscriptionStore
+from src.utils.logger import logger
+
+START = datetime(2025, 1, 1)
+
+
+def _entries(count, offset=0):
+    for index in range(offset, offset + count):
+        yield f"recording_{index:07d}.wav", {
+            "transcription": f"这是第 {index} 条转录结果，长度和日常的一句话差不多。",
+            "service": "openai",
+            "model": "gpt-4o-transcribe",
+            "mode": "transcriptions",
+            "timestamp": (START + timedelta(seconds=index)).isoformat(),
+        }
+
+
+def _json_save(path, filename, entry):
+    with open(path, "r", encoding="utf-8") as f:
+        cache = json.load(f)
+    cache[filename] = entry
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+def _measure(func, items):
+    samples = []
+    for filename, entry in items:
+        started = time.perf_counter()
+        func(filename, entry)
+        samples.append(time.perf_counter() - started)
+    p50, p99 = np.percentile(samples, [50, 99]) * 1000
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description="转录结果写入延迟基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--samples", type=int, default=200, help="SQLite 每档测量的写入次数")
+    parser.add_argument("--json-samples", type=int, default=10, help="cache.json 每档测量的写入次数")
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    print(f"{'已有条数':>10}{'json p50(ms)':>15}{'json p99(ms)':>15}{'sqlite p50(ms)':>17}{'sqlite p99(ms)':>17}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "cache.json")
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump(dict(_entries(size)), f, ensure_ascii=False, indent=2)
+            json_p50, json_p99 = _measure(
+                lambda name, entry: _json_save(json_path, name, entry),
+                list(_entries(args.json_samples, offset=size)),
+            )
+
+            store = TranscriptionStore(os.path.join(tmp, "transcriptions.sqlite3"))
+            store.put_many(_entries(size))
+            sqlite_p50, sqlite_p99 = _measure(
+                lambda name, entry: store.put(name, entry["transcription"], service=entry["service"],
+                                              model=entry["model"], mode=entry["mode"]),
+                list(_entries(args.samples, offset=size)),
+            )
+            store.close()
+        print(f"{size:>10}{json_p50:>15.2f}{json_p99:>15.2f}{sqlite_p50:>17.3f}{sqlite_p99:>17.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
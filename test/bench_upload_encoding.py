@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+上传编码基准测试
+把 assets/audio/test_audio.wav 循环拼接成一分钟语音，统计各上传格式：
+- 每分钟音频的上传体积
+- 编码耗时
+- 按给定上行带宽估算的上传时间
+
+Usage: python test/bench_upload_encoding.py [--uplink-mbps 2]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.encoding import encode_samples
+
+ASSET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "audio", "test_audio.wav")
+CASES = [("wav", None), ("flac", None), ("ogg", 32), ("ogg", 24), ("ogg", 16)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="上传编码基准测试")
+    parser.add_argument("--uplink-mbps", type=float, default=2.0, help="估算上传时间用的上行带宽")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    speech, sample_rate = sf.read(ASSET, dtype="int16")
+    pcm = np.tile(speech, -(-60 * sample_rate // len(speech)))[:60 * sample_rate]
+
+    print(f"🎛️  每分钟 {sample_rate}Hz 语音，上行 {args.uplink_mbps}Mbps")
+    print(f"{'格式':<12}{'体积(KB)':>10}{'压缩比':>8}{'编码(ms)':>10}{'上传(s)':>9}")
+    wav_size = None
+    for fmt, kbps in CASES:
+        elapsed = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            encoded = encode_samples(pcm, sample_rate, fmt, opus_bitrate_kbps=kbps or 24)
+            elapsed.append(time.perf_counter() - started)
+        size = len(encoded.data)
+        wav_size = wav_size or size
+        label = f"{fmt}@{kbps}k" if kbps else fmt
+        upload_seconds = size * 8 / (args.uplink_mbps * 1e6)
+        print(f"{label:<12}{size / 1024:>10.0f}{wav_size / size:>8.1f}{min(elapsed) * 1000:>10.1f}{upload_seconds:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+测试 FLAC 存档
+- 默认以 FLAC 存档：内存录音由后台线程转码，边录边写的录音直接写 FLAC，采样无损
+- 任务读取时透明解码：上传编码、open_as_wav、内容哈希与 WAV 相同（本地 whisper 直接读 FLAC 路径）
+- 后台压缩旧 WAV：只压缩已转录的录音，保留修改时间，转录索引改用新文件名，旧路径可通过 locate 找到
+
+Usage: python test/test_archive_flac.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.archive import AudioArchiveManager
+from src.audio.encoding import UploadEncoder, open_as_wav
+from src.audio.retention import RetentionPolicy
+from src.audio.spool import WavSpooler
+from src.audio.vad import VadConfig
+from src.transcription.result_cache import audio_fingerprint
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_AUDIO = os.path.join(ROOT, "assets", "audio", "test_audio.wav")
+
+
+def _wav_bytes(path=TEST_AUDIO):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_flac_by_default():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=RetentionPolicy(interval=0))
+        assert archive.new_audio_path().endswith(".flac")
+
+        path = archive.save_audio_bytes(_wav_bytes())
+        assert path.endswith(".flac")
+        assert archive.wait_until_written(path, timeout=5)
+        assert sf.info(path).format == "FLAC"
+
+        original, rate = sf.read(TEST_AUDIO, dtype="int16")
+        stored, stored_rate = sf.read(path, dtype="int16")
+        assert stored_rate == rate and np.array_equal(stored, original), "FLAC 必须无损"
+        ratio = os.path.getsize(path) / os.path.getsize(TEST_AUDIO)
+        assert ratio < 0.9, ratio
+        assert audio_fingerprint(path) == audio_fingerprint(TEST_AUDIO), "结果缓存的哈希与格式无关"
+    print(f"✅ 默认 FLAC 存档（大小为 WAV 的 {ratio:.0%}）")
+
+
+def test_spooled_flac_matches_samples():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recording.flac")
+        spooler = WavSpooler(path, 16000)
+        rng = np.random.default_rng(0)
+        pcm = (rng.standard_normal(48000) * 3000).astype(np.int16)
+        for start in range(0, len(pcm), 1600):
+            spooler.write(pcm[start:start + 1600].reshape(-1, 1))
+        recorded = spooler.close()
+        data, _ = sf.read(recorded.path, dtype="int16")
+        assert sf.info(path).format == "FLAC" and np.array_equal(data, pcm)
+    print("✅ 边录边写 FLAC")
+
+
+def test_transparent_decode():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=RetentionPolicy(interval=0))
+        path = archive.save_audio_bytes(_wav_bytes())
+        archive.flush()
+
+        with open_as_wav(path) as decoded:
+            assert isinstance(decoded, io.BytesIO)
+            data, rate = sf.read(decoded, dtype="int16")
+        assert rate == 16000 and np.array_equal(data, sf.read(TEST_AUDIO, dtype="int16")[0])
+        with open_as_wav(TEST_AUDIO) as raw:
+            assert raw.name == TEST_AUDIO, "WAV 直接打开原文件"
+
+        encoder = UploadEncoder(VadConfig(enabled=False))
+        from_flac = encoder.prepare(path, "wav")
+        from_wav = encoder.prepare(TEST_AUDIO, "wav")
+        assert from_flac.read() == from_wav.read(), "上传内容与原始 WAV 存档一致"
+    print("✅ 任务读取 FLAC 时透明解码")
+
+
+def _legacy_wav(archive, days_ago, index, transcribed):
+    stamp = (datetime.now() - timedelta(days=days_ago)).strftime("%Y%m%d_%H%M%S")
+    shard = archive._shard_dir(stamp[:8])
+    os.makedirs(shard, exist_ok=True)
+    path = os.path.join(shard, f"recording_{stamp}_{index}.wav")
+    with open(path, "wb") as f:
+        f.write(_wav_bytes())
+    old = time.time() - days_ago * 86400
+    os.utime(path, (old, old))
+    if transcribed:
+        archive.save_transcription_result(path, "你好", service="test", model="m")
+    return path
+
+
+def test_background_compaction():
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = RetentionPolicy(interval=0, compress_wav=True, batch_size=2)
+        archive = AudioArchiveManager(tmp, retention=policy)
+        done = [_legacy_wav(archive, 3, index, transcribed=True) for index in range(3)]
+        pending = _legacy_wav(archive, 3, 9, transcribed=False)
+        mtime = os.path.getmtime(done[0])
+
+        assert archive.janitor.run_once() == 0, "只压缩不清理"
+        assert archive.janitor.compacted == 3
+        assert os.path.exists(pending), "没有转录结果的录音可能还要重试，保持原样"
+        for path in done:
+            flac = path[:-4] + ".flac"
+            assert not os.path.exists(path) and os.path.exists(flac)
+            assert archive.locate(path) == flac, "旧 WAV 路径应能找到 FLAC"
+            entry = archive.transcriptions.get(os.path.basename(flac))
+            assert entry["transcription"] == "你好" and entry["audio_path"] == flac
+            assert archive.transcriptions.get(os.path.basename(path)) is None
+        assert abs(os.path.getmtime(done[0][:-4] + ".flac") - mtime) < 1e-3, "保留修改时间，保留策略按原时间计算"
+        assert archive.janitor.compacted_saved_bytes > 0
+
+        assert archive.janitor.run_once() == 0 and archive.janitor.compacted == 3, "已压缩的目录不再重复处理"
+    print(f"✅ 后台压缩旧 WAV（节省 {archive.janitor.compacted_saved_bytes / 1024:.0f}KB）")
+
+
+def main():
+    print("🧪 FLAC 存档测试")
+    test_flac_by_default()
+    test_spooled_flac_matches_samples()
+    test_transparent_decode()
+    test_background_compaction()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
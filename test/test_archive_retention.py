@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+测试存档分目录与保留策略
+- 新录音写入 audio/YYYY/MM/DD，旧版平铺的录音在升级时移入日期目录，旧路径可通过 locate 找到
+- 超过保留天数的录音被清理，没有转录结果的录音保留（ARCHIVE_KEEP_FAILED）
+- 超过总大小上限时从最旧的日期开始清理，直到回到上限以内
+- 清理分批进行，转录索引同步标记 audio_path 已清理（文本保留）
+- 边录边写、原地增长的录音（目录 mtime 不变）也计入总大小
+- 后台线程按间隔自动清理
+
+Usage: python test/test_archive_retention.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio.archive import MIGRATION_MARKER, AudioArchiveManager
+from src.audio.retention import RetentionPolicy
+
+DAY = 86400
+
+
+def _manual(**kwargs):
+    """interval=0：不启动后台线程，测试中手动调用 run_once"""
+    return RetentionPolicy(interval=0, **kwargs)
+
+
+def _add_recording(archive, days_ago, index=0, size=10 * 1024, transcribed=True):
+    moment = datetime.now() - timedelta(days=days_ago)
+    stamp = moment.strftime("%Y%m%d_%H%M%S")
+    shard = archive._shard_dir(stamp[:8])
+    os.makedirs(shard, exist_ok=True)
+    path = os.path.join(shard, f"recording_{stamp}_{index}.wav")
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    old = time.time() - days_ago * DAY - 2 * 3600
+    os.utime(path, (old, old))
+    if transcribed:
+        archive.save_transcription_result(path, f"文本 {days_ago}-{index}", service="test", model="m")
+    return path
+
+
+def test_sharded_layout_and_upgrade():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "audio_archive")
+        flat_dir = os.path.join(archive_dir, "audio")
+        os.makedirs(flat_dir)
+        open(os.path.join(archive_dir, ".layout_v1"), "w").close()  # 上一个版本已迁移过根目录
+        flat_path = os.path.join(flat_dir, "recording_20240131_235959.wav")
+        with open(flat_path, "wb") as f:
+            f.write(b"old")
+
+        archive = AudioArchiveManager(archive_dir, retention=_manual())
+        moved = os.path.join(flat_dir, "2024", "01", "31", "recording_20240131_235959.wav")
+        assert os.path.exists(moved) and not os.path.exists(flat_path)
+        assert os.path.exists(os.path.join(archive_dir, MIGRATION_MARKER))
+        assert archive.locate(flat_path) == moved, "分目录之前记录的路径应能找到"
+
+        path = archive.new_audio_path()
+        today = datetime.now()
+        assert os.path.dirname(path) == os.path.join(flat_dir, today.strftime("%Y"), today.strftime("%m"), today.strftime("%d"))
+    print("✅ 日期分目录，旧录音升级时移入")
+
+
+def test_age_retention_keeps_failed():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=_manual(max_age_days=7))
+        expired = _add_recording(archive, 30)
+        failed = _add_recording(archive, 30, index=1, transcribed=False)
+        recent = _add_recording(archive, 1)
+
+        assert archive.janitor.run_once() == 1
+        assert not os.path.exists(expired)
+        assert os.path.exists(failed), "没有转录结果的录音应保留"
+        assert os.path.exists(recent)
+
+        entry = archive.transcriptions.get(os.path.basename(expired))
+        assert entry["transcription"] == "文本 30-0", "录音被清理后转录文本保留"
+        assert "audio_path" not in entry and entry["evicted_at"] > 0
+        assert archive.transcriptions.get(os.path.basename(recent))["audio_path"] == recent
+
+        archive.janitor.policy.keep_failed = False
+        assert archive.janitor.run_once() == 1
+        assert not os.path.exists(os.path.dirname(failed)), "清空的日期目录应被删除"
+    print("✅ 按天数清理，转录失败的录音保留")
+
+
+def test_size_budget_evicts_oldest_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=_manual(max_bytes=100 * 1024, batch_size=4))
+        batches = []
+        evict = archive.janitor._on_evict
+        archive.janitor._on_evict = lambda names: (batches.append(len(names)), evict(names))
+
+        paths = {days: [_add_recording(archive, days, index) for index in range(3)] for days in range(2, 12)}
+        assert archive.janitor.total_bytes() == 300 * 1024
+
+        removed = archive.janitor.run_once()
+        assert removed == 20, removed
+        assert archive.janitor.total_bytes() <= 100 * 1024
+        # 30 个 10KB 文件，保留 10 个：第 6~11 天全部删除，第 5 天删除较早的 2 个
+        survivors = {days: [os.path.exists(path) for path in day_paths] for days, day_paths in paths.items()}
+        assert survivors[5] == [False, False, True], survivors[5]
+        assert all(survivors[days] == [True] * 3 for days in range(2, 5))
+        assert all(survivors[days] == [False] * 3 for days in range(6, 12))
+        assert max(batches) <= 4, "每批最多 batch_size 个文件"
+        assert sum(batches) == 20
+        evicted = [archive.transcriptions.get(os.path.basename(path)) for path in paths[11]]
+        assert all("evicted_at" in entry for entry in evicted), "转录索引与磁盘一致"
+    print(f"✅ 超过大小上限时从最旧的日期清理（{len(batches)} 批）")
+
+
+def test_recent_files_are_protected():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=_manual(max_bytes=1, keep_failed=False), audio_format="wav")
+        path = archive.save_audio_bytes(b"RIFF" + bytes(4096))
+        archive.flush()
+        assert archive.janitor.run_once() == 0
+        assert os.path.exists(path), "刚写入的录音可能还在排队转录，不应清理"
+    print("✅ 最近写入的录音不清理")
+
+
+def test_growing_recording_counted():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=_manual(max_bytes=1024 ** 3))
+        old = _add_recording(archive, 5)
+        growing = _add_recording(archive, 0)
+        assert archive.janitor.total_bytes() == 20 * 1024
+
+        day_dirs = [os.path.dirname(old), os.path.dirname(growing)]
+        stamps = [os.stat(directory).st_mtime_ns for directory in day_dirs]
+        for path in (old, growing):
+            with open(path, "ab") as f:
+                f.write(b"\0" * 5 * 1024)
+        for directory, stamp in zip(day_dirs, stamps):
+            os.utime(directory, ns=(stamp, stamp))
+        # 旧日期目录使用缓存（不会再有写入），当天的目录每次重新统计
+        assert archive.janitor.total_bytes() == 25 * 1024
+    print("✅ 原地增长的录音计入总大小")
+
+
+def test_background_janitor():
+    with tempfile.TemporaryDirectory() as tmp:
+        policy = RetentionPolicy(max_age_days=7, interval=0)
+        archive = AudioArchiveManager(tmp, retention=policy)
+        # 先写好过期录音再启动线程，避免线程删掉刚建好、还没写入文件的空日期目录
+        expired = _add_recording(archive, 40)
+        policy.interval = 0.05
+        archive.janitor.start()
+        deadline = time.time() + 5
+        while os.path.exists(expired) and time.time() < deadline:
+            time.sleep(0.05)
+        archive.janitor.stop()
+        assert not os.path.exists(expired), "后台线程应自动清理"
+    print("✅ 后台线程自动清理")
+
+
+def main():
+    print("🧪 存档保留策略测试")
+    test_sharded_layout_and_upgrade()
+    test_age_retention_keeps_failed()
+    test_size_budget_evicts_oldest_first()
+    test_recent_files_are_protected()
+    test_growing_recording_counted()
+    test_background_janitor()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
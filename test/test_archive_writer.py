@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+测试存档写入
+- 旧版目录迁移只在首次启动时执行一次（之后有标记文件，不再扫描存档根目录）
+- 文件名分配不访问磁盘：存档中已有 10 万个文件时，保存耗时与空存档相同
+- 内存录音由后台线程写盘，调用线程不打开任何文件；wait_until_written 后可读取
+- 同一秒内的大量录音文件名不重复
+
+Usage: python test/test_archive_writer.py
+"""
+
+import builtins
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.audio import archive as archive_module
+from src.audio.archive import MIGRATION_MARKER, AudioArchiveManager
+
+
+class _CountingOs:
+    """统计调用线程中的 os.listdir / os.path.exists 调用次数（后台写盘线程的日志等不计）"""
+
+    def __init__(self):
+        self.listdir = 0
+        self.exists = 0
+
+    def __enter__(self):
+        self._listdir, self._exists = os.listdir, os.path.exists
+        caller = threading.current_thread()
+
+        def listdir(*args, **kwargs):
+            self.listdir += threading.current_thread() is caller
+            return self._listdir(*args, **kwargs)
+
+        def exists(*args, **kwargs):
+            self.exists += threading.current_thread() is caller
+            return self._exists(*args, **kwargs)
+
+        os.listdir, os.path.exists = listdir, exists
+        return self
+
+    def __exit__(self, *exc):
+        os.listdir, os.path.exists = self._listdir, self._exists
+
+
+def _wait_for_next_second(archive):
+    """跳过进程启动的那一秒（这一秒内分配文件名会检查是否与上次运行重名）"""
+    while archive._timestamp() == archive._startup_stamp:
+        time.sleep(0.05)
+
+
+def _median_save_ms(archive, count=300):
+    samples = []
+    for _ in range(count):
+        started = time.perf_counter()
+        archive.save_audio_bytes(b"RIFF" + bytes(1024))
+        samples.append(time.perf_counter() - started)
+    archive.flush()
+    return float(np.median(samples)) * 1000
+
+
+def test_migration_runs_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "audio_archive")
+        os.makedirs(archive_dir)
+        with open(os.path.join(archive_dir, "legacy.wav"), "wb") as f:
+            f.write(b"old")
+        archive = AudioArchiveManager(archive_dir)
+        assert os.path.exists(os.path.join(archive._day_dir, "legacy.wav")), "无日期的旧文件按修改时间分目录"
+        assert os.path.exists(os.path.join(archive_dir, MIGRATION_MARKER))
+
+        with _CountingOs() as counter:
+            AudioArchiveManager(archive_dir)
+        assert counter.listdir == 0, "有迁移标记时不应扫描存档目录"
+    print("✅ 旧目录迁移只执行一次")
+
+
+def test_constant_time_saves_with_100k_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        empty = AudioArchiveManager(os.path.join(tmp, "empty"), audio_format="wav")
+        full = AudioArchiveManager(os.path.join(tmp, "full"), audio_format="wav")
+        for index in range(100_000):
+            open(os.path.join(full.audio_dir, f"recording_old_{index:06d}.wav"), "wb").close()
+        _wait_for_next_second(full)
+
+        empty_ms = _median_save_ms(empty)
+        with _CountingOs() as counter:
+            full_ms = _median_save_ms(full)
+        assert counter.listdir == 0 and counter.exists == 0, (counter.listdir, counter.exists)
+        assert full_ms < max(empty_ms * 5, empty_ms + 1.0), (empty_ms, full_ms)
+    print(f"✅ 10 万个文件时保存耗时 {full_ms:.3f}ms（空存档 {empty_ms:.3f}ms）")
+
+
+def test_background_writer():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(os.path.join(tmp, "audio_archive"), audio_format="wav")  # 原样写入随机字节
+        caller = threading.current_thread()
+        opened_by_caller = []
+        real_open = builtins.open
+
+        def tracking_open(*args, **kwargs):
+            if threading.current_thread() is caller:
+                opened_by_caller.append(args[0])
+            return real_open(*args, **kwargs)
+
+        payloads = [os.urandom(256 * 1024) for _ in range(20)]
+        archive_module.open = tracking_open  # 只替换 archive 模块内的 open
+        try:
+            paths = [archive.save_audio_bytes(payload) for payload in payloads]
+        finally:
+            del archive_module.open
+        assert opened_by_caller == [], f"调用线程不应打开文件: {opened_by_caller}"
+
+        assert len(set(paths)) == len(paths), "同一秒内的文件名不能重复"
+        for path, payload in zip(paths, payloads):
+            assert archive.wait_until_written(path, timeout=5)
+            with open(path, "rb") as f:
+                assert f.read() == payload
+        assert all(os.path.dirname(path) == archive._day_dir for path in paths)
+        assert not [name for name in os.listdir(archive._day_dir) if name.endswith(".part")]
+    print("✅ 后台写盘，调用线程无文件 I/O")
+
+
+def main():
+    print("🧪 存档写入测试")
+    test_migration_runs_once()
+    test_constant_time_saves_with_100k_files()
+    test_background_writer()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
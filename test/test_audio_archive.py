@@ -33,7 +33,8 @@ def get_latest_audio_file(audio_dir="audio_archive/audio"):
     audio_files = []
     
     for pattern in audio_patterns:
-        audio_files.extend(glob.glob(os.path.join(audio_archive_path, pattern)))
+        # 录音按 YYYY/MM/DD 分目录存放
+        audio_files.extend(glob.glob(os.path.join(audio_archive_path, "**", pattern), recursive=True))
     
     if not audio_files:
         print(f"❌ 在 {audio_archive_path} 中未找到音频文件")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+测试录音边录边写盘（WavSpooler）
+- 写盘模式下峰值内存与录音时长无关，明显低于内存录音
+- 停止录音只需关闭文件，返回 RecordedAudio，WAV 内容与采集数据一致
+- 中止 / 过短的录音不会在存档中留下文件
+
+用 tracemalloc 统计两种模式下的峰值分配。
+
+Usage: python test/test_audio_spool.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.archive import AudioArchiveManager
+from src.audio.buffer import to_pcm16
+from src.audio.recorder import AudioRecorder
+from src.audio.spool import RecordedAudio
+
+SAMPLE_RATE = 48000
+BLOCK_FRAMES = 480
+SECONDS = 120
+
+
+def _recorder(archive_dir=None):
+    recorder = AudioRecorder(probe_devices=False)
+    recorder.sample_rate = SAMPLE_RATE
+    if archive_dir is not None:
+        recorder.set_spool_path_factory(AudioArchiveManager(archive_dir).new_audio_path)
+    return recorder
+
+
+def _feed(recorder, seconds, block=None):
+    block = block if block is not None else np.full((BLOCK_FRAMES, 1), 0.25, dtype=np.float32)
+    for index in range(seconds * SAMPLE_RATE // BLOCK_FRAMES):
+        recorder._capture_audio_chunk(block, stream_to_queue=False)
+        # 模拟实时回调节奏：写盘线程跟得上采集，不让队列无限堆积
+        if recorder._spooler is not None and index % 100 == 0:
+            _wait_for_spooler(recorder, 8)
+    if recorder._spooler is not None:
+        _wait_for_spooler(recorder, 0)
+
+
+def _wait_for_spooler(recorder, backlog):
+    while recorder._spooler.backlog > backlog:
+        time.sleep(0.001)
+
+
+def _peak_allocation(archive_dir):
+    recorder = _recorder(archive_dir)
+    tracemalloc.start()
+    recorder._start_capture_session(clear_queue=True)
+    _feed(recorder, SECONDS)
+    stop_started = time.perf_counter()
+    result = recorder._finalize_recording(abort=False, enforce_min_duration=False)
+    stop_elapsed = time.perf_counter() - stop_started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, stop_elapsed
+
+
+def _today_dir(archive_dir):
+    """录音写入 audio/YYYY/MM/DD"""
+    return os.path.join(archive_dir, "audio", datetime.now().strftime("%Y/%m/%d"))
+
+
+def test_spool_peak_memory_is_constant():
+    with tempfile.TemporaryDirectory() as archive_dir:
+        in_memory, memory_peak, memory_stop = _peak_allocation(None)
+        spooled, spool_peak, spool_stop = _peak_allocation(archive_dir)
+
+        print(f"📊 内存录音 {SECONDS}s: 峰值分配 {memory_peak / 1e6:.1f}MB, 停止耗时 {memory_stop * 1000:.1f}ms")
+        print(f"📊 写盘录音 {SECONDS}s: 峰值分配 {spool_peak / 1e6:.1f}MB, 停止耗时 {spool_stop * 1000:.1f}ms")
+
+        assert isinstance(spooled, RecordedAudio)
+        assert os.path.dirname(spooled.path) == _today_dir(archive_dir)
+        assert spooled.frames == SECONDS * 16000
+        assert spool_peak < memory_peak / 4
+        assert spool_stop < 0.05
+
+        data, rate = sf.read(spooled.path, dtype="float32")
+        assert rate == 16000 and len(data) == spooled.frames
+        assert np.allclose(data[1000:-1000], 0.25, atol=1e-3)
+        in_memory.close()
+
+
+def test_int16_spool_matches_samples():
+    with tempfile.TemporaryDirectory() as archive_dir:
+        recorder = _recorder(archive_dir)
+        recorder.sample_rate = 16000
+        recorder.capture_dtype = "int16"
+        rng = np.random.default_rng(0)
+        pcm = to_pcm16((rng.standard_normal(16000) * 0.1).astype(np.float32))
+
+        recorder._start_capture_session(clear_queue=True)
+        for start in range(0, len(pcm), BLOCK_FRAMES):
+            recorder._capture_audio_chunk(pcm[start:start + BLOCK_FRAMES].reshape(-1, 1), stream_to_queue=False)
+        recorded = recorder._finalize_recording(abort=False, enforce_min_duration=False)
+
+        data, _ = sf.read(recorded.path, dtype="int16")
+        assert np.array_equal(data, pcm)
+
+
+def test_aborted_and_short_recordings_leave_no_file():
+    with tempfile.TemporaryDirectory() as archive_dir:
+        recorder = _recorder(archive_dir)
+        audio_dir = _today_dir(archive_dir)
+
+        recorder._start_capture_session(clear_queue=True)
+        _feed(recorder, 1)
+        assert len(os.listdir(audio_dir)) == 1
+        assert recorder._finalize_recording(abort=True) is None
+        assert os.listdir(audio_dir) == []
+
+        recorder._start_capture_session(clear_queue=True)
+        _feed(recorder, 1)
+        assert recorder._finalize_recording(abort=False, enforce_min_duration=True) == "TOO_SHORT"
+        assert os.listdir(audio_dir) == []
+        print("✅ 中止/过短的录音已删除")
+
+
+def main():
+    print("🧪 录音写盘测试")
+    test_spool_peak_memory_is_constant()
+    test_int16_spool_matches_samples()
+    test_aborted_and_short_recordings_leave_no_file()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
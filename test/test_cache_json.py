@@ -1,32 +1,32 @@
 #!/usr/bin/env python3
 """
-Cache.json 功能测试脚本
-测试音频存档的转录缓存功能
+转录缓存功能测试脚本
+测试音频存档的转录缓存功能（结果存放在 transcriptions.sqlite3，旧的 cache.json 启动时自动迁移）
 
 Usage: python test_cache_json.py
 """
 
 import sys
 import os
-import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import dotenv
+from src.audio.archive import AudioArchiveManager
 from src.transcription.whisper import WhisperProcessor
 from src.utils.logger import logger
 
 dotenv.load_dotenv()
 
 def test_cache_functionality():
-    """测试cache.json功能"""
+    """测试转录缓存功能"""
     
-    print("🗂️  测试 audio_archive/cache.json 功能")
+    print("🗂️  测试 audio_archive 转录缓存功能")
     print("=" * 50)
     
     # 检查audio_archive目录
     archive_dir = "audio_archive"
     audio_dir = os.path.join(archive_dir, "audio")
-    cache_file = os.path.join(archive_dir, "cache.json")
+    store_file = os.path.join(archive_dir, "transcriptions.sqlite3")
     
     if not os.path.exists(archive_dir):
         print(f"❌ 音频存档目录不存在: {archive_dir}")
@@ -56,9 +56,10 @@ def test_cache_functionality():
     try:
         # 创建处理器并转录
         processor = WhisperProcessor()
+        archive = AudioArchiveManager(archive_dir)
         
         # 检查转录前的缓存状态
-        cache_before = processor._load_transcription_cache()
+        cache_before = archive.load_transcription_cache()
         print(f"📋 转录前缓存条目: {len(cache_before)}")
         
         # 执行转录
@@ -81,9 +82,12 @@ def test_cache_functionality():
             
             print(f"✅ 转录成功!")
             print(f"📝 转录结果: {text[:100]}...")
+            archive.save_transcription_result(
+                latest_audio, text, service="openai", model=processor.DEFAULT_MODEL
+            )
         
         # 检查转录后的缓存状态
-        cache_after = processor._load_transcription_cache()
+        cache_after = archive.load_transcription_cache()
         print(f"📋 转录后缓存条目: {len(cache_after)}")
         
         # 验证缓存内容
@@ -95,14 +99,12 @@ def test_cache_functionality():
             print(f"   ⏰ 时间: {cache_entry.get('timestamp', 'unknown')}")
             print(f"   📝 转录长度: {len(cache_entry.get('transcription', ''))} 字符")
             
-            # 验证cache.json文件
-            if os.path.exists(cache_file):
-                print(f"✅ cache.json 文件已创建: {cache_file}")
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_content = json.load(f)
-                    print(f"📊 缓存文件包含 {len(cache_content)} 个条目")
+            # 验证数据库文件
+            if os.path.exists(store_file):
+                print(f"✅ 转录数据库已创建: {store_file}")
+                print(f"📊 数据库包含 {len(archive.transcriptions)} 个条目")
             else:
-                print(f"❌ cache.json 文件未创建")
+                print(f"❌ 转录数据库未创建")
                 return False
             
             return True
@@ -122,7 +124,7 @@ def test_cache_functionality():
 
 def main():
     """主函数"""
-    print("🧪 Cache.json 功能测试")
+    print("🧪 转录缓存功能测试")
     print("测试音频存档转录缓存系统")
     print()
     
@@ -130,13 +132,13 @@ def main():
     
     print("\n" + "=" * 50)
     if success:
-        print("🎉 Cache.json 功能测试通过!")
+        print("🎉 转录缓存功能测试通过!")
         print("💡 功能验证:")
         print("   ✅ 转录结果自动保存到缓存")
-        print("   ✅ cache.json 文件正确创建")
+        print("   ✅ transcriptions.sqlite3 正确创建")
         print("   ✅ 缓存条目包含完整信息")
     else:
-        print("😞 Cache.json 功能测试失败")
+        print("😞 转录缓存功能测试失败")
     
     return 0 if success else 1
 
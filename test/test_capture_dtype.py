@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试 int16 采集模式（AUDIO_CAPTURE_DTYPE=int16）
+- 缓冲区按 int16 存储，内存为 float32 的一半
+- 16kHz 采集时流式 PCM 块就是原始采样的 tobytes()，WAV 无缩放写入
+- 48kHz 采集时重采样结果与 float32 模式一致（量化误差以内）
+
+Usage: python test/test_capture_dtype.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.buffer import to_float32, to_pcm16
+from src.audio.recorder import AudioRecorder
+
+BLOCK_FRAMES = 480
+
+
+def _recorder(dtype, sample_rate):
+    previous = os.environ.get("AUDIO_CAPTURE_DTYPE")
+    os.environ["AUDIO_CAPTURE_DTYPE"] = dtype
+    try:
+        recorder = AudioRecorder(probe_devices=False)
+    finally:
+        if previous is None:
+            os.environ.pop("AUDIO_CAPTURE_DTYPE")
+        else:
+            os.environ["AUDIO_CAPTURE_DTYPE"] = previous
+    recorder.sample_rate = sample_rate
+    return recorder
+
+
+def _signal(sample_rate, seconds=1.0):
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (0.4 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def _feed(recorder, samples, stream_to_queue=False):
+    blocks = samples.astype(recorder.capture_dtype) if samples.dtype != recorder.capture_dtype else samples
+    for start in range(0, len(blocks), BLOCK_FRAMES):
+        recorder._capture_audio_chunk(blocks[start:start + BLOCK_FRAMES].reshape(-1, 1),
+                                      stream_to_queue=stream_to_queue)
+
+
+def _record_wav(recorder, samples):
+    recorder._start_capture_session(clear_queue=True)
+    _feed(recorder, samples)
+    assert recorder._capture_buffer.dtype == np.dtype(recorder.capture_dtype)
+    audio_buffer = recorder._finalize_recording(abort=False, enforce_min_duration=False)
+    return sf.read(audio_buffer, dtype="int16")
+
+
+def test_pcm16_conversion_round_trip():
+    pcm = to_pcm16(_signal(16000))
+    assert pcm.dtype == np.int16
+    assert to_pcm16(pcm) is pcm
+    assert np.max(np.abs(to_float32(pcm) - _signal(16000))) < 1e-4
+
+
+def test_int16_wav_written_without_scaling():
+    recorder = _recorder("int16", 16000)
+    pcm = to_pcm16(_signal(16000))
+    data, rate = _record_wav(recorder, pcm)
+    assert rate == 16000
+    assert np.array_equal(data, pcm), "16kHz int16 采集应原样写入 WAV"
+    print("✅ int16 采集: WAV 采样与采集数据完全一致")
+
+
+def test_int16_matches_float_after_resampling():
+    signal = _signal(48000)
+    float_data, _ = _record_wav(_recorder("float32", 48000), signal)
+    int_data, _ = _record_wav(_recorder("int16", 48000), to_pcm16(signal))
+    assert len(float_data) == len(int_data) == 16000
+    assert np.max(np.abs(float_data.astype(np.int32) - int_data)) <= 2
+    print("✅ 48kHz int16 采集重采样后与 float32 模式一致")
+
+
+def test_int16_stream_chunks_are_raw_bytes():
+    recorder = _recorder("int16", 16000)
+    pcm = to_pcm16(_signal(16000))
+    recorder._start_capture_session(clear_queue=True, stream_to_queue=True)
+
+    def drive():
+        _feed(recorder, pcm, stream_to_queue=True)
+        recorder.stop_streaming_recording()
+
+    async def consume():
+        threading.Thread(target=drive, daemon=True).start()
+        return [chunk async for chunk in recorder.stream_audio_chunks(target_sample_rate=16000)]
+
+    chunks = asyncio.run(consume())
+    assert b"".join(chunks) == pcm.tobytes()
+    print(f"✅ int16 流式发送: {len(chunks)} 个块与原始 PCM 字节一致")
+
+
+def main():
+    print("🧪 int16 采集模式测试")
+    test_pcm16_conversion_round_trip()
+    test_int16_wav_written_without_scaling()
+    test_int16_matches_float_after_resampling()
+    test_int16_stream_chunks_are_raw_bytes()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+测试按录音顺序输出转录结果
+- 并发任务乱序完成，输出严格按序号顺序
+- 任务放弃（重试用尽）后不挡住后面的结果
+- 队首任务卡住超过 hol_timeout 时先输出后面的结果，卡住的任务完成后带标记补发
+
+Usage: python test/test_delivery.py
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription.delivery import OrderedDelivery
+from src.transcription.scheduler import JobScheduler
+
+
+@dataclass
+class FakeJob:
+    sequence: int
+    text: str
+    delay: float
+    processor: str = "openai"
+
+
+def _wait_until(predicate, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_concurrent_jobs_delivered_in_order():
+    typed = []
+    delivery = OrderedDelivery(typed.append, hol_timeout=5)
+
+    def run(job):
+        time.sleep(job.delay)
+        delivery.complete(job.sequence, job.text)
+
+    scheduler = JobScheduler(run, lane_of=lambda job: job.processor, limits={"openai": 4, "local": 1})
+    # 第一段最慢：先完成的后几段必须等它
+    for text, delay, processor in (("一", 0.3, "openai"), ("二", 0.05, "local"), ("三", 0.1, "openai"), ("四", 0.0, "openai")):
+        scheduler.submit(FakeJob(delivery.next_sequence(), text, delay, processor))
+    assert scheduler.wait_idle(5)
+    assert typed == ["一", "二", "三", "四"], typed
+    assert delivery.waiting == 0
+    print("✅ 乱序完成，按录音顺序输出")
+
+
+def test_failed_job_releases_slot():
+    typed = []
+    delivery = OrderedDelivery(typed.append, hol_timeout=5)
+    first, second, third = (delivery.next_sequence() for _ in range(3))
+    delivery.complete(third, "三")
+    delivery.complete(second, "")  # 空结果只占位
+    assert typed == []
+    delivery.fail(first)
+    assert typed == ["三"]
+
+
+def test_head_of_line_timeout():
+    typed = []
+    delivery = OrderedDelivery(typed.append, hol_timeout=0.2, late_marker="[补发] ")
+    stuck, second, third = (delivery.next_sequence() for _ in range(3))
+    delivery.complete(second, "二")
+    delivery.complete(third, "三")
+    assert typed == [], "超时之前应等待队首任务"
+
+    assert _wait_until(lambda: typed == ["二", "三"]), typed
+    delivery.complete(stuck, "一")
+    assert typed == ["二", "三", "[补发] 一"]
+
+    fourth = delivery.next_sequence()
+    delivery.complete(fourth, "四")
+    assert typed[-1] == "四", "跳过之后的任务照常按顺序输出"
+    print(f"✅ 队首超时跳过并补发: {typed}")
+
+
+def main():
+    print("🧪 顺序输出测试")
+    test_concurrent_jobs_delivered_in_order()
+    test_failed_job_releases_slot()
+    test_head_of_line_timeout()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
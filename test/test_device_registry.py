@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+测试 InputDeviceRegistry 的设备缓存与刷新逻辑
+使用假的 query_devices / reinitialize，不需要真实音频设备
+
+Usage: python test/test_device_registry.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio.devices import InputDeviceRegistry
+from src.utils.metrics import LatencyTracker
+
+
+def _device(name, inputs=1, rate=48000.0):
+    return {"name": name, "max_input_channels": inputs, "default_samplerate": rate}
+
+
+class FakePortAudio:
+    def __init__(self, devices):
+        self.devices = devices
+        self.query_calls = 0
+        self.reinit_calls = 0
+
+    def query_devices(self):
+        self.query_calls += 1
+        return list(self.devices)
+
+    def reinitialize(self):
+        self.reinit_calls += 1
+
+
+def _registry(portaudio, **kwargs):
+    return InputDeviceRegistry(
+        query_devices=portaudio.query_devices,
+        reinitialize=portaudio.reinitialize,
+        **kwargs,
+    )
+
+
+def test_selection_is_cached():
+    portaudio = FakePortAudio([_device("Speakers", inputs=0), _device("MacBook Pro Microphone")])
+    registry = _registry(portaudio)
+
+    for _ in range(5):
+        idx, device = registry.get_best_device()
+        assert idx == 1 and device["name"] == "MacBook Pro Microphone"
+
+    assert portaudio.reinit_calls == 1 and portaudio.query_calls == 1
+    print("✅ 连续 5 次开始录音只枚举一次设备")
+
+
+def test_whitelist_priority_and_forced_refresh():
+    portaudio = FakePortAudio([_device("MacBook Pro Microphone")])
+    registry = _registry(portaudio)
+    assert registry.get_best_device()[1]["name"] == "MacBook Pro Microphone"
+
+    # 插入更高优先级的 DJI Mic，缓存不变，直到强制刷新
+    portaudio.devices.append(_device("DJI Mic 2"))
+    assert registry.get_best_device()[1]["name"] == "MacBook Pro Microphone"
+    assert registry.refresh()[1]["name"] == "DJI Mic 2"
+    print("✅ 强制刷新后选中更高优先级设备")
+
+
+def test_background_refresh_waits_until_idle():
+    portaudio = FakePortAudio([_device("MacBook Pro Microphone")])
+    state = {"busy": True}
+    registry = _registry(portaudio, is_busy=lambda: state["busy"], refresh_interval=60)
+    registry.get_best_device()
+    registry.start_background_refresh()
+    try:
+        portaudio.devices.append(_device("DJI Mic 2"))
+        registry.invalidate()
+        time.sleep(0.2)
+        # 录音中不允许重新初始化 PortAudio
+        assert portaudio.reinit_calls == 1
+
+        state["busy"] = False
+        deadline = time.time() + 3
+        while registry.get_best_device()[1]["name"] != "DJI Mic 2" and time.time() < deadline:
+            time.sleep(0.05)
+        assert registry.get_best_device()[1]["name"] == "DJI Mic 2"
+    finally:
+        registry.stop_background_refresh()
+    print("✅ 设备变化信号在空闲后触发后台刷新")
+
+
+def test_no_whitelisted_device():
+    registry = _registry(FakePortAudio([_device("Unknown USB Audio")]))
+    assert registry.get_best_device() == (None, None)
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker("test", window=100)
+    for ms in range(1, 101):
+        tracker.record(ms / 1000)
+    stats = tracker.snapshot()
+    assert stats["count"] == 100
+    assert abs(stats["p50"] - 0.050) < 0.002
+    assert abs(tracker.percentile(90) - 0.090) < 0.002
+
+
+def main():
+    print("🧪 输入设备注册表测试")
+    test_selection_is_cached()
+    test_whitelist_priority_and_forced_refresh()
+    test_background_refresh_waits_until_idle()
+    test_no_whitelisted_device()
+    test_latency_tracker_percentiles()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
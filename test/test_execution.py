@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+测试带超时和取消的调用执行
+- 超时 / 取消立即返回，并通过 CancelToken 通知调用停止
+- 超时从调用开始执行时计时，线程池排队时间不计入；线程池大小默认按通道并发数计算
+- 被放弃的调用真正结束后才触发 when_settled
+- 取消会中止尚未传完的 HTTP 上传
+- 压力测试：反复超时后线程数不增长，whisper.cpp 之类的子进程全部被结束回收
+
+Usage: python test/test_execution.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription.scheduler import lane_limits_from_env
+from src.utils.execution import (
+    BoundedExecutor,
+    CancelToken,
+    OperationCancelled,
+    cancellable_upload,
+    default_max_workers,
+    run_process,
+)
+
+
+def _cooperative_sleep(seconds, token):
+    """模拟协作式调用：取消时立即结束"""
+    stopped = threading.Event()
+    token.on_cancel(stopped.set)
+    stopped.wait(seconds)
+    return "done"
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def test_result_and_errors():
+    executor = BoundedExecutor(2)
+    assert executor.run(lambda: 42, timeout=1) == 42
+    try:
+        executor.run(lambda: 1 / 0, timeout=1)
+        raise AssertionError("应抛出调用中的异常")
+    except ZeroDivisionError:
+        pass
+    executor.shutdown()
+
+
+def test_timeout_cancels_token():
+    executor = BoundedExecutor(2)
+    token = CancelToken()
+    started = time.monotonic()
+    try:
+        executor.run(_cooperative_sleep, 10, token, timeout=0.1, token=token)
+        raise AssertionError("应超时")
+    except TimeoutError:
+        pass
+    assert time.monotonic() - started < 1
+    assert token.cancelled
+    deadline = time.monotonic() + 2
+    while executor.in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert executor.in_flight == 0, "取消后工作线程应立即空闲"
+    executor.shutdown()
+    print("✅ 超时后取消调用")
+
+
+def test_external_cancel():
+    executor = BoundedExecutor(1)
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    try:
+        executor.run(_cooperative_sleep, 10, token, timeout=10, token=token)
+        raise AssertionError("应被取消")
+    except OperationCancelled:
+        pass
+    executor.shutdown()
+
+
+def test_timeout_starts_when_call_runs():
+    executor = BoundedExecutor(1)
+    busy = threading.Thread(target=executor.run, args=(time.sleep, 0.3), kwargs={"timeout": 5})
+    busy.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert executor.run(time.sleep, 0.1, timeout=0.25) is None, "排队等待不应计入超时"
+    assert time.monotonic() - started >= 0.3
+    busy.join()
+
+    token = CancelToken()
+    busy = threading.Thread(target=executor.run, args=(time.sleep, 0.3), kwargs={"timeout": 5})
+    busy.start()
+    time.sleep(0.05)
+    threading.Timer(0.05, token.cancel).start()
+    started = time.monotonic()
+    try:
+        executor.run(time.sleep, 1, timeout=5, token=token)
+        raise AssertionError("排队中也应响应取消")
+    except OperationCancelled:
+        pass
+    assert time.monotonic() - started < 0.2
+    busy.join()
+
+    assert default_max_workers() == 2 * sum(lane_limits_from_env().values())
+    executor.shutdown()
+    print("✅ 超时从开始执行时计时")
+
+
+def test_repeated_timeouts_do_not_leak_threads():
+    executor = BoundedExecutor(4)
+    baseline = threading.active_count()
+    for _ in range(50):
+        token = CancelToken()
+        try:
+            executor.run(_cooperative_sleep, 30, token, timeout=0.02, token=token)
+        except TimeoutError:
+            pass
+    time.sleep(0.2)
+    assert executor.in_flight == 0
+    assert threading.active_count() <= baseline + executor.max_workers, threading.active_count()
+    executor.shutdown()
+    print(f"✅ 50 次超时后线程数: {threading.active_count()} (基线 {baseline})")
+
+
+def test_settled_after_abandoned_call_finishes():
+    executor = BoundedExecutor(2)
+    token = CancelToken()
+    settled = threading.Event()
+    try:
+        executor.run(time.sleep, 0.4, timeout=0.05, token=token)
+        raise AssertionError("应超时")
+    except TimeoutError:
+        pass
+    token.when_settled(settled.set)
+    assert not settled.wait(0.1), "被放弃的调用仍在执行，不应算作结束"
+    assert settled.wait(2), "调用结束后应触发 when_settled"
+
+    idle = CancelToken()
+    fired = []
+    idle.when_settled(lambda: fired.append(True))
+    assert fired, "没有被放弃的调用时立即触发"
+    executor.shutdown()
+    print("✅ 被放弃的调用结束后才释放")
+
+
+def test_cancel_aborts_upload():
+    token = CancelToken()
+    chunks = []
+
+    class SlowSource:
+        """第二块读完后模拟对冲落败，取消请求"""
+
+        def __init__(self):
+            self.data = b"x" * (64 * 1024 * 10)
+            self.position = 0
+
+        def read(self, size=-1):
+            chunks.append(size)
+            if len(chunks) == 2:
+                token.cancel()
+            end = len(self.data) if size < 0 else self.position + size
+            data, self.position = self.data[self.position:end], min(end, len(self.data))
+            return data
+
+        def seek(self, offset, whence=0):
+            self.position = offset if whence == 0 else len(self.data) + offset
+            return self.position
+
+        def tell(self):
+            return self.position
+
+    def handler(request):
+        request.read()
+        return httpx.Response(200, json={"text": "ok"})
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        try:
+            client.post("http://test/upload", files={"file": cancellable_upload(("a.flac", SlowSource()), token)})
+            raise AssertionError("取消后上传应中止")
+        except OperationCancelled:
+            pass
+    assert len(chunks) <= 3, f"取消后不应继续读取上传内容 ({len(chunks)} 块)"
+
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        upload = cancellable_upload(("a.wav", b"RIFF" * 100000), CancelToken())
+        assert client.post("http://test/upload", files={"file": upload}).json() == {"text": "ok"}
+    print("✅ 取消中止上传")
+
+
+def test_process_killed_on_timeout_and_cancel():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pid_file = os.path.join(temp_dir, "pids")
+        cmd = ["sh", "-c", f"echo $$ >> {pid_file}; exec sleep 30"]
+
+        started = time.monotonic()
+        for _ in range(10):
+            try:
+                run_process(cmd, timeout=0.1)
+                raise AssertionError("应超时")
+            except TimeoutError:
+                pass
+
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        try:
+            run_process(cmd, timeout=30, token=token)
+            raise AssertionError("应被取消")
+        except OperationCancelled:
+            pass
+        assert time.monotonic() - started < 10
+
+        with open(pid_file) as f:
+            pids = [int(line) for line in f if line.strip()]
+    assert len(pids) == 11
+    alive = [pid for pid in pids if _pid_alive(pid)]
+    assert not alive, f"子进程未被结束: {alive}"
+    print(f"✅ {len(pids)} 个超时/取消的子进程全部回收")
+
+
+def test_process_output_and_failure():
+    result = run_process(["sh", "-c", "cat; echo done"], input=b"hello ", timeout=5)
+    assert result.stdout == b"hello done\n"
+    try:
+        run_process(["sh", "-c", "exit 3"], timeout=5)
+        raise AssertionError("非零退出码应抛出 CalledProcessError")
+    except Exception as exc:
+        assert getattr(exc, "returncode", None) == 3
+
+
+def main():
+    print("🧪 调用执行测试")
+    test_result_and_errors()
+    test_timeout_cancels_token()
+    test_external_cancel()
+    test_timeout_starts_when_call_runs()
+    test_repeated_timeouts_do_not_leak_threads()
+    test_settled_after_abandoned_call_finishes()
+    test_cancel_aborts_upload()
+    test_process_killed_on_timeout_and_cancel()
+    test_process_output_and_failure()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
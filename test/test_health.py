@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+测试后端熔断与故障转移
+用本地假后端（可控制成功/失败）和假时钟验证：
+- CLOSED -> OPEN：滚动窗口失败率超过阈值
+- OPEN 期间任务改派给故障转移链中下一个健康的后端
+- OPEN -> HALF_OPEN：冷却结束后只放行一个探测请求
+- HALF_OPEN -> CLOSED（探测成功）/ HALF_OPEN -> OPEN（探测失败）
+- 没有可改派的后端时（本地任务、全部熔断）给出推迟派发的等待时间
+
+Usage: python test/test_health.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription.health import PROBE_POLL_SECONDS, CircuitState, FailoverRouter, HealthRegistry, ProviderHealth
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProvider:
+    """process_audio 按 healthy 返回结果或错误，和真实处理器的返回值一致"""
+
+    def __init__(self, name, healthy=True):
+        self.name = name
+        self.healthy = healthy
+        self.calls = 0
+
+    def process_audio(self, audio, mode="transcriptions", prompt="", archive_path=None):
+        self.calls += 1
+        if self.healthy:
+            return f"{self.name}:{audio}", None
+        return None, "❌ Error code: 503 - service unavailable"
+
+
+def _run(registry, router, providers, primary, audio):
+    """模拟 VoiceAssistant._run_job 的路由 + 健康统计"""
+    backend = router.route(primary)
+    health = registry.get(backend)
+    if not health.allow_request():
+        return backend, None
+    text, error = providers[backend].process_audio(audio)
+    if error:
+        health.record_failure(1.0)
+    else:
+        health.record_success(0.5)
+    return backend, text
+
+
+def test_breaker_transitions():
+    clock = FakeClock()
+    health = ProviderHealth("openai", window=10, min_requests=4, failure_threshold=0.5, open_seconds=30, clock=clock)
+    health.record_success(1.0)
+    health.record_failure()
+    health.record_failure()
+    assert health.state is CircuitState.CLOSED, "请求数不足 min_requests 时不熔断"
+    health.record_failure()
+    assert health.state is CircuitState.OPEN
+    assert not health.allow_request() and not health.is_available()
+
+    clock.now += 29
+    assert health.state is CircuitState.OPEN
+    clock.now += 1
+    assert health.state is CircuitState.HALF_OPEN
+    assert health.is_available()
+    assert health.allow_request(), "半开状态放行一个探测请求"
+    assert not health.allow_request(), "探测期间不放行其他请求"
+    health.record_failure()
+    assert health.state is CircuitState.OPEN, "探测失败重新熔断"
+
+    clock.now += 30
+    assert health.allow_request()
+    health.record_success(0.8)
+    assert health.state is CircuitState.CLOSED
+    assert health.snapshot()["requests"] == 0, "恢复后重新统计"
+    print("✅ closed -> open -> half_open -> open -> half_open -> closed")
+
+
+def test_release_returns_probe():
+    clock = FakeClock()
+    health = ProviderHealth("doubao", min_requests=1, open_seconds=5, clock=clock)
+    health.record_failure()
+    clock.now += 5
+    assert health.allow_request()
+    health.release()
+    assert health.allow_request(), "本地原因失败后应归还探测名额"
+
+
+def test_slow_calls_count_as_failures():
+    health = ProviderHealth("siliconflow", min_requests=2, slow_call_seconds=5, clock=FakeClock())
+    health.record_success(9.0)
+    health.record_success(7.0)
+    assert health.state is CircuitState.OPEN
+
+
+def test_failover_with_fake_providers():
+    clock = FakeClock()
+    registry = HealthRegistry(clock=clock, window=10, min_requests=3, failure_threshold=0.5, open_seconds=60)
+    providers = {"openai": FakeProvider("openai", healthy=False), "local": FakeProvider("local")}
+    router = FailoverRouter(registry, ["openai", "siliconflow", "local"], is_configured=lambda name: name in providers)
+
+    for index in range(3):
+        assert _run(registry, router, providers, "openai", index) == ("openai", None)
+    assert registry.get("openai").state is CircuitState.OPEN
+
+    # 熔断期间跳过未配置的 siliconflow，改派给 local，不再调用 openai
+    served = [_run(registry, router, providers, "openai", index) for index in range(3, 6)]
+    assert served == [("local", "local:3"), ("local", "local:4"), ("local", "local:5")]
+    assert providers["openai"].calls == 3
+
+    # 冷却结束：openai 恢复后，探测请求成功，回到主后端
+    providers["openai"].healthy = True
+    clock.now += 60
+    assert _run(registry, router, providers, "openai", 6) == ("openai", "openai:6")
+    assert registry.get("openai").state is CircuitState.CLOSED
+    assert _run(registry, router, providers, "openai", 7) == ("openai", "openai:7")
+
+    snapshot = registry.snapshot()
+    assert snapshot["local"]["latency"]["count"] >= 3
+    print(f"✅ 故障转移: {served}")
+
+
+def test_all_open_keeps_primary():
+    clock = FakeClock()
+    registry = HealthRegistry(clock=clock, min_requests=1, open_seconds=60)
+    router = FailoverRouter(registry, ["openai", "local"], is_configured=lambda name: True)
+    registry.get("openai").record_failure()
+    registry.get("local").record_failure()
+    assert router.route("openai") == "openai", "全部熔断时保留主后端，推迟到冷却结束再派发"
+    assert router.alternative("openai") is None
+
+
+def test_local_jobs_stay_local():
+    clock = FakeClock()
+    registry = HealthRegistry(clock=clock, min_requests=1, open_seconds=60)
+    registry.get("local").record_failure()
+    chain = ["openai", "siliconflow", "local"]
+    router = FailoverRouter(registry, chain, is_configured=lambda name: True)
+    assert router.route("local") == "local", "Ctrl+I 本地任务默认不改派给远程后端"
+    assert router.alternative("local") is None
+
+    registry.get("openai").record_failure()
+    assert router.route("openai") == "siliconflow", "远程任务仍按故障转移链改派"
+
+    opted_in = FailoverRouter(registry, chain, is_configured=lambda name: True, local_to_remote=True)
+    assert opted_in.route("local") == "siliconflow", "显式开启后才允许本地任务改派"
+    print("✅ 本地任务默认不改派给远程后端")
+
+
+def test_retry_after_waits_for_probe():
+    clock = FakeClock()
+    health = ProviderHealth("local", min_requests=1, open_seconds=30, clock=clock)
+    assert health.retry_after() == 0.0
+    health.record_failure()
+    clock.now += 10
+    assert health.retry_after() == 20.0, "熔断期间等到冷却结束"
+    clock.now += 20
+    assert health.retry_after() == 0.0, "冷却结束后立即派发，作为探测请求"
+    assert health.allow_request()
+    assert health.retry_after() == PROBE_POLL_SECONDS, "探测进行中，稍后再看"
+    health.record_success(1.0)
+    assert health.retry_after() == 0.0
+    print("✅ 熔断期间推迟任务，等待半开探测")
+
+
+def main():
+    print("🧪 熔断与故障转移测试")
+    test_breaker_transitions()
+    test_release_returns_probe()
+    test_slow_calls_count_as_failures()
+    test_failover_with_fake_providers()
+    test_all_open_keeps_primary()
+    test_local_jobs_stay_local()
+    test_retry_after_waits_for_probe()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+测试对冲请求
+用 sleep 模拟后端延迟验证：
+- 主后端在等待阈值内返回：不发备用请求
+- 主后端慢：备用后端先返回并被采用，记录节省的时间
+- 落败的请求通过 CancelToken 取消
+- 两个后端都失败：返回主后端的错误
+- 备用后端没有空闲名额时不对冲；名额在备用请求结束后释放，
+  取消后仍在后台执行的备用请求结束前不释放
+- 等待阈值取主后端延迟的 p90，并限制在 [min_delay, max_delay]
+
+Usage: python test/test_hedging.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription.hedging import PRIMARY, SECONDARY, HedgePolicy, HedgeStats, run_hedged
+from src.utils.execution import BoundedExecutor, OperationCancelled
+from src.utils.metrics import LatencyTracker
+
+
+class FakeBackend:
+    def __init__(self, name, seconds, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.error = error
+        self.calls = 0
+        self.cancelled = threading.Event()
+
+    def __call__(self, token):
+        self.calls += 1
+        token.on_cancel(self.cancelled.set)
+        if self.cancelled.wait(self.seconds):
+            return None, "cancelled"
+        if self.error:
+            return None, self.error
+        return f"{self.name} 文本", None
+
+
+def test_fast_primary_not_hedged():
+    primary, secondary = FakeBackend("openai", 0.01), FakeBackend("siliconflow", 0.01)
+    outcome = run_hedged(primary, secondary, delay=0.5)
+    assert outcome.winner == PRIMARY and not outcome.hedged
+    assert outcome.text == "openai 文本"
+    assert secondary.calls == 0, "主后端及时返回时不应发备用请求"
+    print("✅ 主后端及时返回，不对冲")
+
+
+def test_slow_primary_secondary_wins():
+    stats = HedgeStats()
+    saved = threading.Event()
+
+    def on_primary_late(seconds):
+        stats.record_saved(seconds)
+        saved.set()
+
+    primary, secondary = FakeBackend("openai", 0.6), FakeBackend("siliconflow", 0.05)
+    started = time.monotonic()
+    outcome = run_hedged(primary, secondary, delay=0.1, cancel_loser=False, on_primary_late=on_primary_late)
+    elapsed = time.monotonic() - started
+    assert outcome.winner == SECONDARY and outcome.hedged
+    assert outcome.text == "siliconflow 文本"
+    assert elapsed < 0.4, f"应采用备用后端的结果，不等主后端 ({elapsed:.2f}s)"
+
+    assert saved.wait(2), "主请求结束后应记录节省的时间"
+    assert stats.snapshot()["saved"]["count"] >= 1
+    assert 0.3 < stats.saved.last < 0.6, stats.saved.last
+    assert not primary.cancelled.is_set()
+    print(f"✅ 备用后端获胜，节省 {stats.saved.last:.2f}s")
+
+
+def test_loser_is_cancelled():
+    primary, secondary = FakeBackend("openai", 5), FakeBackend("siliconflow", 0.05)
+    outcome = run_hedged(primary, secondary, delay=0.05)
+    assert outcome.winner == SECONDARY
+    assert primary.cancelled.wait(1), "备用后端获胜后应取消主请求"
+
+    primary, secondary = FakeBackend("openai", 0.2), FakeBackend("siliconflow", 5)
+    outcome = run_hedged(primary, secondary, delay=0.05)
+    assert outcome.winner == PRIMARY and outcome.hedged
+    assert secondary.cancelled.wait(1), "主后端获胜后应取消备用请求"
+    print("✅ 落败的请求被取消")
+
+
+def test_slow_primary_still_wins_when_secondary_fails():
+    primary = FakeBackend("openai", 0.3)
+    secondary = FakeBackend("siliconflow", 0.01, error="❌ Error code: 503")
+    outcome = run_hedged(primary, secondary, delay=0.05)
+    assert outcome.winner == PRIMARY and outcome.hedged and outcome.text == "openai 文本"
+
+
+def test_both_fail_returns_primary_error():
+    primary = FakeBackend("openai", 0.2, error="❌ openai 超时")
+    secondary = FakeBackend("siliconflow", 0.01, error="❌ siliconflow 503")
+    outcome = run_hedged(primary, secondary, delay=0.05)
+    assert outcome.hedged and outcome.text is None
+    assert outcome.error == "❌ openai 超时"
+    print("✅ 都失败时返回主后端错误")
+
+
+def test_no_capacity_skips_hedge():
+    primary, secondary = FakeBackend("openai", 0.3), FakeBackend("local", 0.01)
+    outcome = run_hedged(primary, secondary, delay=0.05, reserve_secondary=lambda: None)
+    assert outcome.winner == PRIMARY and not outcome.hedged and outcome.text == "openai 文本"
+    assert secondary.calls == 0, "没有空闲名额时不应发备用请求"
+
+    released = threading.Event()
+    primary = FakeBackend("openai", 0.5)
+    outcome = run_hedged(primary, secondary, delay=0.05, reserve_secondary=lambda: released.set)
+    assert outcome.winner == SECONDARY and released.wait(1), "备用请求结束后释放名额"
+    print("✅ 备用后端没有名额时不对冲，名额用完即释放")
+
+
+def test_abandoned_secondary_keeps_slot():
+    executor = BoundedExecutor(2)
+
+    def secondary(token):
+        # 模拟已上传完、等待响应的 HTTP 请求：取消后调用方返回，但请求仍在后台执行
+        try:
+            executor.run(time.sleep, 0.6, timeout=5, token=token)
+        except OperationCancelled:
+            return None, "cancelled"
+        return "local 文本", None
+
+    released = threading.Event()
+    outcome = run_hedged(FakeBackend("openai", 0.15), secondary, delay=0.05, reserve_secondary=lambda: released.set)
+    assert outcome.winner == PRIMARY and outcome.hedged
+    assert not released.wait(0.2), "落败的备用请求仍在执行，不应释放名额"
+    assert released.wait(2), "备用请求结束后释放名额"
+    executor.shutdown()
+    print("✅ 取消后仍在执行的备用请求结束后才释放名额")
+
+
+def test_delay_from_percentile():
+    policy = HedgePolicy(enabled=True, min_delay=1, max_delay=15, default_delay=5, min_samples=5)
+    tracker = LatencyTracker("test.hedge")
+    assert policy.delay_for(tracker) == 5, "样本不足时使用默认值"
+
+    for seconds in (2, 2, 3, 3, 4, 4, 4, 5, 6, 8):
+        tracker.record(seconds)
+    assert 5 <= policy.delay_for(tracker) <= 8
+
+    fast = LatencyTracker("test.hedge.fast")
+    for _ in range(10):
+        fast.record(0.2)
+    assert policy.delay_for(fast) == 1
+
+    slow = LatencyTracker("test.hedge.slow")
+    for _ in range(10):
+        slow.record(120)
+    assert policy.delay_for(slow) == 15
+    print("✅ 等待阈值取 p90 并限制范围")
+
+
+def main():
+    print("🧪 对冲请求测试")
+    test_fast_primary_not_hedged()
+    test_slow_primary_secondary_wins()
+    test_loser_is_cancelled()
+    test_slow_primary_still_wins_when_secondary_fails()
+    test_both_fail_returns_primary_error()
+    test_no_capacity_skips_hedge()
+    test_abandoned_secondary_keeps_slot()
+    test_delay_from_percentile()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
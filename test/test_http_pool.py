@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试共享 HTTP 连接池
+用本地 HTTP 桩服务验证：
+- 所有处理器拿到的是同一个 httpx.Client，连续请求复用同一条连接
+- 登记服务地址后在后台预热（HEAD 请求）
+- 只 ping 空闲超过阈值的地址
+- 连接池参数来自环境变量
+
+Usage: python test/test_http_pool.py
+"""
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.http import HttpConfig, HttpTransport, get_http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def _reply(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        _Handler.requests.append((self.command, self.client_address[1]))
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_GET = do_POST = do_HEAD = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def _start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_connections_are_reused():
+    server, base = _start_server()
+    _Handler.requests = []
+    transport = HttpTransport(HttpConfig(warmup=False))
+    for _ in range(5):
+        transport.client.post(f"{base}/v1/chat/completions", json={}).raise_for_status()
+    ports = {port for _, port in _Handler.requests}
+    assert len(_Handler.requests) == 5 and len(ports) == 1, f"应复用同一条连接: {ports}"
+    transport.close()
+    server.shutdown()
+    print("✅ 连续请求复用同一条连接")
+
+
+def test_warmup_and_idle_ping():
+    server, base = _start_server()
+    _Handler.requests = []
+    transport = HttpTransport(HttpConfig(warmup=True))
+    transport.register(f"{base}/v1/audio/transcriptions")
+    transport.register(f"{base}/v1/chat/completions")  # 同一地址只预热一次
+    assert _wait_for(lambda: len(_Handler.requests) == 1)
+    assert _Handler.requests[0][0] == "HEAD"
+
+    transport.client.post(f"{base}/v1/chat/completions", json={})
+    assert transport.ping_idle(60) == 0, "刚用过的地址不需要 ping"
+    assert transport.ping_idle(0) == 1
+    assert [command for command, _ in _Handler.requests] == ["HEAD", "POST", "HEAD"]
+    transport.close()
+    server.shutdown()
+    print("✅ 预热与空闲 ping")
+
+
+def test_config_from_env_and_shared_client():
+    os.environ.update(HTTP_MAX_CONNECTIONS="7", HTTP_KEEPALIVE_EXPIRY="15", HTTP2="false")
+    try:
+        config = HttpConfig.from_env()
+    finally:
+        for key in ("HTTP_MAX_CONNECTIONS", "HTTP_KEEPALIVE_EXPIRY", "HTTP2"):
+            os.environ.pop(key)
+    assert config.max_connections == 7 and config.keepalive_expiry == 15 and not config.http2
+    assert get_http_client() is get_http_client(None)
+
+
+def main():
+    print("🧪 HTTP 连接池测试")
+    test_connections_are_reused()
+    test_warmup_and_idle_ping()
+    test_config_from_env_and_shared_client()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+测试转录任务持久化
+- 状态流转 queued -> running -> queued(重试) -> done / failed
+- 进程“崩溃”（不做任何收尾直接重新打开数据库）后，未完成的任务按入队顺序恢复，提示词一并保留
+- 早期版本没有 prompt 列的数据库打开时自动补列
+- 过期的已结束任务被清理
+- 存档目录迁移不会把 jobs.sqlite3 搬进 audio/
+
+Usage: python test/test_job_store.py
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio.archive import MIGRATION_MARKER, AudioArchiveManager
+from src.transcription import job_store as job_store_module
+from src.transcription.job_store import DONE, FAILED, QUEUED, RUNNING, JobStore
+
+
+def test_state_transitions():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(os.path.join(tmp, "jobs.sqlite3"))
+        job_id = store.add("a.wav", "openai", mode="transcriptions", retries_left=2)
+        assert store.get(job_id).state == QUEUED
+
+        store.mark_running(job_id)
+        assert store.get(job_id).state == RUNNING
+        store.requeue(job_id, retries_left=1, attempt=2, error="timeout")
+        job = store.get(job_id)
+        assert (job.state, job.retries_left, job.attempt, job.error) == (QUEUED, 1, 2, "timeout")
+
+        store.mark_done(job_id)
+        assert store.get(job_id).state == DONE
+        assert store.outstanding() == []
+
+        failed_id = store.add("b.wav", "local", mode="transcriptions", retries_left=0)
+        store.mark_running(failed_id)
+        store.mark_failed(failed_id, "音频文件不存在")
+        failed = store.get(failed_id)
+        assert (failed.state, failed.error) == (FAILED, "音频文件不存在")
+        assert store.outstanding() == [], "失败的任务不再恢复"
+        store.close()
+
+
+def test_resume_after_crash():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite3")
+        store = JobStore(path)
+        running = store.add("first.wav", "local", mode="transcriptions", retries_left=0)
+        queued = store.add("second.wav", "openai", mode="translations", retries_left=5, prompt="术语：Whisper")
+        finished = store.add("third.wav", "openai", mode="transcriptions", retries_left=5)
+        store.mark_running(running)
+        store.mark_running(finished)
+        store.mark_failed(finished, "401")
+        # 模拟崩溃：不调用 close，直接用新连接打开
+        reopened = JobStore(path)
+        pending = reopened.outstanding()
+        assert [job.id for job in pending] == [running, queued]
+        assert [job.state for job in pending] == [RUNNING, QUEUED]
+        assert pending[1].mode == "translations" and pending[1].retries_left == 5
+        assert pending[1].prompt == "术语：Whisper" and pending[0].prompt == ""
+        assert reopened.get(finished).error == "401"
+        print(f"✅ 崩溃后恢复 {len(pending)} 个未完成任务")
+        reopened.close()
+        store.close()
+
+
+def test_adds_prompt_column_to_old_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "jobs.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, audio_path TEXT NOT NULL,"
+            " processor TEXT NOT NULL, mode TEXT NOT NULL, state TEXT NOT NULL,"
+            " retries_left INTEGER NOT NULL DEFAULT 0, attempt INTEGER NOT NULL DEFAULT 1, error TEXT,"
+            " created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (audio_path, processor, mode, state, created_at, updated_at)"
+            " VALUES ('old.wav', 'openai', 'transcriptions', 'queued', 0, 0)"
+        )
+        conn.commit()
+        conn.close()
+
+        store = JobStore(path)
+        assert [job.prompt for job in store.outstanding()] == [""]
+        job_id = store.add("new.wav", "openai", mode="transcriptions", retries_left=0, prompt="hello")
+        assert store.get(job_id).prompt == "hello"
+        store.close()
+    print("✅ 旧数据库自动补充 prompt 列")
+
+
+def test_prune_finished_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(os.path.join(tmp, "jobs.sqlite3"))
+        old = store.add("old.wav", "openai", mode="transcriptions", retries_left=0)
+        store.mark_done(old)
+        pending = store.add("pending.wav", "openai", mode="transcriptions", retries_left=0)
+
+        real_time = job_store_module.time.time
+        job_store_module.time.time = lambda: real_time() + 8 * 86400
+        try:
+            assert store.prune(max_age_days=7) == 1
+        finally:
+            job_store_module.time.time = real_time
+        assert store.get(old) is None
+        assert store.get(pending).state == QUEUED, "未完成的任务不能被清理"
+        store.close()
+
+
+def test_archive_keeps_database_in_root():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "audio_archive")
+        AudioArchiveManager(archive_dir)
+        store = JobStore(os.path.join(archive_dir, "jobs.sqlite3"))
+        store.add("a.wav", "openai", mode="transcriptions", retries_left=0)
+        # 删除迁移标记，模拟从旧版本升级：再次启动会执行旧目录迁移
+        os.remove(os.path.join(archive_dir, MIGRATION_MARKER))
+        AudioArchiveManager(archive_dir)
+        assert os.path.exists(os.path.join(archive_dir, "jobs.sqlite3"))
+        assert not any(".sqlite3" in name for name in os.listdir(os.path.join(archive_dir, "audio")))
+        assert len(store.outstanding()) == 1
+        store.close()
+
+
+def main():
+    print("🧪 任务持久化测试")
+    started = time.time()
+    test_state_transitions()
+    test_resume_after_crash()
+    test_adds_prompt_column_to_old_database()
+    test_prune_finished_jobs()
+    test_archive_keeps_database_in_root()
+    print(f"🎉 测试通过! ({time.time() - started:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -40,7 +40,7 @@ async def test_recorder_integration():
     recorder = AudioRecorder()
     # 设置采样率为测试音频的采样率
     recorder.sample_rate = sample_rate
-    recorder.recording = True  # 模拟开始录音
+    recorder._start_capture_session(clear_queue=True)  # 模拟开始录音
 
     # 创建 processor
     processor = DoubaoStreamingProcessor()
@@ -48,15 +48,15 @@ async def test_recorder_integration():
         print("❌ API Key 未配置")
         return False
 
-    # 模拟麦克风输入：把音频数据分块放入 recorder 的队列
+    # 模拟麦克风输入：把音频数据分块交给 recorder 的音频回调
     def simulate_microphone():
-        """模拟麦克风回调，将音频数据放入队列"""
+        """模拟麦克风回调，将音频数据写入录音缓冲并推送给流式消费者"""
         chunk_size = 1024  # 每次回调的采样点数（类似真实麦克风）
         for i in range(0, len(audio_data), chunk_size):
             if not recorder.recording:
                 break
             chunk = audio_data[i:i + chunk_size]
-            recorder.audio_queue.put(chunk.copy())
+            recorder._capture_audio_chunk(chunk.reshape(-1, 1), stream_to_queue=True)
             time.sleep(chunk_size / sample_rate * 0.5)  # 模拟实时，但比实时快一点
         print("  📥 模拟麦克风输入完成")
 
@@ -90,7 +90,7 @@ async def test_recorder_integration():
     # 设置一个定时器，在音频播放完后停止录音
     async def stop_after_audio():
         await asyncio.sleep(len(audio_data) / sample_rate + 1)  # 等待音频播放完 + 1秒
-        recorder.recording = False
+        recorder.stop_streaming_recording()
         print("  ⏹️ 停止录音")
 
     # 并行运行转录和停止定时器
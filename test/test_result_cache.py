@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+测试按音频内容寻址的结果缓存
+- 哈希只取决于 PCM 内容：不同文件名、WAV/FLAC 容器得到同一个哈希
+- 键包含 service / model / mode / prompt，任何一项不同都不命中
+- 命中/未命中计数，条数上限按最久未使用淘汰，过期条目不再命中
+- 重新打开数据库后缓存仍然有效
+
+Usage: python test/test_result_cache.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.transcription.result_cache import ResultCache, audio_fingerprint, cache_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _write(path, samples, subtype="PCM_16"):
+    sf.write(path, samples, 16000, subtype=subtype)
+    return path
+
+
+def test_fingerprint_depends_on_pcm_only():
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal(16000) * 3000).astype(np.int16)
+    with tempfile.TemporaryDirectory() as tmp:
+        first = audio_fingerprint(_write(os.path.join(tmp, "recording_1.wav"), samples))
+        renamed = audio_fingerprint(_write(os.path.join(tmp, "copy.wav"), samples))
+        flac = audio_fingerprint(_write(os.path.join(tmp, "recording_1.flac"), samples))
+        changed = samples.copy()
+        changed[100] += 1
+        different = audio_fingerprint(_write(os.path.join(tmp, "other.wav"), changed))
+    assert first == renamed == flac
+    assert different != first
+    print("✅ 哈希只取决于 PCM 内容")
+
+
+def test_key_includes_request_parameters():
+    base = cache_key("abc", "openai", "gpt-4o-transcribe", "transcriptions")
+    assert base == cache_key("abc", "openai", "gpt-4o-transcribe", "transcriptions", "")
+    assert base != cache_key("abc", "openai", "gpt-4o-transcribe", "translations")
+    assert base != cache_key("abc", "local", "ggml-large-v3.bin", "transcriptions")
+    assert base != cache_key("abc", "openai", "gpt-4o-transcribe", "transcriptions", "术语表")
+
+
+def test_hits_misses_and_eviction():
+    clock = FakeClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(os.path.join(tmp, "results.sqlite3"), max_entries=3, max_age_days=1, clock=clock)
+        assert cache.get("k0") is None
+        for index in range(3):
+            clock.now += 1
+            cache.put(f"k{index}", f"文本{index}", audio_hash=f"h{index}", service="openai", model="m", mode="transcriptions")
+        clock.now += 1
+        assert cache.get("k0") == "文本0", "k0 刚被使用，不应被淘汰"
+
+        clock.now += 1
+        cache.put("k3", "文本3", audio_hash="h3", service="openai", model="m", mode="transcriptions")
+        assert len(cache) == 3
+        assert cache.get("k1") is None, "最久未使用的 k1 应被淘汰"
+        assert cache.get("k0") == "文本0" and cache.get("k3") == "文本3"
+
+        clock.now += 86400 + 1
+        assert cache.get("k3") is None, "过期条目不再命中"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["evictions"]) == (3, 3, 1), stats
+        cache.close()
+    print(f"✅ 命中 {stats['hits']} / 未命中 {stats['misses']}，淘汰 {stats['evictions']}")
+
+
+def test_persists_across_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.sqlite3")
+        cache = ResultCache(path)
+        cache.put("key", "你好", audio_hash="h", service="local", model="ggml-large-v3.bin", mode="transcriptions")
+        reopened = ResultCache(path)
+        assert reopened.get("key") == "你好"
+        cache.close()
+        reopened.close()
+
+
+def main():
+    print("🧪 结果缓存测试")
+    test_fingerprint_depends_on_pcm_only()
+    test_key_includes_request_parameters()
+    test_hits_misses_and_eviction()
+    test_persists_across_restart()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
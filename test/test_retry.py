@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+测试延迟重试
+- 错误分类：超时 / 429 / 5xx / 网络错误 / 无法解析的响应可重试，4xx、文件不存在、配置错误直接失败
+- 指数退避 + 抖动的等待时间范围
+- 定时器堆（假时钟）：未到期不提交，到期按时间顺序提交，不影响新任务
+
+Usage: python test/test_retry.py
+"""
+
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import openai
+
+from src.transcription.retry import (
+    BackoffPolicy,
+    ConfigurationError,
+    ErrorInfo,
+    ErrorKind,
+    RetryScheduler,
+    TranscriptionError,
+    classify_error,
+)
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/audio/transcriptions")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def _status_error(status, headers=None):
+    response = httpx.Response(status, request=REQUEST, headers=headers or {})
+    return httpx.HTTPStatusError(f"HTTP {status}", request=REQUEST, response=response)
+
+
+def test_classify_error():
+    assert classify_error(TimeoutError()).kind is ErrorKind.TIMEOUT
+    assert classify_error(httpx.ReadTimeout("read", request=REQUEST)).kind is ErrorKind.TIMEOUT
+    assert classify_error(httpx.ConnectError("refused", request=REQUEST)).kind is ErrorKind.NETWORK
+    assert classify_error(_status_error(503)).kind is ErrorKind.SERVER
+
+    rate_limited = classify_error(_status_error(429, {"Retry-After": "30"}))
+    assert rate_limited == ErrorInfo(ErrorKind.RATE_LIMITED, 429, 30.0)
+
+    auth = openai.AuthenticationError("bad key", response=httpx.Response(401, request=REQUEST), body=None)
+    info = classify_error(TranscriptionError("❌ bad key", auth))
+    assert info.kind is ErrorKind.CLIENT and info.status == 401 and not info.retryable
+    assert classify_error(openai.APITimeoutError(request=REQUEST)).kind is ErrorKind.TIMEOUT
+    assert classify_error(openai.APIConnectionError(request=REQUEST)).kind is ErrorKind.NETWORK
+
+    # 调用方的问题直接失败；网关返回无法解析的响应体可以重试
+    assert classify_error(FileNotFoundError("missing.wav")).kind is ErrorKind.CLIENT
+    assert classify_error(ConfigurationError("未知的平台")).kind is ErrorKind.CLIENT
+    try:
+        json.loads("<html>502 Bad Gateway</html>")
+    except ValueError as exc:
+        garbage = classify_error(TranscriptionError("❌ Expecting value", exc))
+    assert garbage.kind is ErrorKind.SERVER and garbage.retryable
+    assert classify_error(UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")).retryable
+    assert classify_error(ValueError("odd")).retryable, "其他 ValueError 不再视为客户端错误"
+
+    # 只有错误信息字符串时按内容判断
+    assert classify_error("❌ Error code: 400 - {'error': 'invalid file'}").kind is ErrorKind.CLIENT
+    assert classify_error("❌ API 请求超时 (180秒)").kind is ErrorKind.TIMEOUT
+    assert classify_error("❌ something odd").retryable
+    print("✅ 错误分类")
+
+
+def test_backoff_delays():
+    policy = BackoffPolicy(base_delay=2, factor=2, max_delay=30, rate_limit_delay=10)
+    rng = random.Random(0)
+    server = ErrorInfo(ErrorKind.SERVER, 503)
+    for failures, cap in ((1, 2), (2, 4), (3, 8), (4, 16), (5, 30), (8, 30)):
+        delays = [policy.delay(failures, server, rng) for _ in range(200)]
+        assert min(delays) >= cap / 2 and max(delays) <= cap, (failures, min(delays), max(delays))
+        assert max(delays) - min(delays) > cap / 4, "应加入随机抖动"
+
+    assert policy.delay(1, ErrorInfo(ErrorKind.RATE_LIMITED, 429), rng) >= 10
+    assert policy.delay(1, ErrorInfo(ErrorKind.RATE_LIMITED, 429, 25.0), rng) >= 25
+    assert policy.delay(1, ErrorInfo(ErrorKind.RATE_LIMITED, 429, 3600.0), rng) <= 30
+    print("✅ 指数退避 + 抖动")
+
+
+def test_retry_heap_with_fake_clock():
+    clock = FakeClock()
+    submitted = []
+    retries = RetryScheduler(submitted.append, clock=clock, autostart=False)
+
+    retries.schedule("slow", 8.0)
+    retries.schedule("fast", 2.0)
+    retries.schedule("middle", 4.0)
+    assert retries.pending == 3 and retries.next_due() == 1002.0
+
+    clock.advance(1.9)
+    assert retries.run_due() == 0 and submitted == []
+
+    submitted.append("fresh")  # 新任务直接提交，不等待重试
+    clock.advance(0.1)
+    assert retries.run_due() == 1
+    assert submitted == ["fresh", "fast"]
+
+    clock.advance(10)
+    assert retries.run_due() == 2
+    assert submitted == ["fresh", "fast", "middle", "slow"]
+    assert retries.pending == 0 and retries.next_due() is None
+    print("✅ 定时器堆按到期时间提交")
+
+
+def test_retry_thread_submits_when_due():
+    import threading
+
+    fired = threading.Event()
+    retries = RetryScheduler(lambda job: fired.set())
+    retries.schedule("job", 0.05)
+    assert fired.wait(2), "后台线程应在到期后提交任务"
+
+
+def main():
+    print("🧪 延迟重试测试")
+    test_classify_error()
+    test_backoff_delays()
+    test_retry_heap_with_fake_clock()
+    test_retry_thread_submits_when_due()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
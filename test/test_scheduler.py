@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+测试转录任务调度器
+用带固定延迟的假处理器验证：
+- 慢的 OpenAI 任务不再挡住后面的本地任务
+- local 通道同时只跑 1 个，远程通道按上限并发
+- 排队 + 执行中的任务数（状态栏显示）准确，全部完成后归零
+- 任务抛异常不影响后续任务
+- 通道外的调用（对冲请求）通过 try_reserve 占用名额，与通道内任务共享并发上限
+
+Usage: python test/test_scheduler.py
+"""
+
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.transcription.scheduler import JobScheduler, lane_limits_from_env
+
+
+@dataclass
+class FakeJob:
+    name: str
+    processor: str
+    delay: float
+    mode: str = "transcriptions"
+
+
+class FakeProcessors:
+    """按任务延迟 sleep，记录完成顺序和各通道的最大并发数"""
+
+    def __init__(self):
+        self.finished = []
+        self.running = {}
+        self.max_running = {}
+        self._lock = threading.Lock()
+
+    def run(self, job):
+        with self._lock:
+            self.running[job.processor] = self.running.get(job.processor, 0) + 1
+            self.max_running[job.processor] = max(self.max_running.get(job.processor, 0), self.running[job.processor])
+        try:
+            time.sleep(job.delay)
+            if job.name.startswith("boom"):
+                raise RuntimeError("处理器异常")
+        finally:
+            with self._lock:
+                self.running[job.processor] -= 1
+                self.finished.append(job.name)
+
+
+def _lane_of(job):
+    return "translations" if job.mode == "translations" else job.processor
+
+
+def _scheduler(processors, **kwargs):
+    limits = {"openai": 3, "translations": 2, "local": 1}
+    return JobScheduler(processors.run, lane_of=_lane_of, limits=limits, **kwargs)
+
+
+def test_slow_upload_does_not_block_local():
+    processors = FakeProcessors()
+    scheduler = _scheduler(processors)
+    scheduler.submit(FakeJob("upload", "openai", 0.6))
+    scheduler.submit(FakeJob("ctrl-i", "local", 0.05))
+    assert scheduler.wait_idle(5)
+    assert processors.finished == ["ctrl-i", "upload"], processors.finished
+    print("✅ 本地任务不再排在慢上传后面")
+
+
+def test_per_lane_limits():
+    processors = FakeProcessors()
+    scheduler = _scheduler(processors)
+    started = time.perf_counter()
+    for index in range(3):
+        scheduler.submit(FakeJob(f"local-{index}", "local", 0.1))
+        scheduler.submit(FakeJob(f"openai-{index}", "openai", 0.3))
+    assert scheduler.wait_idle(5)
+    elapsed = time.perf_counter() - started
+
+    assert processors.max_running["local"] == 1, "whisper.cpp 同时只能跑一个"
+    assert processors.max_running["openai"] == 3
+    assert [name for name in processors.finished if name.startswith("local")] == ["local-0", "local-1", "local-2"]
+    assert elapsed < 0.6, f"3 个 OpenAI 任务应并发执行，实际耗时 {elapsed:.2f}s"
+    print(f"✅ 通道并发上限: local=1, openai=3 (总耗时 {elapsed:.2f}s)")
+
+
+def test_outstanding_count():
+    processors = FakeProcessors()
+    observed = []
+    scheduler = None
+
+    def on_change():
+        observed.append(scheduler.outstanding)
+
+    scheduler = _scheduler(processors, on_change=on_change)
+    scheduler.submit(FakeJob("boom", "local", 0.05))
+    scheduler.submit(FakeJob("after-boom", "local", 0.05))
+    scheduler.submit(FakeJob("translate", "openai", 0.1, mode="translations"))
+    assert scheduler.outstanding == 3
+    stats = scheduler.lane_stats()
+    assert stats["local"]["queued"] + stats["local"]["running"] == 2
+    assert stats["translations"]["limit"] == 2
+
+    assert scheduler.wait_idle(5)
+    assert scheduler.outstanding == 0
+    assert "after-boom" in processors.finished, "任务异常不应影响后续任务"
+    deadline = time.time() + 1
+    while 0 not in observed and time.time() < deadline:
+        time.sleep(0.01)  # 最后一次回调在 wait_idle 返回之后才触发
+    assert max(observed) == 3 and 0 in observed
+    print(f"✅ 待处理任务数: {observed}")
+
+
+def test_limits_from_env():
+    os.environ["TRANSCRIBE_CONCURRENCY_OPENAI"] = "5"
+    try:
+        limits = lane_limits_from_env()
+    finally:
+        os.environ.pop("TRANSCRIBE_CONCURRENCY_OPENAI")
+    assert limits["openai"] == 5 and limits["local"] == 1
+
+
+def test_reserve_shares_lane_limit():
+    processors = FakeProcessors()
+    scheduler = _scheduler(processors)
+    assert scheduler.try_reserve("local"), "空闲通道可以占用名额"
+    assert not scheduler.try_reserve("local"), "local 通道只有 1 个名额"
+
+    scheduler.submit(FakeJob("ctrl-i", "local", 0.01))
+    time.sleep(0.2)
+    assert processors.finished == [], "名额被占用时通道内任务应等待"
+    scheduler.release("local")
+    assert scheduler.wait_idle(5) and processors.finished == ["ctrl-i"]
+
+    scheduler.submit(FakeJob("slow", "local", 0.3))
+    scheduler.submit(FakeJob("queued", "local", 0.01))
+    time.sleep(0.05)
+    assert not scheduler.try_reserve("local"), "有排队任务时不插队"
+    assert scheduler.wait_idle(5)
+    assert scheduler.try_reserve("openai") and scheduler.lane_stats()["openai"]["running"] == 1
+    scheduler.release("openai")
+    print("✅ 通道外调用占用名额，不超过通道并发上限")
+
+
+def main():
+    print("🧪 转录调度器测试")
+    test_slow_upload_does_not_block_local()
+    test_per_lane_limits()
+    test_outstanding_count()
+    test_limits_from_env()
+    test_reserve_shares_lane_limit()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
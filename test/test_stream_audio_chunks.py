@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+测试 AudioRecorder.stream_audio_chunks 的音频块投递延迟
+用合成的音频回调线程驱动录音器，对比：
+- 旧方案：get_nowait() 轮询 + asyncio.sleep(0.02)
+- 新方案：回调通过 call_soon_threadsafe 直接唤醒生成器
+
+Usage: python test/test_stream_audio_chunks.py
+"""
+
+import asyncio
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from src.audio.recorder import AudioRecorder
+
+SAMPLE_RATE = 16000
+BLOCK_FRAMES = 160        # 每次回调 10ms
+CHUNK_MS = 200
+BLOCKS_PER_CHUNK = SAMPLE_RATE * CHUNK_MS // 1000 // BLOCK_FRAMES
+TOTAL_CHUNKS = 15
+
+
+def _drive_callbacks(deliver, capture_times, stop):
+    """模拟 PortAudio 回调线程：每 10ms 推送一个音频块。"""
+    block = np.zeros((BLOCK_FRAMES, 1), dtype=np.float32)
+    next_tick = time.perf_counter()
+    for _ in range(BLOCKS_PER_CHUNK * TOTAL_CHUNKS):
+        next_tick += BLOCK_FRAMES / SAMPLE_RATE
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        capture_times.append(time.perf_counter())
+        deliver(block)
+    stop()
+
+
+def _chunk_latencies(yield_times, capture_times):
+    latencies = []
+    for index, yielded_at in enumerate(yield_times[:TOTAL_CHUNKS]):
+        completed_at = capture_times[(index + 1) * BLOCKS_PER_CHUNK - 1]
+        latencies.append((yielded_at - completed_at) * 1000)
+    return latencies
+
+
+async def _legacy_polling_generator(audio_queue, is_recording):
+    """旧实现的最小复刻：轮询队列，空时 sleep 20ms。"""
+    samples_per_chunk = SAMPLE_RATE * CHUNK_MS // 1000
+    accumulated = []
+    while is_recording() or not audio_queue.empty():
+        try:
+            accumulated.append(audio_queue.get_nowait())
+            if sum(len(c) for c in accumulated) >= samples_per_chunk:
+                audio = np.concatenate(accumulated)
+                remaining = audio[samples_per_chunk:]
+                accumulated = [remaining] if len(remaining) else []
+                yield audio[:samples_per_chunk]
+        except queue.Empty:
+            await asyncio.sleep(0.02)
+
+
+async def _measure_legacy():
+    audio_queue = queue.Queue()
+    state = {"recording": True}
+    capture_times, yield_times = [], []
+
+    driver = threading.Thread(
+        target=_drive_callbacks,
+        args=(lambda block: audio_queue.put(block.copy()), capture_times,
+              lambda: state.update(recording=False)),
+        daemon=True,
+    )
+    driver.start()
+    async for _ in _legacy_polling_generator(audio_queue, lambda: state["recording"]):
+        yield_times.append(time.perf_counter())
+    driver.join()
+    return _chunk_latencies(yield_times, capture_times)
+
+
+async def _measure_event_driven():
+    recorder = AudioRecorder(probe_devices=False)
+    recorder.sample_rate = SAMPLE_RATE
+    recorder._start_capture_session(clear_queue=True)
+    capture_times, yield_times = [], []
+
+    driver = threading.Thread(
+        target=_drive_callbacks,
+        args=(lambda block: recorder._capture_audio_chunk(block, stream_to_queue=True),
+              capture_times, recorder.stop_streaming_recording),
+        daemon=True,
+    )
+    driver.start()
+    async for chunk in recorder.stream_audio_chunks(chunk_duration_ms=CHUNK_MS, target_sample_rate=SAMPLE_RATE):
+        yield_times.append(time.perf_counter())
+        assert len(chunk) == SAMPLE_RATE * CHUNK_MS // 1000 * 2
+    driver.join()
+    return _chunk_latencies(yield_times, capture_times)
+
+
+def test_event_driven_delivery_latency():
+    legacy = asyncio.run(_measure_legacy())
+    event_driven = asyncio.run(_measure_event_driven())
+
+    print(f"📊 轮询方案   平均 {statistics.mean(legacy):.2f}ms, 最大 {max(legacy):.2f}ms")
+    print(f"📊 事件驱动   平均 {statistics.mean(event_driven):.2f}ms, 最大 {max(event_driven):.2f}ms")
+
+    assert len(event_driven) == TOTAL_CHUNKS
+    assert statistics.mean(event_driven) < statistics.mean(legacy)
+    assert statistics.mean(event_driven) < 5.0
+
+
+def test_generator_exits_after_stop_without_audio():
+    """没有任何音频块时，停止录音也能立即结束生成器。"""
+    recorder = AudioRecorder(probe_devices=False)
+    recorder.sample_rate = SAMPLE_RATE
+    recorder._start_capture_session(clear_queue=True)
+
+    async def consume():
+        threading.Timer(0.05, recorder.stop_streaming_recording).start()
+        started = time.perf_counter()
+        chunks = [chunk async for chunk in recorder.stream_audio_chunks()]
+        return chunks, time.perf_counter() - started
+
+    chunks, elapsed = asyncio.run(consume())
+    assert chunks == []
+    assert elapsed < recorder.STREAM_IDLE_CHECK_SECONDS
+
+
+def main():
+    print("🧪 stream_audio_chunks 投递延迟测试")
+    test_event_driven_delivery_latency()
+    test_generator_exits_after_stop_without_audio()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
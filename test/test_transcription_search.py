@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+测试转录全文检索
+- 中文无需分词：任意长度的子串（单字、词、短语）都能查到，不跨标点误配
+- 英文按单词前缀匹配、不区分大小写；多个关键词需同时出现
+- 按日期范围、服务、模型过滤，按相关度排序
+- 索引随写入 / 覆盖 / 改名增量更新，旧版数据库首次打开时补建索引
+- 检索结果给出当前的录音路径（平铺 / 已压缩 / 已清理），命令行输出 JSON
+
+Usage: python test/test_transcription_search.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio.archive import AudioArchiveManager
+from src.audio.retention import RetentionPolicy
+from src.audio.search import main as search_cli
+from src.audio.transcription_store import TranscriptionStore
+
+ENTRIES = [
+    ("a.wav", "明天下午三点开会，讨论数据库迁移方案。", "openai", "gpt-4o-transcribe", "2025-06-02T15:00:00"),
+    ("b.wav", "会议记录已经发给你了，记得看 Kubernetes 的部署文档。", "groq", "whisper-large-v3", "2025-06-10T09:30:00"),
+    ("c.wav", "周五晚上一起吃饭吧", "local", "ggml-large-v3", "2025-06-20T20:00:00"),
+    ("d.wav", "开会开会又是开会，今天的会太多了", "openai", "gpt-4o-transcribe", "2025-06-21T18:00:00"),
+]
+
+
+def _store(tmp):
+    store = TranscriptionStore(os.path.join(tmp, "transcriptions.sqlite3"))
+    for filename, text, service, model, timestamp in ENTRIES:
+        store.put(filename, text, service=service, model=model, timestamp=timestamp)
+    return store
+
+
+def _names(hits):
+    return sorted(hit.filename for hit in hits)
+
+
+def test_cjk_substrings():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        assert _names(store.search("开会")) == ["a.wav", "d.wav"]
+        assert _names(store.search("会")) == ["a.wav", "b.wav", "d.wav"], "单字查询"
+        assert _names(store.search("数据库迁移方案")) == ["a.wav"], "长短语"
+        assert _names(store.search("据库迁")) == ["a.wav"], "词中间的子串"
+        assert store.search("开会讨论") == [], "标点两侧的字不相邻"
+        assert store.search("迁移数据库") == [], "字序不同不匹配"
+        assert store.search("，。") == [], "只有标点时没有结果"
+        store.close()
+    print("✅ 中文任意子串检索")
+
+
+def test_english_prefix_and_keywords():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        assert _names(store.search("kube")) == ["b.wav"]
+        assert _names(store.search("KUBERNETES")) == ["b.wav"]
+        assert _names(store.search("部署 kubernetes")) == ["b.wav"]
+        assert _names(store.search("会议 吃饭")) == [], "多个关键词需同时出现"
+        assert _names(store.search('"开会"')) == ["a.wav", "d.wav"], "引号不影响查询"
+        store.close()
+    print("✅ 英文前缀与多关键词")
+
+
+def test_filters_and_ranking():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        hits = store.search("开会")
+        assert hits[0].filename == "d.wav", "出现次数多的排在前面"
+        assert hits[0].score > hits[1].score
+
+        june_first_half = dict(start=datetime(2025, 6, 1), end=datetime(2025, 6, 15))
+        assert _names(store.search("会", **june_first_half)) == ["a.wav", "b.wav"]
+        assert _names(store.search("会", start=datetime(2025, 7, 1))) == []
+        assert _names(store.search("会", service="openai")) == ["a.wav", "d.wav"]
+        assert _names(store.search("会", service="openai", model="whisper-1")) == []
+        assert [hit.filename for hit in store.search(None, start=datetime(2025, 6, 15))] == ["d.wav", "c.wav"]
+        store.close()
+    print("✅ 日期 / 服务 / 模型过滤，按相关度排序")
+
+
+def test_incremental_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = _store(tmp)
+        store.put("c.wav", "改成周六中午吃饭", service="local", model="ggml-large-v3")
+        assert store.search("周五") == [], "覆盖后旧文本不再被检索到"
+        assert _names(store.search("周六")) == ["c.wav"]
+
+        store.rename("c.wav", "c.flac", audio_path="/archive/c.flac")
+        hits = store.search("周六")
+        assert [hit.filename for hit in hits] == ["c.flac"] and hits[0].audio_path == "/archive/c.flac"
+        index_rows = store._conn.execute("SELECT COUNT(*) FROM transcriptions_fts").fetchone()[0]
+        assert index_rows == len(store) == len(ENTRIES)
+        store.close()
+
+        # 旧版数据库（没有全文索引）首次打开时补建
+        legacy = os.path.join(tmp, "legacy.sqlite3")
+        conn = sqlite3.connect(legacy)
+        conn.execute(
+            "CREATE TABLE transcriptions (filename TEXT PRIMARY KEY, transcription TEXT NOT NULL, service TEXT NOT NULL DEFAULT '',"
+            " model TEXT NOT NULL DEFAULT '', mode TEXT NOT NULL DEFAULT 'transcriptions', audio_hash TEXT,"
+            " timestamp TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO transcriptions VALUES ('old.wav', '去年的会议纪要', 'openai', 'whisper-1', 'transcriptions', NULL, '2024-01-01T00:00:00', 1704067200)")
+        conn.commit()
+        conn.close()
+        store = TranscriptionStore(legacy)
+        assert _names(store.search("会议纪要")) == ["old.wav"]
+        store.close()
+    print("✅ 索引增量更新，旧数据库补建索引")
+
+
+def test_hits_link_to_audio():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive = AudioArchiveManager(tmp, retention=RetentionPolicy(interval=0))
+        recorded = archive.new_audio_path()
+        with open(recorded, "wb") as f:
+            f.write(b"fLaC")
+        archive.save_transcription_result(recorded, "新录音里提到了预算", service="openai", model="gpt-4o-transcribe")
+
+        # cache.json 迁移来的旧记录没有 audio_path，按文件名在日期目录里找到
+        legacy_name = "recording_20240131_120000.wav"
+        shard = archive._shard_dir("20240131")
+        os.makedirs(shard)
+        with open(os.path.join(shard, legacy_name), "wb") as f:
+            f.write(b"RIFF")
+        archive.transcriptions.put(legacy_name, "旧录音里也提到了预算", service="openai", model="whisper-1")
+        archive.transcriptions.put("recording_20230101_000000.wav", "已清理的预算录音", service="openai", model="whisper-1")
+
+        paths = {hit.filename: hit.audio_path for hit in archive.search("预算")}
+        assert paths[os.path.basename(recorded)] == os.path.abspath(recorded)
+        assert paths[legacy_name] == os.path.join(shard, legacy_name)
+        assert paths["recording_20230101_000000.wav"] is None, "录音已不存在"
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assert search_cli(["预算", "--archive-dir", tmp, "--service", "openai", "--model", "whisper-1", "--json"]) == 0
+        results = json.loads(output.getvalue())
+        assert {result["filename"] for result in results} == {legacy_name, "recording_20230101_000000.wav"}
+    print("✅ 检索结果指向存档录音，命令行 JSON 输出")
+
+
+def main():
+    print("🧪 转录全文检索测试")
+    test_cjk_substrings()
+    test_english_prefix_and_keywords()
+    test_filters_and_ranking()
+    test_incremental_index()
+    test_hits_link_to_audio()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+测试存档转录结果存储
+- 按文件名插入 / 覆盖 / 查询，按音频哈希和时间范围查询
+- 旧 cache.json（test_cache_json.py 使用的格式）一次性迁移，原文件改名为 .migrated
+- AudioArchiveManager 保存结果时不再重写 cache.json
+
+Usage: python test/test_transcription_store.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.audio.archive import AudioArchiveManager
+from src.audio.transcription_store import TranscriptionStore
+
+LEGACY_CACHE = {
+    "recording_20250101_090000.wav": {
+        "transcription": "早上好",
+        "service": "openai",
+        "model": "gpt-4o-transcribe",
+        "mode": "transcriptions",
+        "timestamp": "2025-01-01T09:00:05.123456",
+    },
+    "recording_20250102_100000.wav": {
+        "transcription": "Good morning",
+        "service": "local",
+        "model": "ggml-large-v3.bin",
+        "mode": "translations",
+        "timestamp": "2025-01-02T10:00:03",
+    },
+    "recording_20250103_110000.wav": {
+        "transcription": "旧版本没有 mode 字段",
+        "service": "groq",
+        "model": "whisper-large-v3-turbo",
+        "timestamp": "2025-01-03T11:00:01",
+    },
+}
+
+
+def test_put_get_and_queries():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TranscriptionStore(os.path.join(tmp, "transcriptions.sqlite3"))
+        store.put("a.wav", "第一次", service="openai", model="m", audio_hash="h1", timestamp="2025-03-01T08:00:00")
+        store.put("a.wav", "重试后", service="local", model="m", audio_hash="h1", timestamp="2025-03-01T08:01:00")
+        store.put("b.wav", "副本", service="openai", model="m", audio_hash="h1", timestamp="2025-03-02T08:00:00")
+        store.put("c.wav", "其他", service="openai", model="m", audio_hash="h2", timestamp="2025-03-03T08:00:00")
+
+        assert len(store) == 3
+        entry = store.get("a.wav")
+        assert entry["transcription"] == "重试后" and entry["service"] == "local"
+        assert store.get("missing.wav") is None
+        assert [name for name, _ in store.find_by_hash("h1")] == ["a.wav", "b.wav"]
+        in_range = store.between(datetime(2025, 3, 2), datetime(2025, 3, 4))
+        assert [name for name, _ in in_range] == ["b.wav", "c.wav"]
+        store.close()
+    print("✅ 按文件名 / 哈希 / 时间范围查询")
+
+
+def test_migrate_legacy_cache_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        archive_dir = os.path.join(tmp, "audio_archive")
+        os.makedirs(archive_dir)
+        with open(os.path.join(archive_dir, "cache.json"), "w", encoding="utf-8") as f:
+            json.dump(LEGACY_CACHE, f, ensure_ascii=False, indent=2)
+
+        archive = AudioArchiveManager(archive_dir)
+        assert not os.path.exists(os.path.join(archive_dir, "cache.json"))
+        assert os.path.exists(os.path.join(archive_dir, "cache.json.migrated"))
+        recordings = [files for _, _, files in os.walk(os.path.join(archive_dir, "audio"))]
+        assert not any(recordings), "迁移文件不应被当作录音移动"
+
+        migrated = archive.load_transcription_cache()
+        assert set(migrated) == set(LEGACY_CACHE)
+        for name, entry in LEGACY_CACHE.items():
+            assert migrated[name]["transcription"] == entry["transcription"]
+            assert migrated[name]["timestamp"] == entry["timestamp"]
+        assert migrated["recording_20250103_110000.wav"]["mode"] == "transcriptions"
+
+        # 再次启动不会重复导入
+        archive.save_transcription_result(
+            os.path.join(archive.audio_dir, "recording_new.wav"), "新结果", service="openai", model="m"
+        )
+        reopened = AudioArchiveManager(archive_dir)
+        assert len(reopened.transcriptions) == len(LEGACY_CACHE) + 1
+        assert not os.path.exists(os.path.join(archive_dir, "cache.json"))
+    print(f"✅ 迁移 {len(LEGACY_CACHE)} 条 cache.json 记录")
+
+
+def main():
+    print("🧪 转录结果存储测试")
+    test_put_get_and_queries()
+    test_migrate_legacy_cache_json()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+测试上传前的音频编码
+- FLAC 无损：解码后与原始采样完全一致
+- Opus：码率接近配置值，时长不变
+- 按服务商支持的格式选择上传格式
+- 同一音频路径只编码一次（重试复用），编码结果存在临时文件里，discard 后删除并重新编码
+
+Usage: python test/test_upload_encoding.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.encoding import (
+    EncodedAudio,
+    UploadEncoder,
+    as_upload_file,
+    choose_upload_format,
+    encode_samples,
+)
+from src.audio.vad import VadConfig
+
+ASSET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "audio", "test_audio.wav")
+
+
+def _asset_pcm():
+    return sf.read(ASSET, dtype="int16")
+
+
+def test_flac_is_lossless():
+    pcm, sample_rate = _asset_pcm()
+    encoded = encode_samples(pcm, sample_rate, "flac")
+    decoded, rate = sf.read(io.BytesIO(encoded.data), dtype="int16")
+    assert rate == sample_rate
+    assert np.array_equal(decoded, pcm)
+    assert encoded.filename == "audio.flac"
+    assert len(encoded.data) < len(pcm) * 2
+    print(f"✅ FLAC 无损: {len(pcm) * 2 / 1024:.0f}KB -> {len(encoded.data) / 1024:.0f}KB")
+
+
+def test_opus_bitrate():
+    pcm, sample_rate = _asset_pcm()
+    pcm = np.tile(pcm, 5)
+    for kbps in (16, 32):
+        encoded = encode_samples(pcm, sample_rate, "ogg", opus_bitrate_kbps=kbps)
+        decoded, _ = sf.read(io.BytesIO(encoded.data), dtype="float32")
+        actual = len(encoded.data) * 8 / encoded.duration / 1000
+        assert abs(len(decoded) - len(pcm)) < sample_rate * 0.1
+        assert actual < kbps * 1.5, f"目标 {kbps}kbps，实际 {actual:.1f}kbps"
+        print(f"✅ Opus {kbps}kbps: 实际 {actual:.1f}kbps")
+
+
+def test_choose_upload_format():
+    assert choose_upload_format(("flac", "ogg", "wav")) == "flac"
+    assert choose_upload_format(("wav", "opus")) == "wav"
+    assert choose_upload_format(("flac", "ogg", "wav"), "ogg") == "ogg"
+    assert choose_upload_format(("wav", "opus"), "flac") == "wav"
+    assert as_upload_file(b"raw") == ("audio.wav", b"raw")
+
+
+def test_encoder_caches_per_job():
+    pcm, sample_rate = _asset_pcm()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "recording.wav")
+        silence = np.zeros(sample_rate * 2, dtype=np.int16)
+        sf.write(path, np.concatenate((silence, pcm, silence)), sample_rate, subtype="PCM_16")
+
+        scratch = os.path.join(tmp, "scratch")
+        encoder = UploadEncoder(VadConfig(), opus_bitrate_kbps=24, scratch_dir=scratch)
+        first = encoder.prepare(path, "flac")
+        assert isinstance(first, EncodedAudio)
+        assert first.duration < len(pcm) / sample_rate + 1.0, "上传前应裁掉首尾静音"
+        assert encoder.prepare(path, "flac") is first, "重试时应复用编码结果"
+        assert first.data is None and first.path.startswith(scratch), "等待重试期间编码结果不占内存"
+        filename, content = first.as_upload_file()
+        assert filename == "audio.flac"
+        assert np.array_equal(sf.read(io.BytesIO(content), dtype="int16")[0], sf.read(first.path, dtype="int16")[0])
+
+        # 等待重试期间其他任务的编码不会把它挤出缓存
+        for index in range(8):
+            other = os.path.join(tmp, f"other_{index}.wav")
+            sf.write(other, pcm[:sample_rate], sample_rate, subtype="PCM_16")
+            encoder.prepare(other, "flac")
+        assert encoder.prepare(path, "flac") is first, "缓存保留到 discard() 为止"
+
+        encoder.discard(path)
+        assert not os.path.exists(first.path), "discard 删除临时文件"
+        assert encoder.prepare(path, "flac") is not first
+        encoder.close()
+        assert not os.listdir(scratch), "close 删除临时目录"
+
+
+def main():
+    print("🧪 上传编码测试")
+    test_flac_is_lossless()
+    test_opus_bitrate()
+    test_choose_upload_format()
+    test_encoder_caches_per_job()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+测试能量/过零率 VAD
+- 离线模式：在 assets/audio/test_audio.wav 前后补静音和底噪，裁剪后保留全部语音
+- 检测不到语音时保持原始音频
+- 流式静音门：跳过开头静音和长停顿，语音块一个不少、顺序不变
+
+Usage: python test/test_vad.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.vad import EnergyVad, StreamingVadGate, VadConfig, frame_features, main as vad_main, trim_silence_file
+
+ASSET = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "audio", "test_audio.wav")
+PAD_SECONDS = 2.0
+
+
+def _load_asset():
+    samples, sample_rate = sf.read(ASSET, dtype="float32")
+    return samples, sample_rate
+
+
+def _noise(seconds, sample_rate, level_db=-60, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.standard_normal(int(seconds * sample_rate)) * 10 ** (level_db / 20)).astype(np.float32)
+
+
+def _padded_asset():
+    speech, sample_rate = _load_asset()
+    pad = _noise(PAD_SECONDS, sample_rate)
+    return np.concatenate((pad, speech, _noise(PAD_SECONDS, sample_rate, seed=1))), speech, sample_rate
+
+
+def test_offline_trim_keeps_speech():
+    config = VadConfig()
+    audio, speech, sample_rate = _padded_asset()
+    vad = EnergyVad(sample_rate, config)
+
+    speech_region = vad.detect(speech)
+    region = vad.detect(audio)
+    assert speech_region is not None and region is not None
+
+    offset = int(PAD_SECONDS * sample_rate)
+    # 补了底噪后，保留区间仍然覆盖原始音频中检测到的全部语音
+    assert region[0] <= offset + speech_region[0] + vad.frame_len
+    assert region[1] >= offset + speech_region[1] - vad.frame_len
+    trimmed = vad.trim(audio)
+    removed = (len(audio) - len(trimmed)) / sample_rate
+    assert removed > 2 * PAD_SECONDS - 1.0, f"只裁掉了 {removed:.2f}s"
+    print(f"✅ 离线裁剪: {len(audio) / sample_rate:.2f}s -> {len(trimmed) / sample_rate:.2f}s")
+
+
+def test_short_click_is_not_speech():
+    audio, _, sample_rate = _padded_asset()
+    click_at = int(0.5 * sample_rate)
+    audio[click_at:click_at + 160] = 0.8  # 10ms 按键声
+    region = EnergyVad(sample_rate, VadConfig()).detect(audio)
+    assert region[0] > click_at + sample_rate, "孤立的按键声不应被当作语音"
+
+
+def test_no_speech_keeps_original():
+    noise = _noise(3.0, 16000)
+    vad = EnergyVad(16000, VadConfig())
+    assert vad.detect(noise) is None
+    assert vad.trim(noise) is noise
+
+
+def test_trim_silence_file():
+    audio, _, sample_rate = _padded_asset()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "padded.wav")
+        sf.write(path, audio, sample_rate, subtype="PCM_16")
+
+        trimmed = trim_silence_file(path, VadConfig())
+        data, rate = sf.read(trimmed, dtype="int16")
+        assert rate == sample_rate
+        assert len(data) < len(audio) - sample_rate * 3
+        assert trim_silence_file(path, VadConfig(enabled=False)) is None
+
+        assert vad_main([ASSET, "-o", os.path.join(tmp, "out.wav")]) == 0
+        assert os.path.exists(os.path.join(tmp, "out.wav"))
+
+
+def test_streaming_gate_skips_silence():
+    speech, sample_rate = _load_asset()
+    audio = np.concatenate((
+        _noise(2.0, sample_rate), speech, _noise(4.0, sample_rate, seed=1), speech, _noise(1.0, sample_rate, seed=2),
+    ))
+    chunk = sample_rate // 5
+    gate = StreamingVadGate(sample_rate, VadConfig(stream_gate=True))
+    vad = EnergyVad(sample_rate, VadConfig())
+
+    sent = []
+    for index, start in enumerate(range(0, len(audio), chunk)):
+        sent.extend(gate.push(audio[start:start + chunk], index))
+    gate.finish()
+
+    total = -(-len(audio) // chunk)
+    speech_chunks = [i for i, start in enumerate(range(0, len(audio), chunk))
+                     if vad.classify(*frame_features(audio[start:start + chunk], vad.frame_len),
+                                     vad.config.min_energy_db).any()]
+    assert sent == sorted(sent), "发送顺序不能改变"
+    assert set(speech_chunks) <= set(sent), "语音块不能被跳过"
+    assert len(sent) + gate.dropped_chunks == total
+    assert gate.dropped_chunks >= 20, f"只跳过了 {gate.dropped_chunks} 个静音块"
+    print(f"✅ 流式静音门: {total} 个块中发送 {len(sent)} 个，跳过 {gate.dropped_chunks} 个")
+
+
+def main():
+    print("🧪 VAD 测试")
+    test_offline_trim_keeps_speech()
+    test_short_click_is_not_speech()
+    test_no_speech_keeps_original()
+    test_trim_silence_file()
+    test_streaming_gate_skips_silence()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
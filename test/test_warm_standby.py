@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+测试常驻输入流（warm standby）与预录缓冲
+使用假的输入流手动推送音频块，不需要真实音频设备：
+- 开始录音时预录音频被拼接到开头
+- 多次录音复用同一个输入流
+- 空闲超时后关闭常驻流
+- 常驻流打开时跳过定时刷新；收到设备变化信号后刷新，并在新设备上重新打开常驻流
+- 输入流 start() 失败时关闭已创建的流
+- 关闭 warm standby 时行为不变
+
+Usage: python test/test_warm_standby.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.audio.buffer import PrerollRing
+from src.audio.devices import InputDeviceRegistry
+from src.audio.recorder import AudioRecorder
+
+SAMPLE_RATE = 16000
+BLOCK_FRAMES = 160
+
+
+class FakeInputStream:
+    def __init__(self, callback=None, dtype="float32", device=None, fail_start=False, **kwargs):
+        self.callback = callback
+        self.dtype = dtype
+        self.device = device
+        self.fail_start = fail_start
+        self.active = False
+        self.closed = False
+
+    def start(self):
+        if self.fail_start:
+            raise RuntimeError("PortAudio: Internal PortAudio error")
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def abort(self):
+        self.active = False
+
+    def close(self):
+        self.closed = True
+
+    def push(self, value, blocks=1):
+        if self.dtype == "int16":
+            value = int(value * 32767)
+        block = np.full((BLOCK_FRAMES, 1), value, dtype=self.dtype)
+        for _ in range(blocks):
+            self.callback(block, BLOCK_FRAMES, None, None)
+
+
+class FakeStreamFactory:
+    def __init__(self):
+        self.streams = []
+        self.fail_start = False
+
+    def __call__(self, **kwargs):
+        stream = FakeInputStream(fail_start=self.fail_start, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+
+def _device(name):
+    return {"name": name, "max_input_channels": 1, "default_samplerate": float(SAMPLE_RATE)}
+
+
+def _recorder(warm, preroll_ms=50, idle_timeout=300, devices=None):
+    overrides = {
+        "AUDIO_WARM_STANDBY": "true" if warm else "false",
+        "AUDIO_PREROLL_MS": str(preroll_ms),
+        "AUDIO_WARM_IDLE_TIMEOUT": str(idle_timeout),
+    }
+    previous = {key: os.environ.get(key) for key in overrides}
+    os.environ.update(overrides)
+    factory = FakeStreamFactory()
+    try:
+        recorder = AudioRecorder(probe_devices=False, stream_factory=factory)
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key)
+            else:
+                os.environ[key] = value
+    devices = [_device("MacBook Pro Microphone")] if devices is None else devices
+    recorder._device_registry = InputDeviceRegistry(
+        is_busy=recorder._blocks_device_refresh,
+        is_standby=lambda: recorder._warm_stream_device is not None,
+        before_refresh=recorder._suspend_warm_stream,
+        after_refresh=recorder._resume_warm_stream,
+        query_devices=lambda: list(devices),
+        reinitialize=lambda: None,
+    )
+    recorder._send_notification = lambda *args, **kwargs: None
+    return recorder, factory
+
+
+def _record(recorder, value, blocks=20):
+    recorder.start_recording()
+    recorder.stream.push(value, blocks)
+    recorder._cancel_auto_stop_timer()
+    return recorder._finalize_recording(abort=False, enforce_min_duration=False)
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _read_samples(audio_buffer):
+    audio_buffer.seek(0)
+    data, _ = sf.read(audio_buffer, dtype="float32")
+    return data
+
+
+def test_preroll_ring_keeps_latest_samples():
+    ring = PrerollRing(5)
+    ring.write(np.arange(3, dtype=np.float32))
+    assert ring.snapshot().tolist() == [0, 1, 2]
+    ring.write(np.arange(3, 7, dtype=np.float32))
+    assert ring.snapshot().tolist() == [2, 3, 4, 5, 6]
+    ring.write(np.arange(10, 20, dtype=np.float32).reshape(-1, 1))
+    assert ring.snapshot().tolist() == [15, 16, 17, 18, 19]
+    ring.clear()
+    assert len(ring) == 0
+
+
+def test_warm_stream_reused_with_preroll():
+    recorder, factory = _recorder(warm=True, preroll_ms=50)
+    _record(recorder, 0.1)
+    assert len(factory.streams) == 1
+    stream = recorder.stream
+    assert stream is not None and not stream.closed, "录音结束后常驻流应保持打开"
+
+    # 空闲期间的音频进入预录缓冲（50ms = 800 采样，只保留最新的）
+    stream.push(0.2, blocks=10)
+    audio = _read_samples(_record(recorder, 0.5))
+
+    assert len(factory.streams) == 1, "第二次录音应复用常驻流"
+    preroll = SAMPLE_RATE * 50 // 1000
+    assert len(audio) == preroll + 20 * BLOCK_FRAMES
+    assert np.allclose(audio[:preroll], 0.2, atol=1e-3)
+    assert np.allclose(audio[preroll:], 0.5, atol=1e-3)
+    print(f"✅ 复用常驻流，预录 {preroll} 采样点已拼接到开头")
+    recorder.reset_streaming_state()
+    assert _wait_until(lambda: not stream.active), "重置后应关闭常驻流"
+
+
+def test_idle_timeout_closes_warm_stream():
+    recorder, factory = _recorder(warm=True, idle_timeout=0.1)
+    _record(recorder, 0.1)
+    stream = recorder.stream
+    assert _wait_until(lambda: recorder.stream is None), "空闲超时后应关闭常驻流"
+    assert _wait_until(lambda: not stream.active)
+
+    # 超时后重新录音会重新打开设备
+    _record(recorder, 0.3)
+    assert len(factory.streams) == 2
+    recorder.reset_streaming_state()
+    print("✅ 空闲超时关闭常驻流")
+
+
+def test_refresh_with_warm_stream_open():
+    devices = [_device("MacBook Pro Microphone")]
+    recorder, factory = _recorder(warm=True, idle_timeout=300, devices=devices)
+    _record(recorder, 0.1)
+    old_stream = recorder.stream
+    assert recorder._warm_stream_device == "MacBook Pro Microphone"
+    assert not recorder._blocks_device_refresh(), "只有常驻流打开时应允许后台刷新"
+
+    # 常驻流打开期间插入更高优先级的 DJI Mic：定时刷新不动常驻流（保留预录缓冲）
+    devices.append(_device("DJI Mic 2"))
+    preroll = recorder._preroll
+    assert recorder._device_registry._refresh_if_idle()
+    assert recorder.stream is old_stream and recorder._preroll is preroll and not old_stream.closed
+
+    # 收到设备变化信号：刷新前关闭常驻流，刷新后在新设备上重新打开
+    recorder._device_registry.invalidate()
+    assert recorder._device_registry._refresh_if_idle(requested=True)
+    assert old_stream.closed, "重新初始化 PortAudio 前应关闭旧的常驻流"
+    assert recorder._warm_stream_device == "DJI Mic 2" and recorder.stream.device == 1
+    assert 0 < recorder._warm_idle_deadline - time.monotonic() <= 300, "空闲计时接着刷新前的剩余时间"
+
+    audio = _read_samples(_record(recorder, 0.3))
+    assert len(factory.streams) == 2, "刷新后开始录音应复用新的常驻流"
+    assert np.allclose(audio[-20 * BLOCK_FRAMES:], 0.3, atol=1e-3)
+
+    # 录音中不允许刷新
+    recorder.start_recording()
+    assert recorder._blocks_device_refresh() and not recorder._device_registry._refresh_if_idle(requested=True)
+    recorder._cancel_auto_stop_timer()
+    recorder.reset_streaming_state()
+    print("✅ 常驻流打开时跳过定时刷新，设备变化后在新设备上重新打开常驻流")
+
+
+def test_failed_start_closes_stream():
+    recorder, factory = _recorder(warm=False)
+    factory.fail_start = True
+    try:
+        recorder.start_recording()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("start() 失败时应抛出异常")
+    assert len(factory.streams) == 2, "缓存设备打不开时重新枚举后重试一次"
+    assert all(stream.closed for stream in factory.streams), "start() 失败的流应被关闭"
+    assert recorder.stream is None and not recorder.recording
+    recorder.reset_streaming_state()
+    print("✅ 输入流启动失败时关闭已创建的流")
+
+
+def test_cold_mode_unchanged():
+    recorder, factory = _recorder(warm=False)
+    audio = _read_samples(_record(recorder, 0.4))
+    assert recorder.stream is None
+    assert len(audio) == 20 * BLOCK_FRAMES
+    _record(recorder, 0.4)
+    assert len(factory.streams) == 2
+    print("✅ 非常驻模式每次录音重新打开输入流")
+
+
+def main():
+    print("🧪 常驻输入流 / 预录缓冲测试")
+    test_preroll_ring_keeps_latest_samples()
+    test_warm_stream_reused_with_preroll()
+    test_idle_timeout_closes_warm_stream()
+    test_refresh_with_warm_stream_open()
+    test_failed_start_closes_stream()
+    test_cold_mode_unchanged()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+测试常驻 whisper-server 后端
+用一个说同样协议（GET /health, POST /inference）的 Python 桩服务代替 whisper.cpp：
+- 多次转录复用同一个进程（模型只加载一次）
+- 模型加载期间 /health 返回 503，等就绪后才提交任务
+- 进程被杀后自动重启
+- 空闲超时后关闭进程
+- 服务端无法启动时 LocalWhisperProcessor 回退到 whisper-cli；超时、崩溃、取消不回退
+- whisper-cli 的 I/O：存档文件（WAV / FLAC）直接传路径、内存音频走 stdin、结果从 stdout 读取；
+  file 模式的临时文件放在 scratch 目录并在结束后清理，分段被拆开的 UTF-8 一次解码
+
+Usage: python test/test_whisper_server.py
+"""
+
+import io
+import os
+import stat
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import soundfile as sf
+
+from src.transcription.whisper_server import WhisperServer
+
+STUB_SERVER = '''#!{python}
+import argparse, json, os, sys, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-m")
+parser.add_argument("--host")
+parser.add_argument("--port", type=int)
+args, _ = parser.parse_known_args()
+if os.getenv("STUB_EXIT_ON_START") == "1":
+    sys.exit(3)
+ready_at = time.time() + float(os.getenv("STUB_LOAD_SECONDS", "0"))
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *a):
+        pass
+
+    def _reply(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if time.time() < ready_at:
+            self._reply(503, {{"status": "loading model"}})
+        else:
+            self._reply(200, {{"status": "ok"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if os.getenv("STUB_CRASH_ON_INFERENCE") == "1":
+            os._exit(1)
+        time.sleep(float(os.getenv("STUB_INFERENCE_SECONDS", "0")))
+        self._reply(200, {{"text": " server:%d:%d " % (os.getpid(), len(body))}})
+
+ThreadingHTTPServer((args.host, args.port), Handler).serve_forever()
+'''
+
+STUB_CLI = '''#!{python}
+import sys
+args = sys.argv
+source = args[args.index("-f") + 1]
+label = "stdin:%d" % len(sys.stdin.buffer.read()) if source == "-" else "path:" + source
+if "-ojf" in args:
+    # 和 whisper.cpp 一样按 token 写原始字节："你" 的 UTF-8 被拆在两个分段里
+    with open(args[args.index("-of") + 1] + ".json", "wb") as f:
+        f.write(b'{{"transcription": [{{"text": " cli:' + label.encode() + b' \\xe4\\xbd"}}, {{"text": "\\xa0\\xe5\\xa5\\xbd"}}]}}')
+else:
+    sys.stdout.buffer.write((" cli:" + label + " 你好\\n").encode("utf-8"))
+'''
+
+
+def _write_script(path, template):
+    with open(path, "w") as f:
+        f.write(template.format(python=sys.executable))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+
+
+def _make_whisper_root(root):
+    """whisper.cpp 目录结构：build/bin/whisper-cli、build/bin/whisper-server、models/*.bin"""
+    bin_dir = os.path.join(root, "build", "bin")
+    os.makedirs(bin_dir)
+    os.makedirs(os.path.join(root, "models"))
+    open(os.path.join(root, "models", "ggml-test.bin"), "wb").close()
+    _write_script(os.path.join(bin_dir, "whisper-server"), STUB_SERVER)
+    _write_script(os.path.join(bin_dir, "whisper-cli"), STUB_CLI)
+    return bin_dir
+
+
+def _wav_file(directory):
+    path = os.path.join(directory, "audio.wav")
+    sf.write(path, np.zeros(1600, dtype=np.int16), 16000, subtype="PCM_16")
+    return path
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+class _env:
+    """临时设置环境变量（桩服务继承父进程环境）"""
+
+    def __init__(self, **values):
+        self.values = values
+        self.saved = {}
+
+    def __enter__(self):
+        for key, value in self.values.items():
+            self.saved[key] = os.environ.get(key)
+            os.environ[key] = value
+
+    def __exit__(self, *exc):
+        for key, value in self.saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def test_server_reused_and_restarted():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        wav = _wav_file(tmp)
+        server = WhisperServer(os.path.join(bin_dir, "whisper-server"), "model.bin", idle_timeout=0)
+        try:
+            first = server.transcribe(wav)
+            pid = server.pid
+            assert first.startswith(f"server:{pid}:")
+            assert server.transcribe(wav).startswith(f"server:{pid}:"), "第二次转录应复用同一进程"
+
+            server._process.kill()
+            server._process.wait()
+            assert server.transcribe(wav).startswith("server:")
+            assert server.pid != pid and server.restarts == 1
+            print(f"✅ 进程复用 + 自动重启 (pid {pid} -> {server.pid})")
+        finally:
+            server.stop()
+        assert not server.is_running()
+
+
+def test_waits_for_model_load():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        wav = _wav_file(tmp)
+        server = WhisperServer(os.path.join(bin_dir, "whisper-server"), "model.bin", idle_timeout=0)
+        try:
+            with _env(STUB_LOAD_SECONDS="0.6"):
+                started = time.time()
+                assert server.transcribe(wav).startswith("server:")
+            assert time.time() - started >= 0.6, "模型加载完成（/health 200）前不应提交任务"
+        finally:
+            server.stop()
+
+
+def test_idle_unload():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        wav = _wav_file(tmp)
+        server = WhisperServer(os.path.join(bin_dir, "whisper-server"), "model.bin", idle_timeout=0.3)
+        try:
+            server.transcribe(wav)
+            assert server.is_running()
+            assert _wait_until(lambda: not server.is_running()), "空闲超时后应关闭进程"
+            assert server.transcribe(wav).startswith("server:"), "关闭后再次使用应重新启动"
+            print("✅ 空闲卸载后按需重启")
+        finally:
+            server.stop()
+
+
+def _make_processor(bin_dir, **env):
+    from src.transcription.local_whisper import LocalWhisperProcessor
+
+    values = dict(
+        WHISPER_CLI_PATH=os.path.join(bin_dir, "whisper-cli"),
+        WHISPER_MODEL_PATH="models/ggml-test.bin",
+        WHISPER_BACKEND="auto",
+        WHISPER_IO_MODE="pipe",
+        KIMI_API_KEY=os.getenv("KIMI_API_KEY") or "test",
+        ENABLE_KIMI_POLISH="false",
+    )
+    values.update(env)
+    with _env(**values):
+        return LocalWhisperProcessor()
+
+
+def test_processor_falls_back_to_cli():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        audio = open(_wav_file(tmp), "rb").read()
+        processor = _make_processor(bin_dir)
+        try:
+            assert processor.server is not None, "存在 whisper-server 时应使用常驻后端"
+            result, error = processor.process_audio(io.BytesIO(audio))
+            assert error is None and result.startswith("server:"), result
+
+            with _env(STUB_EXIT_ON_START="1"):
+                processor.server.stop()
+                result, error = processor.process_audio(io.BytesIO(audio))
+            assert error is None and result.startswith("cli:"), f"服务端无法启动时应回退到 whisper-cli，得到 {result!r}"
+            print("✅ 服务端无法启动时回退到 whisper-cli")
+        finally:
+            processor.close()
+
+
+def test_processor_does_not_fall_back_on_timeout_or_cancel():
+    from src.utils.execution import CancelToken, OperationCancelled
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        audio = open(_wav_file(tmp), "rb").read()
+        processor = _make_processor(bin_dir)
+        try:
+            processor.timeout_seconds = 0.3
+            with _env(STUB_INFERENCE_SECONDS="1"):
+                processor.server.stop()
+                processor.server.ensure_running()
+            result, error = processor.process_audio(io.BytesIO(audio))
+            assert result is None and isinstance(error.exception, TimeoutError), f"超时不应回退到 whisper-cli，得到 {result!r}"
+
+            with _env(STUB_CRASH_ON_INFERENCE="1"):
+                processor.server.stop()
+                result, error = processor.process_audio(io.BytesIO(audio))
+            assert result is None and error is not None, "请求过程中崩溃不应再起 whisper-cli"
+
+            token = CancelToken()
+            token.cancel()
+            result, error = processor.process_audio(io.BytesIO(audio), cancel_token=token)
+            assert result is None and isinstance(error.exception, OperationCancelled), "已取消的任务不应提交"
+            print("✅ 超时 / 崩溃 / 取消时不回退到 whisper-cli")
+        finally:
+            processor.close()
+
+
+def test_cli_pipe_mode():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        wav = _wav_file(tmp)
+        audio = open(wav, "rb").read()
+        processor = _make_processor(bin_dir, WHISPER_BACKEND="cli")
+        assert processor.server is None
+
+        result, error = processor.process_audio(io.BytesIO(audio))
+        assert error is None and result == f"cli:stdin:{len(audio)} 你好", result
+
+        result, error = processor.process_audio(open(wav, "rb"))
+        assert error is None and result == f"cli:path:{wav} 你好", "存档文件应直接传路径，不再复制"
+        assert sorted(os.listdir(tmp)) == ["audio.wav", "build", "models"], "pipe 模式不应产生临时文件"
+
+        flac = os.path.join(tmp, "audio.flac")
+        sf.write(flac, np.zeros(1600, dtype=np.int16), 16000, format="FLAC")
+        result, error = processor.process_audio(open(flac, "rb"))
+        assert error is None and result == f"cli:path:{flac} 你好", "FLAC 存档也直接传路径，不解码成 WAV"
+        print("✅ pipe 模式: stdin / 存档路径输入，stdout 输出")
+
+
+def test_cli_file_mode_uses_scratch_dir():
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = _make_whisper_root(tmp)
+        scratch = os.path.join(tmp, "scratch")
+        os.makedirs(scratch)
+        audio = open(_wav_file(tmp), "rb").read()
+        processor = _make_processor(bin_dir, WHISPER_BACKEND="cli", WHISPER_IO_MODE="file", WHISPER_SCRATCH_DIR=scratch)
+
+        result, error = processor.process_audio(io.BytesIO(audio))
+        assert error is None, error
+        assert result.startswith(f"cli:path:{scratch}") and result.endswith(" 你好"), result
+        assert os.listdir(scratch) == [], "临时 WAV/JSON 应在处理后删除"
+        print("✅ file 模式: 临时文件在 scratch 目录，分段 UTF-8 一次解码")
+
+
+def main():
+    print("🧪 whisper-server 后端测试")
+    test_server_reused_and_restarted()
+    test_waits_for_model_load()
+    test_idle_unload()
+    test_processor_falls_back_to_cli()
+    test_processor_does_not_fall_back_on_timeout_or_cancel()
+    test_cli_pipe_mode()
+    test_cli_file_mode_uses_scratch_dir()
+    print("🎉 测试通过!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())